@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""Record task durations per run and flag tasks that got slower"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    name: task_history
+    type: aggregate
+    short_description: Persist per-task, per-role and per-host durations and detect regressions
+    description:
+      - Times every task on every host and appends one JSON line per playbook run to a history file, keyed by
+        playbook and git revision, with per-host ok/changed/skipped/failed counts.
+      - At the end of a run prints the slowest tasks and the tasks whose duration exceeds the rolling median of
+        earlier runs of the same playbook by more than the threshold.
+      - Query the history with C(scripts/task-history.py).
+    requirements:
+      - enable in ansible.cfg (callbacks_enabled = task_history)
+    options:
+      history_file:
+        description: JSON lines file the runs are appended to.
+        default: ~/.ansible/task-history.jsonl
+        type: path
+        ini:
+          - section: callback_task_history
+            key: history_file
+        env:
+          - name: TASK_HISTORY_FILE
+      top:
+        description: Number of slowest tasks to print at the end of a run (0 disables the list).
+        default: 10
+        type: int
+        ini:
+          - section: callback_task_history
+            key: top
+        env:
+          - name: TASK_HISTORY_TOP
+      threshold:
+        description: A task regressed when it took longer than this factor times its rolling median.
+        default: 1.5
+        type: float
+        ini:
+          - section: callback_task_history
+            key: threshold
+        env:
+          - name: TASK_HISTORY_THRESHOLD
+      window:
+        description: Number of earlier runs of the same playbook the rolling median is taken over.
+        default: 10
+        type: int
+        ini:
+          - section: callback_task_history
+            key: window
+        env:
+          - name: TASK_HISTORY_WINDOW
+      min_seconds:
+        description: Tasks faster than this are never reported as regressions.
+        default: 5.0
+        type: float
+        ini:
+          - section: callback_task_history
+            key: min_seconds
+        env:
+          - name: TASK_HISTORY_MIN_SECONDS
+'''
+
+import fcntl
+import json
+import os
+import socket
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from ansible.plugins.callback import CallbackBase
+
+# Runs with fewer earlier samples of a task have no meaningful median
+MIN_SAMPLES = 3
+
+
+def task_key(role, name):
+    return '%s : %s' % (role, name) if role else name
+
+
+def load_history(path, playbook=None):
+    """Runs from the history file, oldest first; unreadable lines are skipped"""
+    runs = []
+    if not os.path.exists(path):
+        return runs
+    with open(path) as handle:
+        for line in handle:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            if playbook is None or run.get('playbook') == playbook:
+                runs.append(run)
+    return runs
+
+
+def durations(runs):
+    """{(task key, host): [seconds, ...]} over the given runs, in run order"""
+    samples = {}
+    for run in runs:
+        for task in run.get('tasks', []):
+            samples.setdefault((task['task'], task['host']), []).append(task['seconds'])
+    return samples
+
+
+def find_regressions(run, history, threshold=1.5, window=10, min_seconds=5.0):
+    """Tasks of `run` slower than `threshold` x their median over the last `window` earlier runs"""
+    samples = durations(history[-window:] if window else history)
+    regressions = []
+    for task in run.get('tasks', []):
+        previous = samples.get((task['task'], task['host']), [])
+        if task['seconds'] < min_seconds or len(previous) < MIN_SAMPLES:
+            continue
+        median = statistics.median(previous)
+        if median > 0 and task['seconds'] > median * threshold:
+            regressions.append(dict(task, median=round(median, 2), factor=round(task['seconds'] / median, 2)))
+    return sorted(regressions, key=lambda task: task['factor'], reverse=True)
+
+
+def role_totals(run):
+    """Seconds per role and host, summed over the role's tasks"""
+    totals = {}
+    for task in run.get('tasks', []):
+        key = (task.get('role') or '(playbook)', task['host'])
+        totals[key] = round(totals.get(key, 0) + task['seconds'], 2)
+    return totals
+
+
+def git(directory, *args):
+    try:
+        return subprocess.run(('git',) + args, cwd=directory, capture_output=True, text=True,
+                              timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'task_history'
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, *args, **kwargs):
+        super(CallbackModule, self).__init__(*args, **kwargs)
+        self.playbook = None
+        self.playbook_dir = None
+        self.started = None
+        self.running = {}
+        self.tasks = []
+
+    def v2_playbook_on_start(self, playbook):
+        path = os.path.abspath(playbook._file_name)
+        self.playbook_dir = os.path.dirname(path)
+        root = git(self.playbook_dir, 'rev-parse', '--show-toplevel')
+        self.playbook = os.path.relpath(path, root) if root else os.path.basename(path)
+        self.started = time.time()
+
+    def v2_runner_on_start(self, host, task):
+        self.running[(host.get_name(), task._uuid)] = time.time()
+
+    def _finish(self, result, status):
+        host = getattr(result, 'host', None) or result._host
+        task = getattr(result, 'task', None) or result._task
+        started = self.running.pop((host.get_name(), task._uuid), None)
+        if started is None:
+            return
+        role = task._role.get_name(include_role_fqcn=False) if task._role else None
+        name = task.get_name().split(' : ', 1)[-1] if role else task.get_name()
+        self.tasks.append({
+            'task': task_key(role, name),
+            'role': role,
+            'action': task.action,
+            'host': host.get_name(),
+            'seconds': round(time.time() - started, 3),
+            'status': status,
+        })
+
+    def v2_runner_on_ok(self, result, **kwargs):
+        self._finish(result, 'changed' if result._result.get('changed') else 'ok')
+
+    def v2_runner_on_failed(self, result, ignore_errors=False, **kwargs):
+        self._finish(result, 'ignored' if ignore_errors else 'failed')
+
+    def v2_runner_on_skipped(self, result, **kwargs):
+        self._finish(result, 'skipped')
+
+    def v2_runner_on_unreachable(self, result, **kwargs):
+        self._finish(result, 'unreachable')
+
+    def v2_playbook_on_stats(self, stats):
+        if self.playbook is None:
+            return
+        history_file = self.get_option('history_file')
+        run = {
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'playbook': self.playbook,
+            'revision': git(self.playbook_dir, 'rev-parse', '--short', 'HEAD') or None,
+            'dirty': bool(git(self.playbook_dir, 'status', '--porcelain', '--untracked-files=no')),
+            'controller': socket.gethostname(),
+            'seconds': round(time.time() - self.started, 2),
+            'hosts': dict((host, stats.summarize(host)) for host in sorted(stats.processed)),
+            'tasks': self.tasks,
+        }
+
+        history = load_history(history_file, self.playbook)
+        self._report(run, history)
+
+        directory = os.path.dirname(history_file)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Playbooks run in parallel by scripts/deploy-orchestrator.py share the file
+        with open(history_file, 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            handle.write(json.dumps(run, sort_keys=True) + '\n')
+
+    def _report(self, run, history):
+        top = self.get_option('top')
+        if top and run['tasks']:
+            self._display.banner('SLOWEST TASKS (%s, %.1fs)' % (run['playbook'], run['seconds']))
+            for task in sorted(run['tasks'], key=lambda task: task['seconds'], reverse=True)[:top]:
+                self._display.display('%9.2fs  %-14s %s' % (task['seconds'], task['host'][:14], task['task']))
+            roles = sorted(role_totals(run).items(), key=lambda item: item[1], reverse=True)[:top]
+            self._display.display('')
+            for (role, host), seconds in roles:
+                self._display.display('%9.2fs  %-14s role %s' % (seconds, host[:14], role))
+
+        regressions = find_regressions(run, history, self.get_option('threshold'), self.get_option('window'),
+                                       self.get_option('min_seconds'))
+        if regressions:
+            self._display.banner('TASK DURATION REGRESSIONS')
+            for task in regressions:
+                self._display.warning('%s on %s took %.1fs, %.1fx its median of %.1fs over the last %d runs'
+                                      % (task['task'], task['host'], task['seconds'], task['factor'],
+                                         task['median'], min(len(history), self.get_option('window'))))
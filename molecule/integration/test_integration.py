@@ -1,14 +1,28 @@
 """
 Integration tests for complete Jenkins + Nginx + SSL workflow
 """
+import importlib.util
 import os
-import time
 import testinfra.utils.ansible_runner
 
 
 testinfra_hosts = testinfra.utils.ansible_runner.AnsibleRunner(
     os.environ['MOLECULE_INVENTORY_FILE']).get_hosts('all')
 
+READINESS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..',
+                         'roles', 'service-readiness', 'module_utils', 'readiness.py')
+spec = importlib.util.spec_from_file_location('readiness', READINESS)
+readiness = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(readiness)
+
+
+def wait_until_ready(host, *conditions, timeout=300):
+    """Poll readiness conditions from inside the container instead of sleeping"""
+    results = readiness.wait_until(list(conditions), timeout=timeout)
+    not_ready = {name: result['detail'] for name, result in results.items() if not result['ready']}
+    assert not not_ready, not_ready
+    return results
+
 
 def test_jenkins_is_running(host):
     """Test Jenkins is running on jenkins-server"""
@@ -19,8 +33,8 @@ def test_jenkins_is_running(host):
     assert jenkins.is_running
     assert jenkins.is_enabled
 
-    # Wait for Jenkins to be ready
-    time.sleep(30)
+    fetch = readiness.curl_fetch(lambda command: host.run(command).stdout)
+    wait_until_ready(host, readiness.jenkins("http://localhost:8080", fetch=fetch))
     assert host.socket("tcp://0.0.0.0:8080").is_listening
 
 
@@ -78,8 +92,11 @@ def test_end_to_end_connectivity(host):
     if 'nginx-proxy' not in host.backend.get_hostname():
         return  # Skip for jenkins server
 
-    # Wait for all services to be ready
-    time.sleep(45)
+    fetch = readiness.curl_fetch(lambda command: host.run(command).stdout)
+    wait_until_ready(host,
+                     readiness.jenkins("http://jenkins-server:8080", fetch=fetch),
+                     readiness.jenkins("https://localhost", name="jenkins-via-proxy",
+                                       fetch=fetch, validate_certs=False))
 
     # Test connectivity to Jenkins backend
     jenkins_result = host.run("curl -s -o /dev/null -w '%{http_code}' http://jenkins-server:8080")
@@ -99,8 +116,8 @@ def test_jenkins_web_interface_accessible_via_proxy(host):
     if 'nginx-proxy' not in host.backend.get_hostname():
         return  # Skip for jenkins server
 
-    # Wait for services to be ready
-    time.sleep(30)
+    fetch = readiness.curl_fetch(lambda command: host.run(command).stdout)
+    wait_until_ready(host, readiness.jenkins("https://localhost", fetch=fetch, validate_certs=False))
 
     # Test that we can get Jenkins response via proxy
     result = host.run("curl -k -s https://localhost")
@@ -163,8 +180,8 @@ def test_services_survive_restart(host):
         result = host.run("systemctl restart jenkins")
         assert result.rc == 0
 
-        # Give it time to start
-        time.sleep(20)
+        fetch = readiness.curl_fetch(lambda command: host.run(command).stdout)
+        wait_until_ready(host, readiness.jenkins("http://localhost:8080", fetch=fetch))
         jenkins = host.service("jenkins")
         assert jenkins.is_running
 
@@ -173,8 +190,8 @@ def test_services_survive_restart(host):
         result = host.run("systemctl restart nginx")
         assert result.rc == 0
 
-        # Should start immediately
-        time.sleep(5)
+        wait_until_ready(host, readiness.Condition("nginx", lambda: (host.service("nginx").is_running, "")),
+                         timeout=30)
         nginx = host.service("nginx")
         assert nginx.is_running
 
@@ -0,0 +1,261 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Download install artifacts once into a checksum-verified local cache"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: artifact_cache
+short_description: Keep install artifacts (tarballs, archives, keys) in a checksum-verified local cache
+description:
+  - Downloads every artifact that is not cached yet into I(cache_dir) and verifies its checksum.
+  - The expected checksum comes from I(sha256) or from a checksum file at I(checksum_url). An artifact with
+    neither fails, unless it names the check the caller runs instead (I(verified_by)) or I(allow_unverified)
+    is set; then its SHA-256 is pinned on first download and later runs verify the cached file against it.
+  - Cached files carry a small JSON stamp with their digest, size and modification time, so unchanged files
+    are not hashed again on every run.
+  - Concurrent runs for several hosts share the cache through a lock per file; each file is downloaded once.
+  - Runs where the cache lives (normally the Ansible controller); the cache can be reused offline.
+options:
+  artifacts:
+    description:
+      - Artifacts to cache. Each is a dict with C(url) and optional C(sha256) (hex), C(checksum_url) (a
+        C(sha256sum)-style file), C(checksum_algorithm) (of the checksum file, C(sha256) (default), C(sha1) or
+        C(sha512)), C(verified_by) (the check the caller runs on the file instead, e.g. a key fingerprint) and
+        C(filename) (default the last path segment of C(url)).
+    type: list
+    elements: dict
+    required: true
+  cache_dir:
+    description: Directory holding the cached files.
+    type: path
+    required: true
+  offline:
+    description: Never use the network; fail if an artifact is missing from the cache.
+    type: bool
+    default: false
+  timeout:
+    description: Network timeout in seconds.
+    type: int
+    default: 300
+  allow_unverified:
+    description: Pin the SHA-256 of the first download for artifacts without any checksum instead of failing.
+    type: bool
+    default: false
+'''
+
+EXAMPLES = r'''
+- name: Cache the Keycloak tarball on the controller
+  artifact_cache:
+    artifacts:
+      - url: https://github.com/keycloak/keycloak/releases/download/22.0.5/keycloak-22.0.5.tar.gz
+        checksum_url: https://github.com/keycloak/keycloak/releases/download/22.0.5/keycloak-22.0.5.tar.gz.sha1
+        checksum_algorithm: sha1
+    cache_dir: "{{ lookup('env', 'HOME') }}/.cache/ansible-artifacts"
+  delegate_to: localhost
+  become: false
+  register: cached
+'''
+
+RETURN = r'''
+artifacts:
+  description: The cached artifacts, in the order requested.
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - url: https://github.com/keycloak/keycloak/releases/download/22.0.5/keycloak-22.0.5.tar.gz
+      filename: keycloak-22.0.5.tar.gz
+      path: /home/user/.cache/ansible-artifacts/files/keycloak-22.0.5.tar.gz
+      sha256: 8b5c...
+      size: 190468383
+      verified: checksum_url
+      downloaded: false
+downloaded:
+  description: File names downloaded by this run.
+  returned: always
+  type: list
+  elements: str
+'''
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import open_url
+
+CHECKSUM_ALGORITHMS = ('sha1', 'sha256', 'sha512')
+
+
+class CacheError(Exception):
+    pass
+
+
+def file_digest(path, algorithm='sha256'):
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def digest_matches(path, sha256, algorithm, expected):
+    """Whether the file with SHA-256 sha256 has the expected digest (anything goes without one)"""
+    if expected is None:
+        return True
+    if algorithm == 'sha256':
+        return sha256 == expected
+    return file_digest(path, algorithm) == expected
+
+
+class ArtifactCache:
+    """Downloaded files and their digest stamps under one directory"""
+
+    def __init__(self, cache_dir, offline=False, timeout=300, allow_unverified=False):
+        self.directory = os.path.join(cache_dir, 'files')
+        self.offline = offline
+        self.timeout = timeout
+        self.allow_unverified = allow_unverified
+        self.warnings = []
+        os.makedirs(self.directory, exist_ok=True)
+
+    def fetch(self, url, dest):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix='.download-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                response = open_url(url, timeout=self.timeout, follow_redirects='all',
+                                    http_agent='ansible-artifact-cache')
+                shutil.copyfileobj(response, handle, 1 << 20)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def expected_digest(self, artifact, stamp):
+        """Algorithm and digest the file must have, and where they came from"""
+        if artifact.get('sha256'):
+            return 'sha256', artifact['sha256'].lower(), 'sha256'
+        if artifact.get('checksum_url'):
+            if stamp and stamp.get('checksum_url') == artifact['checksum_url']:
+                return 'sha256', stamp['sha256'], 'checksum_url'
+            algorithm = artifact.get('checksum_algorithm') or 'sha256'
+            if algorithm not in CHECKSUM_ALGORITHMS:
+                raise CacheError('unsupported checksum_algorithm %s for %s' % (algorithm, artifact['filename']))
+            if self.offline:
+                raise CacheError('checksum of %s is not cached and offline mode is enabled' % artifact['filename'])
+            try:
+                text = open_url(artifact['checksum_url'], timeout=self.timeout, follow_redirects='all',
+                                http_agent='ansible-artifact-cache').read().decode('utf-8', 'replace')
+            except Exception as e:
+                raise CacheError('cannot download %s: %s' % (artifact['checksum_url'], e))
+            length = hashlib.new(algorithm).digest_size * 2
+            match = re.search(r'\b([0-9a-fA-F]{%d})\b' % length, text)
+            if not match:
+                raise CacheError('no %s checksum found in %s' % (algorithm.upper(), artifact['checksum_url']))
+            return algorithm, match.group(1).lower(), 'checksum_url'
+        verified = artifact.get('verified_by') or 'pinned'
+        if verified == 'pinned' and not self.allow_unverified:
+            raise CacheError('%s has no known checksum: set its sha256 or checksum_url, or allow_unverified to pin '
+                             'the SHA-256 of the first download' % artifact['filename'])
+        if stamp and stamp.get('verified') == verified:
+            return 'sha256', stamp['sha256'], verified
+        return 'sha256', None, verified
+
+    def ensure(self, artifact):
+        """Make sure the artifact is cached with the expected digest; return its cache entry"""
+        path = os.path.join(self.directory, artifact['filename'])
+        with open(path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            stamp = self.read_stamp(path)
+            algorithm, expected, verified = self.expected_digest(artifact, stamp)
+
+            downloaded = False
+            actual = self.cached_sha256(path, stamp)
+            if actual is None or not digest_matches(path, actual, algorithm, expected):
+                if self.offline:
+                    raise CacheError('%s is not cached%s and offline mode is enabled'
+                                     % (artifact['filename'], '' if actual is None else ' with the expected SHA-256'))
+                try:
+                    self.fetch(artifact['url'], path)
+                except Exception as e:
+                    raise CacheError('cannot download %s: %s' % (artifact['url'], e))
+                actual = file_digest(path)
+                downloaded = True
+            if not digest_matches(path, actual, algorithm, expected):
+                got = actual if algorithm == 'sha256' else file_digest(path, algorithm)
+                os.unlink(path)
+                raise CacheError('checksum mismatch for %s: expected %s %s, got %s'
+                                 % (artifact['filename'], algorithm.upper(), expected, got))
+            if verified == 'pinned' and downloaded:
+                self.warnings.append('%s has no known checksum; pinned SHA-256 %s from the first download'
+                                     % (artifact['filename'], actual))
+
+            stat = os.stat(path)
+            stamp = {'url': artifact['url'], 'sha256': actual, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                     'verified': verified, 'checksum_url': artifact.get('checksum_url')}
+            with open(path + '.json', 'w') as handle:
+                json.dump(stamp, handle, sort_keys=True)
+        return {'url': artifact['url'], 'filename': artifact['filename'], 'path': path, 'sha256': actual,
+                'size': stat.st_size, 'verified': verified, 'downloaded': downloaded}
+
+    @staticmethod
+    def read_stamp(path):
+        try:
+            with open(path + '.json') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def cached_sha256(path, stamp):
+        """Digest of the cached file, from its stamp while size and mtime are unchanged"""
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        if stamp and stamp.get('size') == stat.st_size and stamp.get('mtime_ns') == stat.st_mtime_ns:
+            return stamp['sha256']
+        return file_digest(path)
+
+
+def run(params):
+    cache = ArtifactCache(params['cache_dir'], params['offline'], params['timeout'], params['allow_unverified'])
+    artifacts = []
+    for artifact in params['artifacts']:
+        if not artifact.get('url'):
+            raise CacheError('every artifact needs a url')
+        artifact = dict(artifact, filename=artifact.get('filename') or artifact['url'].rstrip('/').rsplit('/', 1)[-1])
+        artifacts.append(cache.ensure(artifact))
+    return {'artifacts': artifacts, 'downloaded': [artifact['filename'] for artifact in artifacts
+                                                   if artifact['downloaded']], 'warnings': cache.warnings}
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            artifacts=dict(type='list', elements='dict', required=True),
+            cache_dir=dict(type='path', required=True),
+            offline=dict(type='bool', default=False),
+            timeout=dict(type='int', default=300),
+            allow_unverified=dict(type='bool', default=False),
+        ),
+        supports_check_mode=True,
+    )
+    try:
+        result = run(module.params)
+    except CacheError as e:
+        module.fail_json(msg=str(e))
+    for warning in result.pop('warnings'):
+        module.warn(warning)
+    module.exit_json(changed=bool(result['downloaded']), **result)
+
+
+if __name__ == '__main__':
+    main()
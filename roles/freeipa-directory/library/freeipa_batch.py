@@ -0,0 +1,283 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Provision FreeIPA groups, users and group memberships in batched JSON-RPC calls"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: freeipa_batch
+short_description: Create or delete many FreeIPA groups and users and add group members at once
+description:
+  - Logs in once and sends all changes as C(batch) calls to C(/ipa/session/json), I(batch_size) commands per request.
+    Groups are handled first, then users, then memberships, so one request can create a group and its members.
+  - Existing groups and users count as unchanged; their attributes and passwords are not updated.
+    Members are only added, never removed.
+  - In check mode, the same batching is used with C(group_show) and C(user_show) to report what would change.
+options:
+  url:
+    description: FreeIPA server base URL, e.g. C(https://ipa.example.com).
+    type: str
+    required: true
+  user:
+    description: Administrator to log in as.
+    type: str
+    default: admin
+  password:
+    description: Password of I(user).
+    type: str
+    required: true
+  groups:
+    description:
+      - Groups with C(name) and optional C(description), C(members) (user names) and C(state) (C(present) or C(absent)).
+    type: list
+    elements: dict
+    default: []
+  users:
+    description:
+      - Users with C(name), C(first), C(last) and optional C(email), C(password) (set on creation, expired at first
+        login as with C(ipa user-add --password)), C(groups) (group names) and C(state).
+    type: list
+    elements: dict
+    default: []
+  batch_size:
+    description: Commands per HTTP request.
+    type: int
+    default: 100
+  validate_certs:
+    description: Verify the FreeIPA TLS certificate.
+    type: bool
+    default: true
+  ca_path:
+    description: CA bundle to verify the certificate with, e.g. C(/etc/ipa/ca.crt).
+    type: path
+  timeout:
+    description: HTTP timeout in seconds.
+    type: int
+    default: 120
+'''
+
+EXAMPLES = r'''
+- name: Provision SonarQube users and groups
+  freeipa_batch:
+    url: https://ipa.freeipa.local
+    password: "{{ freeipa_admin_password }}"
+    ca_path: /etc/ipa/ca.crt
+    groups:
+      - name: sonar-users
+        description: SonarQube Users
+    users:
+      - name: sonar-dev
+        first: SonarQube
+        last: Developer
+        password: "{{ vault_freeipa_sonar_dev_password }}"
+        groups: [sonar-users]
+  register: freeipa_result
+  no_log: true
+'''
+
+RETURN = r'''
+groups:
+  description: Result per group name (C(created), C(exists), C(deleted) or C(absent)).
+  returned: always
+  type: dict
+  sample: {sonar-users: {changed: true, action: created}}
+users:
+  description: Result per user name.
+  returned: always
+  type: dict
+  sample: {sonar-dev: {changed: false, action: exists}}
+memberships:
+  description: Users added per group.
+  returned: always
+  type: dict
+  sample: {sonar-users: {changed: true, added: [sonar-dev]}}
+requests:
+  description: JSON-RPC requests sent (login not counted).
+  returned: always
+  type: int
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.freeipa_jsonrpc import (ALREADY_MEMBER, DUPLICATE_ENTRY, NOT_FOUND, FreeIPAClient,
+                                                  FreeIPAError, command)
+
+
+def validate(groups, users):
+    problems = []
+    for kind, items, required in (('group', groups, ('name',)), ('user', users, ('name', 'first', 'last'))):
+        for index, item in enumerate(items):
+            if item.get('state', 'present') not in ('present', 'absent'):
+                problems.append('%s %s: state must be present or absent' % (kind, item.get('name', index)))
+            needed = required if item.get('state', 'present') == 'present' else ('name',)
+            missing = [key for key in needed if not item.get(key)]
+            if missing:
+                problems.append('%s %s: missing %s' % (kind, item.get('name', index), ', '.join(missing)))
+    return problems
+
+
+def wanted_members(groups, users):
+    """Group name -> users to add, from the groups' members and the users' groups"""
+    members = {}
+    for group in groups:
+        if group.get('state', 'present') == 'present':
+            members.setdefault(group['name'], [])
+            for name in group.get('members') or []:
+                if name not in members[group['name']]:
+                    members[group['name']].append(name)
+    for user in users:
+        if user.get('state', 'present') == 'present':
+            for group in user.get('groups') or []:
+                if user['name'] not in members.setdefault(group, []):
+                    members[group].append(user['name'])
+    return dict((group, names) for group, names in members.items() if names)
+
+
+def user_options(user):
+    options = {'givenname': user['first'], 'sn': user['last']}
+    if user.get('email'):
+        options['mail'] = user['email']
+    if user.get('password'):
+        options['userpassword'] = user['password']
+    return options
+
+
+def plan(groups, users, members):
+    """Commands in execution order, each with the (kind, name) it reports on"""
+    steps = []
+    for group in groups:
+        if group.get('state', 'present') == 'present':
+            options = {'description': group['description']} if group.get('description') else {}
+            steps.append((('groups', group['name']), command('group_add', [group['name']], options)))
+    for user in users:
+        if user.get('state', 'present') == 'present':
+            steps.append((('users', user['name']), command('user_add', [user['name']], user_options(user))))
+        else:
+            steps.append((('users', user['name']), command('user_del', [user['name']])))
+    for group, names in members.items():
+        steps.append((('memberships', group), command('group_add_member', [group], {'user': names})))
+    # Groups go last so that their members are removed first
+    for group in groups:
+        if group.get('state', 'present') == 'absent':
+            steps.append((('groups', group['name']), command('group_del', [group['name']])))
+    return steps
+
+
+def not_members(result):
+    """Users group_add_member did not add, with the reason"""
+    failed = (result.get('failed') or {}).get('member', {}).get('user') or []
+    return dict((entry[0], entry[1]) for entry in failed)
+
+
+def interpret(step, result):
+    """(report, error) for one batch result"""
+    (_, name), call = step
+    method = call['method']
+    code = result.get('error_code')
+    if method == 'group_add_member':
+        if result.get('error'):
+            return None, '%s: %s' % (method, result['error'])
+        skipped = not_members(result)
+        errors = ['%s (%s)' % (user, reason) for user, reason in skipped.items() if reason != ALREADY_MEMBER]
+        added = [user for user in call['params'][1]['user'] if user not in skipped]
+        return {'changed': bool(added), 'added': added}, ('%s %s: cannot add %s' % (method, name, ', '.join(errors))
+                                                          if errors else None)
+    if method.endswith('_add'):
+        if not result.get('error'):
+            return {'changed': True, 'action': 'created'}, None
+        if code == DUPLICATE_ENTRY:
+            return {'changed': False, 'action': 'exists'}, None
+    else:
+        if not result.get('error'):
+            return {'changed': True, 'action': 'deleted'}, None
+        if code == NOT_FOUND:
+            return {'changed': False, 'action': 'absent'}, None
+    return None, '%s: %s' % (method, result['error'])
+
+
+def preview(client, groups, users, members, size):
+    """What apply would do, from group_show/user_show results"""
+    names = [('groups', group['name']) for group in groups]
+    names += [('groups', group) for group in members if group not in [group['name'] for group in groups]]
+    names += [('users', user['name']) for user in users]
+    results = client.batch([command('group_show' if kind == 'groups' else 'user_show', [name])
+                            for kind, name in names], size)
+    existing = {}
+    for (kind, name), result in zip(names, results):
+        if result.get('error') and result.get('error_code') != NOT_FOUND:
+            raise FreeIPAError('%s %s: %s' % (kind[:-1], name, result['error']))
+        existing[(kind, name)] = None if result.get('error') else result['result']
+
+    report = {'groups': {}, 'users': {}, 'memberships': {}}
+    for kind, items in (('groups', groups), ('users', users)):
+        for item in items:
+            found = existing[(kind, item['name'])] is not None
+            if item.get('state', 'present') == 'present':
+                report[kind][item['name']] = {'changed': not found, 'action': 'exists' if found else 'created'}
+            else:
+                report[kind][item['name']] = {'changed': found, 'action': 'deleted' if found else 'absent'}
+    for group, wanted in members.items():
+        current = (existing.get(('groups', group)) or {}).get('member_user') or []
+        added = [name for name in wanted if name not in current]
+        report['memberships'][group] = {'changed': bool(added), 'added': added}
+    return report
+
+
+def run(client, groups, users, size, check_mode):
+    members = wanted_members(groups, users)
+    if check_mode:
+        return preview(client, groups, users, members, size), []
+    steps = plan(groups, users, members)
+    results = client.batch([call for _, call in steps], size)
+    report = {'groups': {}, 'users': {}, 'memberships': {}}
+    errors = []
+    for step, result in zip(steps, results):
+        outcome, error = interpret(step, result)
+        (kind, name), _ = step
+        if outcome is not None:
+            report[kind][name] = outcome
+        if error:
+            errors.append(error)
+    return report, errors
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            url=dict(type='str', required=True),
+            user=dict(type='str', default='admin'),
+            password=dict(type='str', required=True, no_log=True),
+            groups=dict(type='list', elements='dict', default=[]),
+            users=dict(type='list', elements='dict', default=[]),
+            batch_size=dict(type='int', default=100),
+            validate_certs=dict(type='bool', default=True),
+            ca_path=dict(type='path'),
+            timeout=dict(type='int', default=120),
+        ),
+        supports_check_mode=True,
+    )
+    params = module.params
+    problems = validate(params['groups'], params['users'])
+    if problems:
+        module.fail_json(msg='invalid directory data: %s' % '; '.join(problems))
+
+    client = FreeIPAClient(params['url'], params['user'], params['password'], params['validate_certs'],
+                           params['ca_path'], params['timeout'])
+    try:
+        report, errors = run(client, params['groups'], params['users'], max(params['batch_size'], 1),
+                             module.check_mode)
+    except FreeIPAError as e:
+        module.fail_json(msg=str(e))
+    except Exception as e:
+        module.fail_json(msg='FreeIPA request failed: %s' % e)
+
+    changed = any(entry['changed'] for section in report.values() for entry in section.values())
+    if errors:
+        module.fail_json(msg='%d FreeIPA command(s) failed: %s' % (len(errors), '; '.join(errors)),
+                         changed=changed, requests=client.requests, **report)
+    module.exit_json(changed=changed, requests=client.requests, **report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Call the FreeIPA JSON-RPC API (/ipa/session/json)
+
+A FreeIPAClient logs in once with a password and reuses the session cookie
+for every call. batch() sends many commands per HTTP request through the
+server-side batch command; each command gets its own result or error.
+"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+
+from ansible.module_utils.urls import Request
+
+# ipalib error codes
+NOT_FOUND = 4001
+DUPLICATE_ENTRY = 4002
+ALREADY_MEMBER = 'This entry is already a member'
+
+
+class FreeIPAError(Exception):
+    def __init__(self, message, code=None):
+        super(FreeIPAError, self).__init__(message)
+        self.code = code
+
+
+def command(method, args=(), options=None):
+    """One entry of a batch call"""
+    return {'method': method, 'params': [list(args), options or {}]}
+
+
+class FreeIPAClient:
+    def __init__(self, url, user, password, validate_certs=True, ca_path=None, timeout=60):
+        self.url = url.rstrip('/')
+        self.user = user
+        self.password = password
+        self.request = Request(validate_certs=validate_certs, ca_path=ca_path, timeout=timeout, cookies=CookieJar(),
+                               http_agent='ansible-freeipa-batch')
+        # FreeIPA rejects API requests without a Referer below /ipa
+        self.headers = {'Referer': self.url + '/ipa', 'Accept': 'application/json'}
+        self.logged_in = False
+        self.requests = 0
+
+    def login(self):
+        try:
+            self.request.open('POST', self.url + '/ipa/session/login_password',
+                              data=urlencode({'user': self.user, 'password': self.password}),
+                              headers=dict(self.headers, **{'Content-Type': 'application/x-www-form-urlencoded',
+                                                            'Accept': 'text/plain'}))
+        except HTTPError as e:
+            raise FreeIPAError('login as %s failed: HTTP %s' % (self.user, e.code))
+        self.logged_in = True
+
+    def call(self, method, args=(), options=None):
+        if not self.logged_in:
+            self.login()
+        payload = json.dumps(dict(command(method, args, options), id=0))
+        headers = dict(self.headers, **{'Content-Type': 'application/json'})
+        try:
+            response = self.request.open('POST', self.url + '/ipa/session/json', data=payload, headers=headers)
+        except HTTPError as e:
+            if e.code != 401:
+                raise FreeIPAError('%s failed: HTTP %s' % (method, e.code))
+            # Session expired: log in again once
+            self.login()
+            response = self.request.open('POST', self.url + '/ipa/session/json', data=payload, headers=headers)
+        self.requests += 1
+        body = json.loads(response.read())
+        if body.get('error'):
+            error = body['error']
+            raise FreeIPAError('%s failed: %s' % (method, error.get('message', error)), error.get('code'))
+        return body['result']
+
+    def batch(self, commands, size=100):
+        """Run commands in order, size per request; returns one result dict per command"""
+        results = []
+        for start in range(0, len(commands), size):
+            results.extend(self.call('batch', commands[start:start + size])['results'])
+        return results
@@ -0,0 +1,312 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Resolve Jenkins plugins against an update-center snapshot and cache them"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: jenkins_plugin_resolve
+short_description: Resolve a Jenkins plugin list and fill a checksum-verified download cache
+description:
+  - Resolves the transitive dependency graph of a declarative plugin list from an update-center snapshot.
+  - Downloads missing plugin files in parallel into a local cache, verifying the update-center SHA-256.
+  - Runs where the cache lives (normally the Ansible controller); the cache can be reused offline.
+options:
+  plugins:
+    description: Plugins to install, as C(name), C(name:version) or dicts with C(name) and optional C(version).
+    type: list
+    elements: raw
+    required: true
+  cache_dir:
+    description: Directory holding the update-center snapshot and downloaded plugins.
+    type: path
+    required: true
+  update_center_url:
+    description: Update-center JSON (not JSONP) with the latest version of every plugin.
+    type: str
+    default: https://updates.jenkins.io/update-center.actual.json
+  plugin_versions_url:
+    description: Plugin version history, fetched only when a pinned version is not the latest.
+    type: str
+    default: https://updates.jenkins.io/current/plugin-versions.json
+  snapshot_max_age:
+    description: Seconds before a cached snapshot is refreshed.
+    type: int
+    default: 86400
+  offline:
+    description: Never use the network; fail if a snapshot or plugin file is missing from the cache.
+    type: bool
+    default: false
+  include_optional:
+    description: Also install optional dependencies.
+    type: bool
+    default: false
+  parallel:
+    description: Number of concurrent downloads.
+    type: int
+    default: 8
+  timeout:
+    description: Network timeout in seconds.
+    type: int
+    default: 60
+'''
+
+EXAMPLES = r'''
+- name: Resolve plugins on the controller
+  jenkins_plugin_resolve:
+    plugins:
+      - oic-auth
+      - name: configuration-as-code
+        version: "1850.va_a_8c31d3158b_"
+    cache_dir: "{{ lookup('env', 'HOME') }}/.cache/jenkins-plugins"
+  delegate_to: localhost
+  run_once: true
+  register: resolved
+'''
+
+RETURN = r'''
+plugins:
+  description: Every plugin to install, requested and transitive, sorted by name.
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - name: oic-auth
+      version: "4.239.v325750a_96f3b_"
+      path: /home/user/.cache/jenkins-plugins/plugins/oic-auth/4.239.v325750a_96f3b_/oic-auth.hpi
+      sha256: 3f1b...
+      checksum: 9c2a...
+      requested: true
+      required_by: []
+downloaded:
+  description: Plugins downloaded by this run.
+  returned: always
+  type: list
+  elements: str
+'''
+
+import base64
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import open_url
+
+
+class ResolveError(Exception):
+    pass
+
+
+def version_key(version):
+    """Sortable key for Jenkins plugin versions (1.10 > 1.9, 2.0 > 2.0-beta-1)"""
+    key = []
+    for token in re.split(r'[.\-_+]', str(version)):
+        if token.isdigit():
+            key.append((2, int(token), ''))
+        elif token:
+            key.append((1, 0, token))
+    # A release sorts after its pre-releases: '2.0' > '2.0-rc1'
+    key.append((1.5, 0, ''))
+    return key
+
+
+def parse_requests(plugins):
+    requests = {}
+    for item in plugins:
+        if isinstance(item, dict):
+            name, version = item['name'], item.get('version')
+        else:
+            name, _, version = str(item).partition(':')
+        if version in ('', 'latest', None):
+            version = None
+        requests[name.strip()] = version
+    return requests
+
+
+def resolve(requests, update_center, versions_lookup, include_optional=False):
+    """Walk the dependency graph; return {name: plugin spec} with versions satisfying every constraint"""
+    catalog = update_center['plugins']
+    minimums = {}
+    required_by = {}
+    resolved = {}
+    queue = list(requests)
+    while queue:
+        name = queue.pop(0)
+        if name not in catalog and name not in requests:
+            raise ResolveError('plugin %s is not in the update center' % name)
+        pinned = requests.get(name)
+        wanted = pinned or (catalog[name]['version'] if name in catalog else None)
+        if wanted is None:
+            raise ResolveError('plugin %s is not in the update center and has no pinned version' % name)
+        if name in minimums and version_key(wanted) < version_key(minimums[name]):
+            if pinned:
+                raise ResolveError('%s %s is pinned but %s requires at least %s'
+                                   % (name, pinned, ', '.join(sorted(required_by[name])), minimums[name]))
+            wanted = minimums[name]
+        if name in resolved and resolved[name]['version'] == wanted:
+            continue
+        if name in catalog and catalog[name]['version'] == wanted:
+            spec = catalog[name]
+        else:
+            spec = versions_lookup(name, wanted)
+        resolved[name] = {
+            'name': name,
+            'version': spec['version'],
+            'url': spec['url'],
+            'sha256': spec.get('sha256'),
+            'required_core': spec.get('requiredCore'),
+            'requested': name in requests,
+            'required_by': sorted(required_by.get(name, ())),
+        }
+        for dependency in spec.get('dependencies', []):
+            if dependency.get('optional') and not include_optional:
+                continue
+            dep = dependency['name']
+            required_by.setdefault(dep, set()).add(name)
+            if dep not in minimums or version_key(dependency['version']) > version_key(minimums[dep]):
+                minimums[dep] = dependency['version']
+            current = resolved.get(dep)
+            if current is None or version_key(current['version']) < version_key(minimums[dep]):
+                queue.append(dep)
+    for name, plugin in resolved.items():
+        plugin['required_by'] = sorted(required_by.get(name, ()))
+    return resolved
+
+
+def file_digests(path):
+    sha256, sha1 = hashlib.sha256(), hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            sha256.update(block)
+            sha1.update(block)
+    return base64.b64encode(sha256.digest()).decode(), sha1.hexdigest()
+
+
+class PluginCache:
+    """Update-center snapshots and plugin files under one directory"""
+
+    def __init__(self, cache_dir, offline=False, max_age=86400, timeout=60):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.max_age = max_age
+        self.timeout = timeout
+        self.warnings = []
+        os.makedirs(os.path.join(cache_dir, 'plugins'), exist_ok=True)
+
+    def fetch(self, url, dest):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix='.download-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                response = open_url(url, timeout=self.timeout, follow_redirects='all',
+                                    http_agent='ansible-jenkins-plugin-resolve')
+                shutil.copyfileobj(response, handle, 1 << 20)
+            os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def snapshot(self, url, filename):
+        path = os.path.join(self.cache_dir, filename)
+        fresh = os.path.exists(path) and time.time() - os.path.getmtime(path) < self.max_age
+        if not fresh and not self.offline:
+            try:
+                self.fetch(url, path)
+            except Exception as e:
+                if not os.path.exists(path):
+                    raise ResolveError('cannot download %s: %s' % (url, e))
+                self.warnings.append('using cached %s, refresh failed: %s' % (filename, e))
+        if not os.path.exists(path):
+            raise ResolveError('%s is not cached and offline mode is enabled' % filename)
+        with open(path) as handle:
+            text = handle.read()
+        # Accept the JSONP flavour (update-center.json) as well
+        if text.startswith('updateCenter.post('):
+            text = text[len('updateCenter.post('):text.rstrip().rindex(')')]
+        return json.loads(text)
+
+    def plugin_path(self, plugin):
+        return os.path.join(self.cache_dir, 'plugins', plugin['name'], plugin['version'], plugin['name'] + '.hpi')
+
+    def ensure(self, plugin):
+        """Make sure the plugin file is cached and matches its checksum; return True if downloaded"""
+        path = self.plugin_path(plugin)
+        if os.path.exists(path):
+            sha256, sha1 = file_digests(path)
+            if plugin['sha256'] in (None, sha256):
+                plugin.update(path=path, sha256=sha256, checksum=sha1)
+                return False
+            os.unlink(path)
+        if self.offline:
+            raise ResolveError('%s %s is not cached and offline mode is enabled' % (plugin['name'], plugin['version']))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            self.fetch(plugin['url'], path)
+        except Exception as e:
+            raise ResolveError('cannot download %s %s from %s: %s' % (plugin['name'], plugin['version'], plugin['url'], e))
+        sha256, sha1 = file_digests(path)
+        if plugin['sha256'] and sha256 != plugin['sha256']:
+            os.unlink(path)
+            raise ResolveError('checksum mismatch for %s %s: expected %s, got %s'
+                               % (plugin['name'], plugin['version'], plugin['sha256'], sha256))
+        plugin.update(path=path, sha256=sha256, checksum=sha1)
+        return True
+
+
+def run(params):
+    cache = PluginCache(params['cache_dir'], params['offline'], params['snapshot_max_age'], params['timeout'])
+    requests = parse_requests(params['plugins'])
+    update_center = cache.snapshot(params['update_center_url'], 'update-center.json')
+    history = {}
+
+    def versions_lookup(name, version):
+        if not history:
+            history.update(cache.snapshot(params['plugin_versions_url'], 'plugin-versions.json')['plugins'])
+        try:
+            return history[name][version]
+        except KeyError:
+            raise ResolveError('%s %s is not in the plugin version history' % (name, version))
+
+    resolved = resolve(requests, update_center, versions_lookup, params['include_optional'])
+    with ThreadPoolExecutor(max_workers=max(1, params['parallel'])) as pool:
+        downloaded = [plugin['name'] for plugin, fetched in
+                      zip(resolved.values(), pool.map(cache.ensure, resolved.values())) if fetched]
+    plugins = sorted(resolved.values(), key=lambda plugin: plugin['name'])
+    for plugin in plugins:
+        plugin.pop('url')
+    return {'plugins': plugins, 'downloaded': sorted(downloaded), 'warnings': cache.warnings}
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            plugins=dict(type='list', elements='raw', required=True),
+            cache_dir=dict(type='path', required=True),
+            update_center_url=dict(type='str', default='https://updates.jenkins.io/update-center.actual.json'),
+            plugin_versions_url=dict(type='str', default='https://updates.jenkins.io/current/plugin-versions.json'),
+            snapshot_max_age=dict(type='int', default=86400),
+            offline=dict(type='bool', default=False),
+            include_optional=dict(type='bool', default=False),
+            parallel=dict(type='int', default=8),
+            timeout=dict(type='int', default=60),
+        ),
+        supports_check_mode=True,
+    )
+    try:
+        result = run(module.params)
+    except ResolveError as e:
+        module.fail_json(msg=str(e))
+    for warning in result.pop('warnings'):
+        module.warn(warning)
+    module.exit_json(changed=bool(result['downloaded']), **result)
+
+
+if __name__ == '__main__':
+    main()
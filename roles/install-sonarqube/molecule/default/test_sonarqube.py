@@ -1,6 +1,7 @@
 """
 Molecule tests for install-sonarqube role
 """
+import importlib.util
 import os
 import testinfra.utils.ansible_runner
 
@@ -8,6 +9,12 @@ import testinfra.utils.ansible_runner
 testinfra_hosts = testinfra.utils.ansible_runner.AnsibleRunner(
     os.environ['MOLECULE_INVENTORY_FILE']).get_hosts('all')
 
+READINESS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..',
+                         'service-readiness', 'module_utils', 'readiness.py')
+spec = importlib.util.spec_from_file_location('readiness', READINESS)
+readiness = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(readiness)
+
 
 def test_java_is_installed(host):
     """Test that Java is installed"""
@@ -111,9 +118,9 @@ def test_system_parameters_are_set(host):
 
 def test_sonarqube_is_accessible(host):
     """Test that SonarQube web interface is accessible"""
-    # Wait a bit for SonarQube to fully start
-    import time
-    time.sleep(60)  # SonarQube takes longer to start than Jenkins
+    fetch = readiness.curl_fetch(lambda command: host.run(command).stdout)
+    results = readiness.wait_until([readiness.sonarqube("http://localhost:9000", fetch=fetch)], timeout=600)
+    assert results["sonarqube"]["ready"], results
 
     # Test HTTP response
     response = host.run("curl -s -o /dev/null -w '%{http_code}' http://localhost:9000")
@@ -142,3 +149,25 @@ def test_postgresql_sonarqube_database_exists(host):
     # We'll just check if the database configuration is present
     config_file = host.file("/opt/sonarqube/conf/sonar.properties")
     assert config_file.contains("sonar.jdbc.url=jdbc:postgresql://localhost/sonarqube")
+
+
+def test_sonarqube_process_tuning(host):
+    """Test that heaps, CE workers and Tomcat threads come from the tuning profile"""
+    config_file = host.file("/opt/sonarqube/conf/sonar.properties")
+    for key in ("sonar.web.javaOpts=-Xmx", "sonar.ce.javaOpts=-Xmx", "sonar.search.javaOpts=-Xmx",
+                "sonar.ce.workerCount=", "sonar.web.http.maxThreads=", "sonar.web.http.acceptCount="):
+        assert config_file.contains(key)
+    assert not config_file.contains("sonar.search.javaOpts=-Xmx512m -Xms512m -XX:\\+HeapDumpOnOutOfMemoryError")
+
+
+def test_postgresql_performance_profile(host):
+    """Test that the PostgreSQL profile is included and the JDBC pool fits max_connections"""
+    assert host.file("/var/lib/pgsql/data/postgresql.conf").contains("^include_dir = 'conf.d'")
+    profile = host.file("/var/lib/pgsql/data/conf.d/sonarqube.conf")
+    assert profile.exists
+    assert profile.user == "postgres"
+    assert profile.contains("^effective_cache_size = ")
+    assert profile.contains("^random_page_cost = 1.1")
+    settings = host.run("sudo -u postgres psql -Atc 'SHOW max_connections' -c 'SHOW random_page_cost'")
+    assert settings.stdout.split() == ["100", "1.1"]
+    assert host.file("/opt/sonarqube/conf/sonar.properties").contains("^sonar.jdbc.maxActive=45")
@@ -1,6 +1,7 @@
 """
 Molecule tests for install-ssl-cert role
 """
+import importlib.util
 import os
 import testinfra.utils.ansible_runner
 
@@ -8,6 +9,12 @@ import testinfra.utils.ansible_runner
 testinfra_hosts = testinfra.utils.ansible_runner.AnsibleRunner(
     os.environ['MOLECULE_INVENTORY_FILE']).get_hosts('ssl-nginx-rocky9')
 
+READINESS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..',
+                         'service-readiness', 'module_utils', 'readiness.py')
+spec = importlib.util.spec_from_file_location('readiness', READINESS)
+readiness = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(readiness)
+
 
 def test_openssl_is_installed(host):
     """Test that OpenSSL is installed"""
@@ -132,24 +139,21 @@ def test_ssl_certificate_subject_alt_names(host):
 
 def test_https_response(host):
     """Test that HTTPS endpoint responds"""
-    import time
-    time.sleep(5)  # Wait for services to be ready
-
-    # Test HTTPS response (self-signed, so use -k)
-    result = host.run("curl -k -s -o /dev/null -w '%{http_code}' https://localhost")
-    # Should get some response (200, 502, 503 are acceptable)
-    assert result.stdout in ["200", "502", "503"]
+    fetch = readiness.curl_fetch(lambda command: host.run(command).stdout)
+    # Should get some response (200, 502, 503 are acceptable); self-signed, so no verification
+    https = readiness.HttpCondition("https", "https://localhost", status_code=(200, 502, 503),
+                                    validate_certs=False, fetch=fetch)
+    results = readiness.wait_until([https], timeout=60)
+    assert results["https"]["ready"], results
 
 
 def test_http_redirects_to_https(host):
     """Test that HTTP requests redirect to HTTPS"""
-    import time
-    time.sleep(5)  # Wait for services to be ready
-
-    # Test HTTP redirect
-    result = host.run("curl -s -o /dev/null -w '%{http_code}' http://localhost")
+    fetch = readiness.curl_fetch(lambda command: host.run(command).stdout)
     # Should redirect (301) or be unavailable due to SSL-only config
-    assert result.stdout in ["301", "200", "502", "503"]
+    http = readiness.HttpCondition("http", "http://localhost", status_code=(301, 200, 502, 503), fetch=fetch)
+    results = readiness.wait_until([http], timeout=60)
+    assert results["http"]["ready"], results
 
 
 def test_dhparam_strength(host):
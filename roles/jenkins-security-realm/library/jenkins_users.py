@@ -0,0 +1,268 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Provision Jenkins local users, API tokens and permissions in one script-console call"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: jenkins_users
+short_description: Create or update many Jenkins users, API tokens and global permissions at once
+description:
+  - Sends one Groovy script with all users as a JSON payload to the script console; Jenkins creates or updates
+    every account, generates missing API tokens, grants global matrix permissions and saves its configuration once.
+  - Users are created in the built-in user database when it is the security realm; with other realms (OIDC, SAML)
+    a user record is created so that API tokens and permissions can be attached, and passwords are ignored.
+  - Permissions are granted only with a matrix authorization strategy (matrix-auth plugin) and never revoked.
+options:
+  url:
+    description: Jenkins base URL.
+    type: str
+    required: true
+  user:
+    description: Administrator used for the script console.
+    type: str
+  password:
+    description: API token or password of I(user).
+    type: str
+  users:
+    description:
+      - Accounts with C(username) and optional C(password), C(full_name), C(email), C(api_tokens) (token names),
+        C(permissions) (ids like C(hudson.model.Hudson.Administer) or titles like C(Overall/Read))
+        and C(state) (C(present) or C(absent)).
+    type: list
+    elements: dict
+    required: true
+  update_password:
+    description: C(on_create) sets passwords for new users only; C(always) also resets differing passwords.
+    type: str
+    choices: [on_create, always]
+    default: on_create
+  validate_certs:
+    description: Verify the Jenkins TLS certificate.
+    type: bool
+    default: true
+  timeout:
+    description: HTTP timeout in seconds.
+    type: int
+    default: 120
+'''
+
+EXAMPLES = r'''
+- name: Provision break-glass and service accounts
+  jenkins_users:
+    url: http://localhost:8080
+    user: admin
+    password: "{{ vault_jenkins_admin_api_token }}"
+    users:
+      - username: breakglass
+        password: "{{ vault_jenkins_breakglass_password }}"
+        permissions: [Overall/Administer]
+      - username: svc-deploy
+        api_tokens: [deploy-pipeline]
+        permissions: [Overall/Read, Job/Build]
+  register: jenkins_users_result
+  no_log: true
+'''
+
+RETURN = r'''
+users:
+  description: Result per username.
+  returned: always
+  type: dict
+  sample:
+    svc-deploy:
+      created: true
+      changed: [account, api_token:deploy-pipeline, permission:hudson.model.Item.Build]
+      tokens:
+        deploy-pipeline: 11a2b3c4...
+      skipped: []
+saved:
+  description: Whether Jenkins.save() ran (permissions changed).
+  returned: always
+  type: bool
+'''
+
+import json
+from urllib.error import HTTPError
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.jenkins_script_console import ScriptConsole, encode
+
+# %-formatted: payload is base64 JSON, apply is true/false
+SCRIPT = '''
+import groovy.json.JsonOutput
+import groovy.json.JsonSlurper
+import hudson.model.User
+import hudson.security.HudsonPrivateSecurityRealm
+import hudson.security.Permission
+import jenkins.model.Jenkins
+import jenkins.security.ApiTokenProperty
+
+def jenkins = Jenkins.get()
+def payload = new JsonSlurper().parseText(new String('%(payload)s'.decodeBase64(), 'UTF-8'))
+def apply = %(apply)s
+def realm = jenkins.securityRealm
+def strategy = jenkins.authorizationStrategy
+def privateRealm = realm instanceof HudsonPrivateSecurityRealm
+def matrix = strategy.class.name.contains('Matrix')
+def loader = jenkins.pluginManager.uberClassLoader
+
+def permissionFor = { String id ->
+    id.contains('/') ? Permission.all.find { "${it.group.title}/${it.name}".toString() == id } : Permission.fromId(id)
+}
+def sidFor = { String name ->
+    try {
+        Class.forName('org.jenkinsci.plugins.matrixauth.PermissionEntry', true, loader).user(name)
+    } catch (ClassNotFoundException e) {
+        name
+    }
+}
+def mailerProperty = null
+try {
+    mailerProperty = Class.forName('hudson.tasks.Mailer$UserProperty', true, loader)
+} catch (ClassNotFoundException e) {
+}
+
+def results = [:]
+def strategyChanged = false
+payload.users.each { spec ->
+    def result = [created: false, changed: [], tokens: [:], skipped: []]
+    results[spec.username] = result
+    def user = User.getById(spec.username, false)
+
+    if (spec.state == 'absent') {
+        if (user != null) {
+            result.changed << 'deleted'
+            if (apply) {
+                user.delete()
+            }
+        }
+        return
+    }
+
+    if (user == null || (privateRealm && user.getProperty(HudsonPrivateSecurityRealm.Details) == null)) {
+        result.created = true
+        result.changed << 'account'
+        if (!apply) {
+            return
+        }
+        def password = spec.password ?: UUID.randomUUID().toString()
+        user = privateRealm ? realm.createAccount(spec.username, password) : User.getById(spec.username, true)
+    } else if (spec.password && privateRealm && payload.update_password == 'always'
+               && !user.getProperty(HudsonPrivateSecurityRealm.Details).isPasswordCorrect(spec.password)) {
+        result.changed << 'password'
+        if (apply) {
+            user.addProperty(HudsonPrivateSecurityRealm.Details.fromPlainPassword(spec.password))
+        }
+    }
+    if (spec.password && !privateRealm) {
+        result.skipped << 'password: security realm does not store passwords'
+    }
+
+    if (spec.full_name && user.fullName != spec.full_name) {
+        result.changed << 'full_name'
+        if (apply) {
+            user.fullName = spec.full_name
+        }
+    }
+    if (spec.email) {
+        if (mailerProperty == null) {
+            result.skipped << 'email: mailer plugin not installed'
+        } else if (user.getProperty(mailerProperty)?.address != spec.email) {
+            result.changed << 'email'
+            if (apply) {
+                user.addProperty(mailerProperty.newInstance(spec.email))
+            }
+        }
+    }
+
+    def tokenProperty = user.getProperty(ApiTokenProperty)
+    def existingTokens = tokenProperty ? tokenProperty.tokenList*.name : []
+    (spec.api_tokens ?: []).each { name ->
+        if (!existingTokens.contains(name)) {
+            result.changed << "api_token:${name}".toString()
+            if (apply) {
+                if (tokenProperty == null) {
+                    tokenProperty = new ApiTokenProperty()
+                    user.addProperty(tokenProperty)
+                }
+                result.tokens[name] = tokenProperty.tokenStore.generateNewToken(name).plainValue
+            }
+        }
+    }
+
+    (spec.permissions ?: []).each { id ->
+        def permission = permissionFor(id)
+        if (permission == null) {
+            result.skipped << "permission ${id}: unknown".toString()
+        } else if (!matrix) {
+            result.skipped << "permission ${id}: authorization strategy is not matrix based".toString()
+        } else if (!strategy.hasExplicitPermission(sidFor(spec.username), permission)) {
+            result.changed << "permission:${permission.id}".toString()
+            strategyChanged = true
+            if (apply) {
+                strategy.add(permission, sidFor(spec.username))
+            }
+        }
+    }
+
+    if (apply && result.changed) {
+        user.save()
+    }
+}
+
+// One save for the whole batch: users are stored in their own files, the
+// authorization strategy lives in config.xml
+if (apply && strategyChanged) {
+    jenkins.save()
+}
+println JsonOutput.toJson([users: results, saved: apply && strategyChanged])
+'''
+
+USER_KEYS = ('username', 'password', 'full_name', 'email', 'api_tokens', 'permissions', 'state')
+
+
+def build_script(users, update_password, apply):
+    payload = {'users': [dict((key, user[key]) for key in USER_KEYS if user.get(key) is not None) for user in users],
+               'update_password': update_password}
+    return SCRIPT % {'payload': encode(json.dumps(payload)), 'apply': 'true' if apply else 'false'}
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            url=dict(type='str', required=True),
+            user=dict(type='str'),
+            password=dict(type='str', no_log=True),
+            users=dict(type='list', elements='dict', required=True),
+            update_password=dict(type='str', choices=['on_create', 'always'], default='on_create'),
+            validate_certs=dict(type='bool', default=True),
+            timeout=dict(type='int', default=120),
+        ),
+        supports_check_mode=True,
+    )
+    params = module.params
+    missing = [index for index, user in enumerate(params['users']) if not user.get('username')]
+    if missing:
+        module.fail_json(msg='users at positions %s have no username' % missing)
+
+    console = ScriptConsole(params['url'], params['user'], params['password'], params['validate_certs'],
+                            params['timeout'])
+    try:
+        result = console.run_json(build_script(params['users'], params['update_password'], not module.check_mode))
+    except HTTPError as e:
+        module.fail_json(msg='script console request failed: HTTP %s (an administrator API token is required)'
+                         % e.code)
+    except ValueError as e:
+        module.fail_json(msg='script console error: %s' % e)
+    except Exception as e:
+        module.fail_json(msg='cannot reach %s: %s' % (params['url'], e))
+
+    changed = any(user['changed'] for user in result['users'].values())
+    module.exit_json(changed=changed, **result)
+
+
+if __name__ == '__main__':
+    main()
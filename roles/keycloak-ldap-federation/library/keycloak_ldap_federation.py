@@ -0,0 +1,338 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Create or update a Keycloak LDAP user federation provider by name and run an incremental sync"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: keycloak_ldap_federation
+short_description: Keep one Keycloak LDAP user federation provider and its mappers in the wanted state
+description:
+  - Looks the provider up by I(name) in the realm's user storage components. It is created when missing and updated
+    in place when its configuration differs; further providers with the same name (left by older runs that always
+    POSTed) are deleted.
+  - Mappers are matched by name below the provider and created or updated the same way.
+    Mappers Keycloak adds on its own are left alone.
+  - Syncs with C(triggerChangedUsersSync) by default, which only reads entries modified since the last sync.
+    A full sync runs when the provider was created or duplicates were removed, or when I(sync=full).
+  - In check mode nothing is written and no sync runs.
+options:
+  base_url:
+    description: Keycloak base URL, e.g. C(http://keycloak.local:8080).
+    type: str
+    required: true
+  realm:
+    description: Realm the provider belongs to.
+    type: str
+    required: true
+  admin_user:
+    description: Administrator of the master realm.
+    type: str
+    default: admin
+  admin_password:
+    description: Password of I(admin_user).
+    type: str
+    required: true
+  name:
+    description: Display name of the provider; used to find it.
+    type: str
+    required: true
+  config:
+    description:
+      - Provider configuration (C(connectionUrl), C(usersDn), C(batchSizeForSync), ...).
+        Values may be scalars or lists; they are compared as lists of strings.
+    type: dict
+    required: true
+  mappers:
+    description: Mappers with C(name), C(providerId) and C(config).
+    type: list
+    elements: dict
+    default: []
+  update_credential:
+    description:
+      - C(on_create) sets C(bindCredential) only when the provider is created; Keycloak never returns it, so it
+        cannot be compared. C(always) sends it on every run, which always reports a change.
+    type: str
+    choices: [always, on_create]
+    default: on_create
+  sync:
+    description:
+      - C(auto) runs a full sync after creation or duplicate removal and a changed-users sync otherwise.
+        C(none) only applies the configuration.
+    type: str
+    choices: [auto, changed, full, none]
+    default: auto
+  validate_certs:
+    description: Verify the Keycloak TLS certificate.
+    type: bool
+    default: true
+  timeout:
+    description: HTTP timeout in seconds; a full sync of a large directory is a single long request.
+    type: int
+    default: 1800
+'''
+
+EXAMPLES = r'''
+- name: Configure FreeIPA user federation
+  keycloak_ldap_federation:
+    base_url: http://keycloak.local:8080
+    realm: sonar
+    admin_password: "{{ keycloak_admin_password }}"
+    name: FreeIPA LDAP
+    config:
+      vendor: rhds
+      connectionUrl: ldap://freeipa.local:389
+      usersDn: cn=users,cn=accounts,dc=freeipa,dc=local
+      bindDn: uid=keycloak-bind,cn=users,cn=accounts,dc=freeipa,dc=local
+      bindCredential: "{{ vault_freeipa_keycloak_bind_password }}"
+      batchSizeForSync: 500
+    mappers:
+      - name: group-ldap-mapper
+        providerId: group-ldap-mapper
+        config:
+          groups.dn: cn=groups,cn=accounts,dc=freeipa,dc=local
+  register: federation
+  no_log: true
+'''
+
+RETURN = r'''
+id:
+  description: Component ID of the provider.
+  returned: always
+  type: str
+action:
+  description: C(created), C(updated) or C(unchanged).
+  returned: always
+  type: str
+changed_keys:
+  description: Configuration keys that differed.
+  returned: always
+  type: list
+duplicates_removed:
+  description: IDs of further providers with the same name that were deleted.
+  returned: always
+  type: list
+mappers:
+  description: Action per mapper name.
+  returned: always
+  type: dict
+  sample: {group-ldap-mapper: created}
+sync:
+  description: Sync mode, duration in seconds and Keycloak's counts; mode is C(none) when no sync ran.
+  returned: always
+  type: dict
+  sample: {mode: changed, seconds: 0.42, added: 3, updated: 1, removed: 0, failed: 0, ignored: false,
+           status: "3 imported users, 1 updated users"}
+'''
+
+import json
+import time
+from urllib.error import HTTPError
+from urllib.parse import quote, urlencode
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import Request
+
+PROVIDER_TYPE = 'org.keycloak.storage.UserStorageProvider'
+MAPPER_TYPE = 'org.keycloak.storage.ldap.mappers.LDAPStorageMapper'
+# Keycloak masks secrets in component representations and keeps the stored value when this is sent back
+SECRET_VALUE = '**********'
+SECRETS = ('bindCredential',)
+SYNC_ACTIONS = {'full': 'triggerFullSync', 'changed': 'triggerChangedUsersSync'}
+
+
+class KeycloakError(Exception):
+    pass
+
+
+class KeycloakAdmin:
+    def __init__(self, base_url, realm, user, password, validate_certs=True, timeout=1800):
+        self.base_url = base_url.rstrip('/')
+        self.realm = realm
+        self.user = user
+        self.password = password
+        self.request = Request(validate_certs=validate_certs, timeout=timeout, http_agent='ansible-keycloak-ldap')
+        self.token = None
+
+    def login(self):
+        try:
+            response = self.request.open('POST', self.base_url + '/realms/master/protocol/openid-connect/token',
+                                         data=urlencode({'grant_type': 'password', 'client_id': 'admin-cli',
+                                                         'username': self.user, 'password': self.password}),
+                                         headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        except HTTPError as e:
+            raise KeycloakError('login as %s failed: HTTP %s' % (self.user, e.code))
+        self.token = json.loads(response.read())['access_token']
+
+    def call(self, method, path, body=None):
+        """JSON response (or the Location header of a 201) of an admin API call below the realm"""
+        if self.token is None:
+            self.login()
+        url = '%s/admin/realms/%s%s' % (self.base_url, quote(self.realm), path)
+        data = json.dumps(body) if body is not None else None
+        for attempt in range(2):
+            headers = {'Authorization': 'Bearer ' + self.token, 'Accept': 'application/json'}
+            if data is not None:
+                headers['Content-Type'] = 'application/json'
+            try:
+                response = self.request.open(method, url, data=data, headers=headers)
+                break
+            except HTTPError as e:
+                if e.code == 401 and attempt == 0:
+                    # Admin tokens live for a minute; a long sync can outlast the first one
+                    self.login()
+                    continue
+                detail = e.read().decode('utf-8', 'replace')[:500]
+                raise KeycloakError('%s %s failed: HTTP %s %s' % (method, path, e.code, detail))
+        if response.status == 201:
+            return response.headers.get('Location', '').rstrip('/').rsplit('/', 1)[-1]
+        content = response.read()
+        return json.loads(content) if content else None
+
+    def components(self, **query):
+        return self.call('GET', '/components?' + urlencode(query)) or []
+
+
+def normalize(config):
+    """Component config as Keycloak stores it: every value a list of strings"""
+    result = {}
+    for key, value in (config or {}).items():
+        values = value if isinstance(value, list) else [value]
+        result[key] = [str(item).lower() if isinstance(item, bool) else '' if item is None else str(item)
+                       for item in values]
+    return result
+
+
+def differences(wanted, current, skip=()):
+    return sorted(key for key, value in wanted.items() if key not in skip and current.get(key) != value)
+
+
+def ensure_mappers(client, parent, mappers, check_mode):
+    existing = dict((mapper['name'], mapper) for mapper in client.components(parent=parent, type=MAPPER_TYPE))
+    actions = {}
+    for mapper in mappers:
+        config = normalize(mapper.get('config'))
+        current = existing.get(mapper['name'])
+        if current is None:
+            actions[mapper['name']] = 'created'
+            if not check_mode:
+                client.call('POST', '/components', {'name': mapper['name'], 'providerId': mapper['providerId'],
+                                                    'providerType': MAPPER_TYPE, 'parentId': parent,
+                                                    'config': config})
+        elif current.get('providerId') != mapper['providerId'] or differences(config, current.get('config', {})):
+            actions[mapper['name']] = 'updated'
+            if not check_mode:
+                client.call('PUT', '/components/' + current['id'],
+                            dict(current, providerId=mapper['providerId'],
+                                 config=dict(current.get('config', {}), **config)))
+        else:
+            actions[mapper['name']] = 'unchanged'
+    return actions
+
+
+def run_sync(client, component, mode):
+    start = time.monotonic()
+    result = client.call('POST', '/user-storage/%s/sync?action=%s' % (component, SYNC_ACTIONS[mode])) or {}
+    report = {'mode': mode, 'seconds': round(time.monotonic() - start, 3)}
+    for key in ('added', 'updated', 'removed', 'failed'):
+        report[key] = int(result.get(key) or 0)
+    report['ignored'] = bool(result.get('ignored'))
+    report['status'] = result.get('status', '')
+    return report
+
+
+def apply(client, name, config, mappers, update_credential, sync, check_mode):
+    wanted = normalize(config)
+    found = [component for component in client.components(type=PROVIDER_TYPE, name=name)
+             if component.get('name') == name]
+    result = {'changed_keys': [], 'duplicates_removed': [], 'mappers': {}}
+
+    if not found:
+        result['action'] = 'created'
+        result['changed_keys'] = sorted(wanted)
+        if check_mode:
+            result['id'] = ''
+            result['mappers'] = dict((mapper['name'], 'created') for mapper in mappers)
+        else:
+            realm = client.call('GET', '')
+            result['id'] = client.call('POST', '/components', {'name': name, 'providerId': 'ldap',
+                                                               'providerType': PROVIDER_TYPE,
+                                                               'parentId': realm['id'], 'config': wanted})
+    else:
+        current = found[0]
+        result['id'] = current['id']
+        result['duplicates_removed'] = [component['id'] for component in found[1:]]
+        if not check_mode:
+            for duplicate in result['duplicates_removed']:
+                client.call('DELETE', '/components/' + duplicate)
+        skip = SECRETS if update_credential == 'on_create' else ()
+        result['changed_keys'] = differences(wanted, current.get('config', {}), skip)
+        if update_credential == 'always':
+            result['changed_keys'] = sorted(set(result['changed_keys']) | set(k for k in SECRETS if k in wanted))
+        result['action'] = 'updated' if result['changed_keys'] else 'unchanged'
+        if result['changed_keys'] and not check_mode:
+            merged = dict(current.get('config', {}), **wanted)
+            for key in skip:
+                if key in merged:
+                    merged[key] = [SECRET_VALUE]
+            client.call('PUT', '/components/' + current['id'], dict(current, config=merged))
+
+    if result['id']:
+        result['mappers'] = ensure_mappers(client, result['id'], mappers, check_mode)
+
+    mode = sync
+    if sync == 'auto':
+        mode = 'full' if result['action'] == 'created' or result['duplicates_removed'] else 'changed'
+    if mode == 'none' or check_mode:
+        result['sync'] = {'mode': 'none', 'planned': mode}
+    else:
+        result['sync'] = run_sync(client, result['id'], mode)
+
+    result['changed'] = (result['action'] != 'unchanged' or bool(result['duplicates_removed'])
+                         or any(action != 'unchanged' for action in result['mappers'].values())
+                         or any(result['sync'].get(key) for key in ('added', 'updated', 'removed')))
+    return result
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            base_url=dict(type='str', required=True),
+            realm=dict(type='str', required=True),
+            admin_user=dict(type='str', default='admin'),
+            admin_password=dict(type='str', required=True, no_log=True),
+            name=dict(type='str', required=True),
+            config=dict(type='dict', required=True),
+            mappers=dict(type='list', elements='dict', default=[]),
+            update_credential=dict(type='str', choices=['always', 'on_create'], default='on_create'),
+            sync=dict(type='str', choices=['auto', 'changed', 'full', 'none'], default='auto'),
+            validate_certs=dict(type='bool', default=True),
+            timeout=dict(type='int', default=1800),
+        ),
+        supports_check_mode=True,
+    )
+    params = module.params
+    invalid = [str(mapper.get('name', index)) for index, mapper in enumerate(params['mappers'])
+               if not mapper.get('name') or not mapper.get('providerId')]
+    if invalid:
+        module.fail_json(msg='mappers need name and providerId: %s' % ', '.join(invalid))
+
+    client = KeycloakAdmin(params['base_url'], params['realm'], params['admin_user'], params['admin_password'],
+                           params['validate_certs'], params['timeout'])
+    try:
+        result = apply(client, params['name'], params['config'], params['mappers'], params['update_credential'],
+                       params['sync'], module.check_mode)
+    except KeycloakError as e:
+        module.fail_json(msg=str(e))
+    except Exception as e:
+        module.fail_json(msg='Keycloak request failed: %s' % e)
+
+    if result['sync'].get('failed'):
+        module.warn('%d LDAP entries failed to sync: %s' % (result['sync']['failed'], result['sync']['status']))
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
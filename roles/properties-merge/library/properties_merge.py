@@ -0,0 +1,219 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Merge keys into a Java properties file in a single pass"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: properties_merge
+short_description: Set, add or comment out many keys of a Java properties file at once
+description:
+  - Reads the file once, applies every key of I(properties) and writes it back atomically with at most one backup.
+  - Existing keys are updated in place. A key that is only present commented out (C(#key=...)) is added right
+    after its last commented occurrence, so the shipped documentation stays; other new keys are appended.
+  - Duplicate active definitions of a managed key are removed, since the last one would silently win.
+  - Comments, blank lines, unmanaged keys and their order are kept as they are.
+options:
+  path:
+    description: Properties file to edit.
+    type: path
+    required: true
+    aliases: [dest]
+  properties:
+    description:
+      - Keys and values to set. Booleans are written as C(true)/C(false).
+      - A C(null) value comments out every active definition of the key.
+    type: dict
+    required: true
+  backup:
+    description: Keep one timestamped copy of the file before changing it.
+    type: bool
+    default: false
+  create:
+    description: Create the file when it does not exist.
+    type: bool
+    default: false
+extends_documentation_fragment:
+  - files
+'''
+
+EXAMPLES = r'''
+- name: Configure SonarQube SAML authentication
+  properties_merge:
+    path: /opt/sonarqube/conf/sonar.properties
+    properties:
+      sonar.auth.saml.enabled: true
+      sonar.auth.saml.loginUrl: https://keycloak.example.com/realms/sonarqube/protocol/saml
+      sonar.auth.saml.certificate: null
+    backup: true
+  notify: restart sonarqube
+'''
+
+RETURN = r'''
+changes:
+  description:
+    - Keys that changed with their previous and new value (C(null) when absent or commented out).
+    - Values of keys containing C(password) or C(secret) are masked.
+  returned: always
+  type: dict
+  sample:
+    sonar.auth.saml.enabled:
+      before: "false"
+      after: "true"
+backup_file:
+  description: Backup of the previous file.
+  returned: when changed and I(backup=true)
+  type: str
+'''
+
+import os
+import re
+import tempfile
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.common.text.converters import to_bytes, to_text
+
+# Key up to the first unescaped separator (=, : or whitespace)
+KEY = re.compile(r'^\s*((?:[^\s=:\\]|\\.)+)\s*[=:\s]\s*(.*)$', re.S)
+# Commented definitions need an explicit = or : so prose comments never match
+COMMENTED_KEY = re.compile(r'^\s*[#!]\s*((?:[^\s=:\\#!]|\\.)+)\s*[=:]')
+
+
+def continues(line):
+    """A line ending in an odd number of backslashes continues on the next line"""
+    return (len(line) - len(line.rstrip('\\'))) % 2 == 1
+
+
+def parse(text):
+    """Split into entries of whole lines: [{'lines', 'key', 'value', 'commented'}]"""
+    entries = []
+    lines = text.splitlines()
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        stripped = line.strip()
+        if not stripped or stripped[0] in '#!':
+            match = COMMENTED_KEY.match(line)
+            entries.append({'lines': [line], 'key': match.group(1) if match else None, 'value': None,
+                            'commented': True})
+            index += 1
+            continue
+        block = [line]
+        while continues(block[-1]) and index + len(block) < len(lines):
+            block.append(lines[index + len(block)])
+        logical = ''.join(part[:-1] if continues(part) else part for part in
+                          [block[0]] + [part.lstrip() for part in block[1:]])
+        match = KEY.match(logical)
+        key, value = (match.group(1), match.group(2)) if match else (logical.strip(), '')
+        entries.append({'lines': block, 'key': key, 'value': value, 'commented': False})
+        index += len(block)
+    return entries
+
+
+SECRET = re.compile(r'password|secret', re.I)
+
+
+def masked(changes):
+    return dict((key, dict((side, '********' if value is not None and SECRET.search(key) else value)
+                           for side, value in change.items()))
+                for key, change in changes.items())
+
+
+def render(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return to_text(value)
+
+
+def merge(text, properties):
+    """Return the merged text and {key: {'before', 'after'}} for every changed key"""
+    entries = parse(text)
+    changes = {}
+    appended = []
+    for key, value in properties.items():
+        active = [entry for entry in entries if entry['key'] == key and not entry['commented']]
+        before = active[-1]['value'] if active else None
+
+        if value is None:
+            for entry in active:
+                entry['lines'] = ['#' + line for line in entry['lines']]
+                entry['commented'] = True
+            if active:
+                changes[key] = {'before': before, 'after': None}
+            continue
+
+        value = render(value)
+        line = '%s=%s' % (key, value)
+        if active:
+            if len(active) > 1 or active[0]['value'] != value:
+                changes[key] = {'before': before, 'after': value}
+            if active[0]['value'] != value:
+                active[0].update(lines=[line], value=value)
+            for duplicate in active[1:]:
+                duplicate['lines'] = []
+                duplicate['key'] = None
+            continue
+
+        changes[key] = {'before': None, 'after': value}
+        new = {'lines': [line], 'key': key, 'value': value, 'commented': False}
+        commented = [index for index, entry in enumerate(entries) if entry['key'] == key]
+        if commented:
+            entries.insert(commented[-1] + 1, new)
+        else:
+            appended.append(new)
+
+    if not changes:
+        return text, changes
+    lines = [line for entry in entries + appended for line in entry['lines']]
+    return ('\n'.join(lines) + '\n') if lines else '', changes
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            path=dict(type='path', required=True, aliases=['dest']),
+            properties=dict(type='dict', required=True),
+            backup=dict(type='bool', default=False),
+            create=dict(type='bool', default=False),
+        ),
+        add_file_common_args=True,
+        supports_check_mode=True,
+    )
+    path = module.params['path']
+    multiline = [key for key, value in module.params['properties'].items()
+                 if value is not None and '\n' in render(value)]
+    if multiline:
+        module.fail_json(msg='values of %s contain line breaks' % ', '.join(sorted(multiline)))
+
+    if os.path.exists(path):
+        with open(path, 'rb') as handle:
+            original = to_text(handle.read(), errors='surrogate_or_strict')
+    elif module.params['create']:
+        original = ''
+    else:
+        module.fail_json(msg='%s does not exist' % path)
+
+    merged, changes = merge(original, module.params['properties'])
+    result = dict(changed=merged != original, changes=masked(changes), path=path)
+    if module._diff:
+        result['diff'] = dict(before=original, after=merged, before_header=path, after_header=path)
+
+    if result['changed'] and not module.check_mode:
+        if module.params['backup'] and os.path.exists(path):
+            result['backup_file'] = module.backup_local(path)
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp = tempfile.mkstemp(dir=directory, prefix='.%s.' % os.path.basename(path))
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(to_bytes(merged, errors='surrogate_or_strict'))
+        module.atomic_move(temp, path, unsafe_writes=module.params['unsafe_writes'])
+
+    file_args = module.load_file_common_arguments(module.params)
+    if not module.check_mode or os.path.exists(path):
+        result['changed'] = module.set_fs_attributes_if_different(file_args, result['changed'])
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
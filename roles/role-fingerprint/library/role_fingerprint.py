@@ -0,0 +1,139 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Hash a role's files and effective variables into one fingerprint"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: role_fingerprint
+short_description: Fingerprint the inputs of a role (its files and variable values)
+description:
+  - Hashes every file below I(paths), in sorted relative path order, together with the JSON encoding of I(data)
+    (sorted keys) into one SHA-256 fingerprint.
+  - Files that do not influence a deployment (Molecule scenarios, byte code, hidden files) are skipped.
+  - Optionally reads the state stored by the last successful run from I(state_file).
+  - Runs on the controller, where the role files live.
+options:
+  paths:
+    description: Role directories or single files to hash.
+    type: list
+    elements: path
+    required: true
+  data:
+    description: Variable values to hash, normally the role variables selected by name pattern.
+    type: raw
+    default: {}
+  exclude:
+    description: File and directory names (shell patterns) skipped below I(paths).
+    type: list
+    elements: str
+    default: [molecule, __pycache__, '*.pyc', '.*']
+  state_file:
+    description: JSON file with the stored state; returned as C(stored), empty when missing or unreadable.
+    type: path
+'''
+
+EXAMPLES = r'''
+- name: Fingerprint role inputs
+  role_fingerprint:
+    paths:
+      - "{{ playbook_dir }}/../roles/install-jenkins"
+    data: "{{ dict(names | zip(query('vars', *names))) }}"
+  vars:
+    names: "{{ query('varnames', '^jenkins_') }}"
+  delegate_to: localhost
+  become: false
+  no_log: true
+  register: fingerprint
+'''
+
+RETURN = r'''
+fingerprint:
+  description: SHA-256 of the files and data.
+  returned: always
+  type: str
+files:
+  description: Number of files hashed.
+  returned: always
+  type: int
+stored:
+  description: Content of I(state_file), or an empty dict.
+  returned: always
+  type: dict
+'''
+
+import fnmatch
+import hashlib
+import json
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+
+
+def excluded(name, patterns):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def role_files(path, exclude):
+    """Files below path as (relative name, absolute path), sorted by name"""
+    if os.path.isfile(path):
+        return [(os.path.basename(path), path)]
+    found = []
+    for directory, dirs, files in os.walk(path):
+        dirs[:] = [name for name in dirs if not excluded(name, exclude)]
+        for name in files:
+            if not excluded(name, exclude):
+                full = os.path.join(directory, name)
+                found.append((os.path.relpath(full, path), full))
+    return sorted(found)
+
+
+def fingerprint(paths, data, exclude=()):
+    """SHA-256 over the files below paths and the canonical JSON of data; returns (digest, file count)"""
+    digest = hashlib.sha256()
+    count = 0
+    for path in paths:
+        digest.update(('path:%s\n' % os.path.basename(os.path.normpath(path))).encode('utf-8'))
+        for name, full in role_files(path, exclude):
+            digest.update(('file:%s\n' % name).encode('utf-8'))
+            with open(full, 'rb') as handle:
+                for block in iter(lambda: handle.read(1 << 20), b''):
+                    digest.update(block)
+            count += 1
+    digest.update(b'data:')
+    digest.update(json.dumps(data, sort_keys=True, default=str, separators=(',', ':')).encode('utf-8'))
+    return digest.hexdigest(), count
+
+
+def read_state(path):
+    try:
+        with open(path) as handle:
+            state = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            paths=dict(type='list', elements='path', required=True),
+            data=dict(type='raw', default={}),
+            exclude=dict(type='list', elements='str', default=['molecule', '__pycache__', '*.pyc', '.*']),
+            state_file=dict(type='path'),
+        ),
+        supports_check_mode=True,
+    )
+    missing = [path for path in module.params['paths'] if not os.path.exists(path)]
+    if missing:
+        module.fail_json(msg='cannot fingerprint missing paths: %s' % ', '.join(missing))
+
+    digest, count = fingerprint(module.params['paths'], module.params['data'], module.params['exclude'])
+    stored = read_state(module.params['state_file']) if module.params['state_file'] else {}
+    module.exit_json(changed=False, fingerprint=digest, files=count, stored=stored)
+
+
+if __name__ == '__main__':
+    main()
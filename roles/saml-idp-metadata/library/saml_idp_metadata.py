@@ -0,0 +1,360 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Keep a validated copy of a Keycloak realm's SAML IdP metadata on the controller"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: saml_idp_metadata
+short_description: Cache, validate and fingerprint a Keycloak realm's SAML IdP descriptor
+description:
+  - Keeps the SAML descriptor of a Keycloak realm in I(cache_dir) so the SAML roles render it as static
+    metadata instead of having Jenkins and SonarQube look it up from Keycloak.
+  - Within I(refresh_period) of the last check the cached copy is returned without any request to Keycloak.
+  - After that, only the realm's key IDs are read from its JWKS endpoint; the descriptor is downloaded again
+    only when they differ from the cached ones (key rotation), when I(base_url) changed, or with I(force).
+  - A downloaded descriptor must be an IdP C(EntityDescriptor) with a single sign-on service and at least one
+    signing certificate that is currently valid; the certificates and the descriptor are fingerprinted (SHA-256).
+  - When Keycloak cannot be reached, the cached copy is returned with a warning.
+  - Runs where the cache lives (normally the Ansible controller).
+options:
+  base_url:
+    description: Keycloak base URL, e.g. C(https://keycloak.example.com).
+    type: str
+    required: true
+  realm:
+    description: Realm whose descriptor is cached.
+    type: str
+    required: true
+  cache_dir:
+    description: Directory holding one descriptor and one JSON stamp per realm.
+    type: path
+    required: true
+  refresh_period:
+    description: Seconds a cached descriptor is used without asking Keycloak; C(0) always checks the key IDs.
+    type: int
+    default: 86400
+  force:
+    description: Download the descriptor even if the key IDs are unchanged.
+    type: bool
+    default: false
+  expiry_warning_days:
+    description: Warn when the signing certificate expires within this many days.
+    type: int
+    default: 14
+  validate_certs:
+    description: Verify Keycloak's TLS certificate.
+    type: bool
+    default: true
+  timeout:
+    description: Network timeout in seconds.
+    type: int
+    default: 30
+'''
+
+EXAMPLES = r'''
+- name: Load the sonar realm IdP metadata
+  saml_idp_metadata:
+    base_url: https://keycloak.example.com
+    realm: sonar
+    cache_dir: "{{ lookup('env', 'HOME') }}/.cache/ansible-saml-metadata"
+  delegate_to: localhost
+  become: false
+  run_once: true
+  register: saml_idp_metadata
+'''
+
+RETURN = r'''
+metadata:
+  description: The descriptor XML.
+  returned: always
+  type: str
+metadata_sha256:
+  description: SHA-256 of the descriptor.
+  returned: always
+  type: str
+entity_id:
+  description: The IdP entity ID.
+  returned: always
+  type: str
+sso_url:
+  description: Location of the first single sign-on service.
+  returned: always
+  type: str
+key_ids:
+  description: Sorted key IDs of the realm when the descriptor was fetched.
+  returned: always
+  type: list
+  elements: str
+certificates:
+  description: Certificates of the descriptor.
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - kid: 1Xr0...
+      use: signing
+      sha256: 4F:3A:...
+      not_before: "2025-01-10T08:00:00Z"
+      not_after: "2035-01-10T08:00:00Z"
+signing_certificate:
+  description: Base64 DER of the valid signing certificate that expires last.
+  returned: always
+  type: str
+source:
+  description: C(cache) (within the refresh period or key IDs unchanged), C(keycloak) (downloaded by this run)
+    or C(stale-cache) (Keycloak unreachable).
+  returned: always
+  type: str
+fetched_at:
+  description: When the descriptor was downloaded (UTC, ISO 8601).
+  returned: always
+  type: str
+path:
+  description: Cached descriptor file.
+  returned: always
+  type: str
+'''
+
+import base64
+import binascii
+import hashlib
+import json
+import os
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import open_url
+
+MD = '{urn:oasis:names:tc:SAML:2.0:metadata}'
+DS = '{http://www.w3.org/2000/09/xmldsig#}'
+
+
+class MetadataError(Exception):
+    pass
+
+
+def utc(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _der(data, offset):
+    """Tag, content start and content end of the DER element at offset"""
+    tag, length = data[offset], data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        count = length & 0x7f
+        length = int.from_bytes(data[offset:offset + count], 'big')
+        offset += count
+    return tag, offset, offset + length
+
+
+def _children(data, start, end):
+    while start < end:
+        element = _der(data, start)
+        yield element
+        start = element[2]
+
+
+def _time(tag, value):
+    text = value.decode('ascii')
+    if tag == 0x17:  # UTCTime, two-digit year
+        text = ('19' if int(text[:2]) >= 50 else '20') + text
+    return datetime.strptime(text[:14], '%Y%m%d%H%M%S').replace(tzinfo=timezone.utc)
+
+
+def validity(der):
+    """notBefore and notAfter of a DER X.509 certificate"""
+    try:
+        _, start, end = _der(der, 0)
+        _, start, end = next(_children(der, start, end))  # tbsCertificate
+        fields = list(_children(der, start, end))
+        if fields[0][0] == 0xa0:  # explicit version
+            fields = fields[1:]
+        _, start, end = fields[3]  # serialNumber, signature, issuer, validity
+        return [_time(tag, der[first:last]) for tag, first, last in _children(der, start, end)]
+    except (IndexError, ValueError, StopIteration):
+        raise MetadataError('certificate is not a valid DER X.509 certificate')
+
+
+def parse(xml, now, expiry_warning_days):
+    """Validate an IdP descriptor; return its facts and warnings"""
+    try:
+        root = ET.fromstring(xml)
+    except ET.ParseError as e:
+        raise MetadataError('descriptor is not well-formed XML: %s' % e)
+    entity = root if root.tag == MD + 'EntityDescriptor' else root.find('.//' + MD + 'EntityDescriptor')
+    idp = entity.find(MD + 'IDPSSODescriptor') if entity is not None else None
+    if idp is None:
+        raise MetadataError('descriptor has no EntityDescriptor with an IDPSSODescriptor')
+    sso = idp.find(MD + 'SingleSignOnService')
+    if sso is None or not sso.get('Location'):
+        raise MetadataError('descriptor has no SingleSignOnService')
+
+    certificates, warnings = [], []
+    for descriptor in idp.findall(MD + 'KeyDescriptor'):
+        node = descriptor.find('.//' + DS + 'X509Certificate')
+        if node is None or not (node.text or '').strip():
+            continue
+        encoded = ''.join(node.text.split())
+        try:
+            der = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            raise MetadataError('certificate is not valid base64')
+        not_before, not_after = validity(der)
+        digest = hashlib.sha256(der).hexdigest().upper()
+        certificates.append({
+            'kid': (descriptor.findtext('.//' + DS + 'KeyName') or '').strip(),
+            'use': descriptor.get('use', 'signing'),
+            'sha256': ':'.join(digest[i:i + 2] for i in range(0, len(digest), 2)),
+            'not_before': not_before.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'not_after': not_after.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'certificate': encoded,
+            'valid': not_before <= now <= not_after,
+            'expires': not_after,
+        })
+    signing = [cert for cert in certificates if cert['use'] == 'signing' and cert['valid']]
+    if not signing:
+        raise MetadataError('descriptor has no currently valid signing certificate')
+    current = max(signing, key=lambda cert: cert['expires'])
+    days = (current['expires'] - now).days
+    if days < expiry_warning_days:
+        warnings.append('signing certificate %s expires in %d days' % (current['kid'] or current['sha256'], days))
+    return {
+        'entity_id': entity.get('entityID'),
+        'sso_url': sso.get('Location'),
+        'certificates': [{key: cert[key] for key in ('kid', 'use', 'sha256', 'not_before', 'not_after')}
+                         for cert in certificates],
+        'signing_certificate': current['certificate'],
+    }, warnings
+
+
+class MetadataCache:
+    """Descriptor and JSON stamp of each realm under one directory"""
+
+    def __init__(self, params):
+        self.base_url = params['base_url'].rstrip('/')
+        self.realm = params['realm']
+        self.params = params
+        os.makedirs(params['cache_dir'], exist_ok=True)
+        self.path = os.path.join(params['cache_dir'], '%s.xml' % self.realm)
+        self.warnings = []
+
+    def get(self, path):
+        return open_url(self.base_url + '/realms/' + self.realm + path, timeout=self.params['timeout'],
+                        validate_certs=self.params['validate_certs'], follow_redirects='all',
+                        http_agent='ansible-saml-idp-metadata').read()
+
+    def key_ids(self):
+        try:
+            keys = json.loads(self.get('/protocol/openid-connect/certs').decode('utf-8'))['keys']
+        except (ValueError, KeyError, TypeError):
+            raise MetadataError('realm %s returned an invalid JWKS document' % self.realm)
+        return sorted(key['kid'] for key in keys if key.get('kid'))
+
+    def read(self):
+        try:
+            with open(self.path + '.json') as handle:
+                stamp = json.load(handle)
+            with open(self.path) as handle:
+                metadata = handle.read()
+        except (OSError, ValueError):
+            return None
+        if hashlib.sha256(metadata.encode('utf-8')).hexdigest() != stamp.get('metadata_sha256'):
+            self.warnings.append('cached descriptor of realm %s does not match its stamp; fetching it again'
+                                 % self.realm)
+            return None
+        return dict(stamp, metadata=metadata)
+
+    def write(self, entry):
+        stamp = {key: value for key, value in entry.items() if key != 'metadata'}
+        stamp = json.dumps(stamp, indent=2, sort_keys=True)
+        for path, content in ((self.path, entry['metadata']), (self.path + '.json', stamp)):
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.saml-')
+            with os.fdopen(fd, 'w') as handle:
+                handle.write(content)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+
+    def ensure(self, check_mode=False):
+        """Return (entry, source, changed)"""
+        now = time.time()
+        cached = self.read()
+        if cached and cached.get('base_url') != self.base_url:
+            cached = None
+        if cached:
+            try:
+                self.warnings.extend(parse(cached['metadata'], datetime.now(timezone.utc),
+                                           self.params['expiry_warning_days'])[1])
+            except MetadataError as e:
+                self.warnings.append('cached descriptor of realm %s is no longer usable (%s); fetching it again'
+                                     % (self.realm, e))
+                cached = None
+        fresh = cached and now - cached.get('checked_at_epoch', 0) < self.params['refresh_period']
+        if fresh and not self.params['force']:
+            return cached, 'cache', False
+
+        try:
+            key_ids = self.key_ids()
+            if cached and key_ids == cached['key_ids'] and not self.params['force']:
+                cached.update(checked_at_epoch=now, checked_at=utc(now))
+                if not check_mode:
+                    self.write(cached)
+                return cached, 'cache', False
+            metadata = self.get('/protocol/saml/descriptor').decode('utf-8')
+        except MetadataError:
+            raise
+        except Exception as e:
+            if cached:
+                self.warnings.append('Keycloak realm %s not reachable (%s); using the descriptor cached at %s'
+                                     % (self.realm, e, cached['fetched_at']))
+                return cached, 'stale-cache', False
+            raise MetadataError('cannot fetch the descriptor of realm %s: %s' % (self.realm, e))
+
+        facts, warnings = parse(metadata, datetime.now(timezone.utc), self.params['expiry_warning_days'])
+        self.warnings.extend(warnings)
+        entry = dict(facts, metadata=metadata, base_url=self.base_url, realm=self.realm, key_ids=key_ids,
+                     metadata_sha256=hashlib.sha256(metadata.encode('utf-8')).hexdigest(),
+                     fetched_at=utc(now), checked_at=utc(now), checked_at_epoch=now)
+        changed = not cached or cached['metadata_sha256'] != entry['metadata_sha256']
+        if not check_mode:
+            self.write(entry)
+        return entry, 'keycloak', changed
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            base_url=dict(type='str', required=True),
+            realm=dict(type='str', required=True),
+            cache_dir=dict(type='path', required=True),
+            refresh_period=dict(type='int', default=86400),
+            force=dict(type='bool', default=False),
+            expiry_warning_days=dict(type='int', default=14),
+            validate_certs=dict(type='bool', default=True),
+            timeout=dict(type='int', default=30),
+        ),
+        supports_check_mode=True,
+    )
+    cache = MetadataCache(module.params)
+    try:
+        entry, source, changed = cache.ensure(module.check_mode)
+    except MetadataError as e:
+        entry = None
+        error = str(e)
+    for warning in cache.warnings:
+        module.warn(warning)
+    if entry is None:
+        module.fail_json(msg=error)
+    result = {key: entry[key] for key in ('metadata', 'metadata_sha256', 'entity_id', 'sso_url', 'key_ids',
+                                          'certificates', 'signing_certificate', 'fetched_at')}
+    module.exit_json(changed=changed, source=source, path=cache.path, **result)
+
+
+if __name__ == '__main__':
+    main()
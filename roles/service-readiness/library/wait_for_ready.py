@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Wait until services report application readiness"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: wait_for_ready
+short_description: Wait for Jenkins, SonarQube, Keycloak or arbitrary HTTP/TCP readiness conditions
+description:
+  - Probes all conditions concurrently with exponential backoff and returns as soon as every one is ready.
+  - Fails when the overall deadline expires, reporting the last probe result of each condition.
+  - Records time-to-ready per service, optionally appending it to a JSON lines history file.
+options:
+  conditions:
+    description:
+      - Conditions to wait for. Each needs a C(type) and a C(name) (defaults to the type).
+      - C(jenkins), C(sonarqube) and C(keycloak) take the service base C(url); C(keycloak) also takes C(realm) (default C(master)).
+      - C(http) takes C(url), C(status_code), C(contains), C(not_contains) and C(json) (top-level fields that must match).
+      - C(tcp) takes C(host) and C(port).
+      - HTTP conditions also accept C(headers) and C(validate_certs).
+    type: list
+    elements: dict
+    required: true
+  timeout:
+    description: Overall deadline in seconds for all conditions.
+    type: int
+    default: 300
+  initial_delay:
+    description: Seconds before the second probe of a condition.
+    type: float
+    default: 1
+  max_delay:
+    description: Upper bound for the delay between probes.
+    type: float
+    default: 15
+  probe_timeout:
+    description: Timeout of a single probe in seconds.
+    type: int
+    default: 10
+  history_file:
+    description: Append time-to-ready of each condition to this JSON lines file.
+    type: path
+'''
+
+EXAMPLES = r'''
+- name: Wait for Jenkins and Keycloak
+  wait_for_ready:
+    conditions:
+      - type: jenkins
+        url: "http://localhost:8080"
+      - type: keycloak
+        url: "http://localhost:8080"
+        realm: jenkins
+    timeout: 300
+    history_file: /var/log/jenkins/startup-times.jsonl
+'''
+
+RETURN = r'''
+services:
+  description: Result per condition name.
+  returned: always
+  type: dict
+  sample:
+    jenkins:
+      ready: true
+      seconds: 41.3
+      attempts: 7
+      detail: HTTP 403
+elapsed:
+  description: Seconds until all conditions were ready (or the deadline expired).
+  returned: always
+  type: float
+'''
+
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.readiness import HttpCondition, PRESETS, TcpCondition, record_history, wait_until
+
+
+def build_condition(spec, probe_timeout):
+    spec = dict(spec)
+    kind = spec.pop('type', 'http')
+    name = spec.pop('name', None) or kind
+    http = dict(timeout=probe_timeout, validate_certs=spec.pop('validate_certs', True), headers=spec.pop('headers', None))
+    if kind in PRESETS:
+        if kind == 'keycloak':
+            return PRESETS[kind](spec['url'], realm=spec.get('realm', 'master'), name=name, **http)
+        return PRESETS[kind](spec['url'], name=name, **http)
+    if kind == 'http':
+        return HttpCondition(name, spec['url'], status_code=spec.get('status_code', [200]),
+                             contains=spec.get('contains'), not_contains=spec.get('not_contains'),
+                             json_fields=spec.get('json'), **http)
+    if kind == 'tcp':
+        return TcpCondition(name, spec.get('host', '127.0.0.1'), spec['port'], timeout=probe_timeout)
+    raise ValueError('unknown condition type %s' % kind)
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            conditions=dict(type='list', elements='dict', required=True),
+            timeout=dict(type='int', default=300),
+            initial_delay=dict(type='float', default=1),
+            max_delay=dict(type='float', default=15),
+            probe_timeout=dict(type='int', default=10),
+            history_file=dict(type='path'),
+        ),
+        supports_check_mode=True,
+    )
+    try:
+        conditions = [build_condition(spec, module.params['probe_timeout']) for spec in module.params['conditions']]
+    except (KeyError, ValueError) as e:
+        module.fail_json(msg='invalid condition: %s' % e)
+
+    start = time.monotonic()
+    services = wait_until(conditions, module.params['timeout'], module.params['initial_delay'],
+                          module.params['max_delay'])
+    elapsed = round(time.monotonic() - start, 2)
+    if module.params['history_file'] and not module.check_mode:
+        record_history(module.params['history_file'], services)
+
+    not_ready = sorted(name for name, result in services.items() if not result['ready'])
+    if not_ready:
+        module.fail_json(msg='not ready after %ss: %s' % (module.params['timeout'], ', '.join(
+            '%s (%s)' % (name, services[name]['detail']) for name in not_ready)), services=services, elapsed=elapsed)
+    module.exit_json(changed=False, services=services, elapsed=elapsed)
+
+
+if __name__ == '__main__':
+    main()
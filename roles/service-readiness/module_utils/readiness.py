@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Wait for application readiness instead of sleeping or waiting on ports
+
+Shared by the wait_for_ready module and the molecule tests, so it only uses
+the standard library. A condition is probed repeatedly with exponential
+backoff until it passes or the overall deadline expires; all conditions are
+probed concurrently and the wait ends as soon as every one of them is ready.
+"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+import os
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+JENKINS_STARTING = 'Please wait while Jenkins is getting ready'
+MAX_BODY = 256 * 1024
+
+
+def urllib_fetch(url, headers=None, timeout=10, validate_certs=True):
+    """Return (status, body) for a GET request; HTTP errors are results, not exceptions"""
+    context = None
+    if url.startswith('https') and not validate_certs:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    request = Request(url, headers=dict(headers or {}, **{'User-Agent': 'ansible-wait-for-ready'}))
+    try:
+        with urlopen(request, timeout=timeout, context=context) as response:
+            return response.status, response.read(MAX_BODY).decode('utf-8', 'replace')
+    except HTTPError as e:
+        return e.code, e.read(MAX_BODY).decode('utf-8', 'replace')
+
+
+def curl_fetch(run):
+    """Fetch through curl on another machine; run(command) returns its stdout (e.g. testinfra host.run)"""
+    def fetch(url, headers=None, timeout=10, validate_certs=True):
+        options = ['-s', '--max-time', str(timeout), '-w', "'\\n%{http_code}'"]
+        if not validate_certs:
+            options.append('-k')
+        for name, value in (headers or {}).items():
+            options += ['-H', "'%s: %s'" % (name, value)]
+        body, _, status = run('curl %s %s' % (' '.join(options), url)).rpartition('\n')
+        return int(status or 0), body
+    return fetch
+
+
+class Condition:
+    """A named readiness probe; probe() returns (ready, detail)"""
+
+    def __init__(self, name, probe):
+        self.name = name
+        self.probe = probe
+
+    def check(self):
+        try:
+            return self.probe()
+        except Exception as e:
+            return False, '%s: %s' % (type(e).__name__, e)
+
+
+class HttpCondition(Condition):
+    """HTTP GET whose status, body text and top-level JSON fields must match"""
+
+    def __init__(self, name, url, status_code=(200,), contains=None, not_contains=None, json_fields=None,
+                 headers=None, timeout=10, validate_certs=True, fetch=None):
+        self.url = url
+        self.status_code = [int(code) for code in status_code]
+        self.contains = contains
+        self.not_contains = not_contains
+        self.json_fields = json_fields or {}
+        self.headers = headers
+        self.timeout = timeout
+        self.validate_certs = validate_certs
+        self.fetch = fetch or urllib_fetch
+        super(HttpCondition, self).__init__(name, self.probe_http)
+
+    def probe_http(self):
+        status, body = self.fetch(self.url, headers=self.headers, timeout=self.timeout,
+                                  validate_certs=self.validate_certs)
+        if status not in self.status_code:
+            return False, 'HTTP %s' % status
+        if self.not_contains and self.not_contains in body:
+            return False, 'HTTP %s, body contains %r' % (status, self.not_contains)
+        if self.contains and self.contains not in body:
+            return False, 'HTTP %s, body lacks %r' % (status, self.contains)
+        if self.json_fields:
+            try:
+                document = json.loads(body)
+            except ValueError:
+                return False, 'HTTP %s, body is not JSON' % status
+            for key, expected in self.json_fields.items():
+                if document.get(key) != expected:
+                    return False, 'HTTP %s, %s=%r' % (status, key, document.get(key))
+        return True, 'HTTP %s' % status
+
+
+class TcpCondition(Condition):
+    """TCP connect, for services without a readiness endpoint"""
+
+    def __init__(self, name, host, port, timeout=5):
+        self.address = (host, int(port))
+        self.timeout = timeout
+        super(TcpCondition, self).__init__(name, self.probe_tcp)
+
+    def probe_tcp(self):
+        with socket.create_connection(self.address, timeout=self.timeout):
+            return True, 'connected'
+
+
+def jenkins(base_url, name='jenkins', **kwargs):
+    """Jenkins serves /login once it has left the 'getting ready' page (403 with security disabled)"""
+    return HttpCondition(name, base_url.rstrip('/') + '/login', status_code=(200, 403),
+                         not_contains=JENKINS_STARTING, **kwargs)
+
+
+def sonarqube(base_url, name='sonarqube', **kwargs):
+    """SonarQube reports UP once the web server, compute engine and search are started"""
+    return HttpCondition(name, base_url.rstrip('/') + '/api/system/status', json_fields={'status': 'UP'}, **kwargs)
+
+
+def keycloak_realm(base_url, realm='master', name=None, **kwargs):
+    """Keycloak publishes a realm's discovery document once the realm is loaded"""
+    return HttpCondition(name or 'keycloak/%s' % realm,
+                         '%s/realms/%s/.well-known/openid-configuration' % (base_url.rstrip('/'), realm),
+                         contains='"issuer"', **kwargs)
+
+
+PRESETS = {'jenkins': jenkins, 'sonarqube': sonarqube, 'keycloak': keycloak_realm}
+
+
+def wait_for(condition, deadline, initial_delay=1.0, max_delay=15.0, factor=2.0, clock=time.monotonic,
+             sleep=time.sleep):
+    """Probe one condition with exponential backoff until it is ready or the deadline passes"""
+    start = clock()
+    delay = initial_delay
+    attempts = 0
+    while True:
+        attempts += 1
+        ready, detail = condition.check()
+        now = clock()
+        if ready or now >= deadline:
+            return {'ready': ready, 'seconds': round(now - start, 2), 'attempts': attempts, 'detail': detail}
+        # The last probe happens at the deadline rather than being skipped
+        sleep(min(delay, max_delay, deadline - now))
+        delay *= factor
+
+
+def wait_until(conditions, timeout=300, initial_delay=1.0, max_delay=15.0, factor=2.0):
+    """Wait for all conditions concurrently; return {name: result} when all are ready or time is up"""
+    deadline = time.monotonic() + timeout
+    with ThreadPoolExecutor(max_workers=max(1, len(conditions))) as pool:
+        futures = [(condition.name, pool.submit(wait_for, condition, deadline, initial_delay, max_delay, factor))
+                   for condition in conditions]
+        return dict((name, future.result()) for name, future in futures)
+
+
+def record_history(path, results, host=None):
+    """Append time-to-ready per service as JSON lines, for tracking startup regressions"""
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    with open(path, 'a') as handle:
+        for name, result in sorted(results.items()):
+            handle.write(json.dumps({'time': timestamp, 'host': host or socket.gethostname(), 'service': name,
+                                     'ready': result['ready'], 'seconds': result['seconds'],
+                                     'attempts': result['attempts']}) + '\n')
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Active health checker for the nginx upstreams in dynamic-backends.conf
+
+Probes every backend's readiness URL concurrently (Jenkins /login, SonarQube
+/api/system/status, Keycloak /health/ready) and maintains one include file per
+upstream with its 'server' lines, marking unhealthy servers 'down'. A server
+changes state only after 'fall' consecutive failures or 'rise' consecutive
+successes, and nginx is reloaded only when the membership of an upstream
+actually changes. Health state and probe latencies are written to a JSON
+status file and served on a local status endpoint.
+
+Usage:
+  nginx-upstream-healthcheck.py --config /etc/nginx/upstream-healthcheck.json
+  nginx-upstream-healthcheck.py --config /etc/nginx/upstream-healthcheck.json --once
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+log = logging.getLogger('nginx-upstream-healthcheck')
+
+DEFAULTS = {
+    'include_dir': '/etc/nginx/upstreams.d',
+    'interval': 5,
+    'timeout': 3,
+    'rise': 2,
+    'fall': 3,
+    'status_file': '/run/nginx-upstream-healthcheck/status.json',
+    'status_listen': '127.0.0.1:8099',
+    'test_command': ['nginx', '-t', '-q'],
+    'reload_command': ['nginx', '-s', 'reload'],
+}
+HEADER = '# Managed by nginx-upstream-healthcheck - do not edit\n'
+
+
+class Server:
+    """Health state of one upstream server with rise/fall hysteresis"""
+
+    def __init__(self, address):
+        self.address = address
+        self.healthy = True  # assume up until proven otherwise, as nginx does
+        self.successes = 0
+        self.failures = 0
+        self.latency = None
+        self.error = None
+        self.checked_at = None
+        self.changed_at = None
+        self.transitions = 0
+
+    def record(self, ok, latency, error, rise, fall):
+        """Record one probe result; return True when the server changed state"""
+        self.latency = latency
+        self.error = error
+        self.checked_at = time.time()
+        if ok:
+            self.successes += 1
+            self.failures = 0
+            flip = not self.healthy and self.successes >= rise
+        else:
+            self.failures += 1
+            self.successes = 0
+            flip = self.healthy and self.failures >= fall
+        if flip:
+            self.healthy = not self.healthy
+            self.changed_at = self.checked_at
+            self.transitions += 1
+        return flip
+
+    def to_dict(self):
+        return {
+            'address': self.address,
+            'healthy': self.healthy,
+            'latency_ms': None if self.latency is None else round(self.latency * 1000, 1),
+            'error': self.error,
+            'consecutive_successes': self.successes,
+            'consecutive_failures': self.failures,
+            'checked_at': self.checked_at,
+            'changed_at': self.changed_at,
+            'transitions': self.transitions,
+        }
+
+
+class Upstream:
+    """One nginx upstream, its readiness probe and its include file"""
+
+    def __init__(self, spec, include_dir):
+        self.name = spec['name']
+        self.path = spec.get('path', '/')
+        self.host = spec.get('host', self.name)
+        self.expect_status = set(spec.get('expect_status', [200]))
+        self.expect_body = spec.get('expect_body')
+        self.servers = [Server(address) for address in spec['servers']]
+        self.include_file = os.path.join(include_dir, f'{self.name}.conf')
+
+    def render(self):
+        lines = [HEADER]
+        for server in self.servers:
+            lines.append(f"server {server.address}{'' if server.healthy else ' down'};\n")
+        return ''.join(lines)
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'include_file': self.include_file,
+            'healthy': sum(server.healthy for server in self.servers),
+            'servers': [server.to_dict() for server in self.servers],
+        }
+
+
+async def probe(upstream, server, timeout):
+    """GET the readiness URL of one server; return (ok, latency, error)"""
+    host, _, port = server.address.rpartition(':')
+    started = time.monotonic()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, int(port)), timeout)
+        writer.write(f'GET {upstream.path} HTTP/1.0\r\nHost: {upstream.host}\r\n'
+                     'User-Agent: nginx-upstream-healthcheck\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        response = b''
+        while len(response) < 65536:
+            chunk = await asyncio.wait_for(reader.read(65536), timeout)
+            if not chunk:
+                break
+            response += chunk
+        latency = time.monotonic() - started
+        status_line, _, rest = response.partition(b'\r\n')
+        parts = status_line.split()
+        status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+        if status not in upstream.expect_status:
+            return False, latency, f'HTTP {status}'
+        if upstream.expect_body and upstream.expect_body.encode() not in rest:
+            return False, latency, f'body does not contain {upstream.expect_body}'
+        return True, latency, None
+    except asyncio.TimeoutError:
+        return False, time.monotonic() - started, 'timeout'
+    except OSError as e:
+        return False, time.monotonic() - started, e.strerror or str(e)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+class HealthChecker:
+    def __init__(self, config):
+        self.config = {**DEFAULTS, **config}
+        self.upstreams = [Upstream(spec, self.config['include_dir']) for spec in config['upstreams']]
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_reload = None
+        self.started_at = time.time()
+
+    async def check(self):
+        """Probe all servers once; return the upstreams whose membership changed"""
+        pairs = [(upstream, server) for upstream in self.upstreams for server in upstream.servers]
+        results = await asyncio.gather(*(probe(upstream, server, self.config['timeout']) for upstream, server in pairs))
+        changed = []
+        for (upstream, server), (ok, latency, error) in zip(pairs, results):
+            log.debug('%s %s %s in %.1f ms%s', upstream.name, server.address, 'ok' if ok else 'failed',
+                      latency * 1000, f' ({error})' if error else '')
+            if server.record(ok, latency, error, self.config['rise'], self.config['fall']):
+                log.warning('%s %s is now %s%s', upstream.name, server.address,
+                            'up' if server.healthy else 'down', f' ({error})' if error else '')
+                if upstream not in changed:
+                    changed.append(upstream)
+        return changed
+
+    def sync(self):
+        """Write include files that differ from disk; reload nginx once if any did"""
+        previous = {}
+        for upstream in self.upstreams:
+            content = upstream.render()
+            try:
+                with open(upstream.include_file) as handle:
+                    current = handle.read()
+            except FileNotFoundError:
+                current = None
+            if current != content:
+                previous[upstream.include_file] = current
+                write_atomic(upstream.include_file, content)
+        if previous:
+            self.reload(previous)
+        return bool(previous)
+
+    def reload(self, previous):
+        test = subprocess.run(self.config['test_command'], capture_output=True, text=True)
+        if test.returncode != 0:
+            # Never leave nginx with a configuration it refuses to load
+            log.error('nginx -t failed, restoring include files: %s', test.stderr.strip())
+            for path, content in previous.items():
+                if content is None:
+                    os.unlink(path)
+                else:
+                    write_atomic(path, content)
+            self.reload_errors += 1
+            return
+        result = subprocess.run(self.config['reload_command'], capture_output=True, text=True)
+        if result.returncode != 0:
+            log.error('nginx reload failed: %s', result.stderr.strip())
+            self.reload_errors += 1
+            return
+        self.reloads += 1
+        self.last_reload = time.time()
+        log.info('nginx reloaded (%s)', ', '.join(sorted(os.path.basename(path) for path in previous)))
+
+    def status(self):
+        return {
+            'started_at': self.started_at,
+            'generated_at': time.time(),
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors,
+            'last_reload': self.last_reload,
+            'rise': self.config['rise'],
+            'fall': self.config['fall'],
+            'upstreams': {upstream.name: upstream.to_dict() for upstream in self.upstreams},
+        }
+
+    def write_status(self):
+        if self.config['status_file']:
+            write_atomic(self.config['status_file'], json.dumps(self.status(), indent=2) + '\n')
+
+    async def handle_status(self, reader, writer):
+        """Minimal HTTP endpoint returning the status document for any GET"""
+        try:
+            await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+            body = json.dumps(self.status(), indent=2).encode()
+            writer.write(b'HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n'
+                         b'Content-Length: ' + str(len(body)).encode() + b'\r\nConnection: close\r\n\r\n' + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def run(self, once=False):
+        # Bring include files in line with the configuration before the first probe
+        self.sync()
+        server = None
+        if not once and self.config['status_listen']:
+            host, _, port = self.config['status_listen'].rpartition(':')
+            server = await asyncio.start_server(self.handle_status, host or '127.0.0.1', int(port))
+            log.info('status endpoint listening on %s', self.config['status_listen'])
+        try:
+            while True:
+                started = time.monotonic()
+                if await self.check():
+                    self.sync()
+                self.write_status()
+                if once:
+                    return
+                await asyncio.sleep(max(0.0, self.config['interval'] - (time.monotonic() - started)))
+        finally:
+            if server is not None:
+                server.close()
+
+
+def write_atomic(path, content):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as handle:
+        handle.write(content)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Active health checks for nginx upstreams')
+    parser.add_argument('--config', default='/etc/nginx/upstream-healthcheck.json', help='JSON configuration file')
+    parser.add_argument('--once', action='store_true', help='run a single probe cycle and exit')
+    parser.add_argument('--verbose', action='store_true', help='log every probe result')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(levelname)s %(message)s')
+    with open(args.config) as handle:
+        config = json.load(handle)
+    try:
+        asyncio.run(HealthChecker(config).run(once=args.once))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
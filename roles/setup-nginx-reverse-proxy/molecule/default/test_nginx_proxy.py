@@ -1,6 +1,8 @@
 """
 Molecule tests for setup-nginx-reverse-proxy role
 """
+import importlib.util
+import json
 import os
 import testinfra.utils.ansible_runner
 
@@ -8,6 +10,12 @@ import testinfra.utils.ansible_runner
 testinfra_hosts = testinfra.utils.ansible_runner.AnsibleRunner(
     os.environ['MOLECULE_INVENTORY_FILE']).get_hosts('nginx-rocky9')
 
+READINESS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..',
+                         'service-readiness', 'module_utils', 'readiness.py')
+spec = importlib.util.spec_from_file_location('readiness', READINESS)
+readiness = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(readiness)
+
 
 def test_nginx_is_installed(host):
     """Test that Nginx package is installed"""
@@ -92,13 +100,11 @@ def test_default_nginx_config_is_removed(host):
 
 def test_nginx_proxy_response(host):
     """Test that nginx proxy responds correctly"""
-    import time
-    time.sleep(5)  # Wait for services to be ready
-
-    # Test that nginx responds
-    result = host.run("curl -s -o /dev/null -w '%{http_code}' http://localhost")
-    # Should get response from backend (even if it's just a mock)
-    assert result.stdout in ["200", "502", "503"]  # 502/503 if backend not ready
+    fetch = readiness.curl_fetch(lambda command: host.run(command).stdout)
+    # Should get response from backend (even if it's just a mock); 502/503 if backend not ready
+    nginx = readiness.HttpCondition("nginx", "http://localhost", status_code=(200, 502, 503), fetch=fetch)
+    results = readiness.wait_until([nginx], timeout=60)
+    assert results["nginx"]["ready"], results
 
 
 def test_jenkins_static_file_handling(host):
@@ -112,3 +118,44 @@ def test_nginx_process_is_running(host):
     """Test that nginx process is actually running"""
     nginx_processes = host.process.filter(comm="nginx")
     assert len(nginx_processes) >= 1  # At least master process
+
+
+def test_structured_access_log_format(host):
+    """Test that the upstream timing JSON log format is defined and used"""
+    config_file = host.file("/etc/nginx/conf.d/dynamic-backends.conf")
+    assert config_file.contains("log_format upstream_json escape=json")
+    assert config_file.contains("upstream_response_time")
+    assert config_file.contains("upstream_connect_time")
+    assert config_file.contains("access_log .* upstream_json")
+
+
+def test_upstream_healthcheck_service_is_running(host):
+    """Test that the upstream health checker is running and enabled"""
+    service = host.service("nginx-upstream-healthcheck")
+    assert service.is_running
+    assert service.is_enabled
+
+
+def test_upstream_servers_come_from_include_files(host):
+    """Test that upstream servers are maintained in per-backend include files"""
+    config_file = host.file("/etc/nginx/conf.d/dynamic-backends.conf")
+    assert config_file.contains("include /etc/nginx/upstreams.d/")
+    include = host.file("/etc/nginx/upstreams.d/jenkins.example.com.conf")
+    assert include.exists
+    assert include.contains("server ")
+
+
+def test_upstream_healthcheck_status_endpoint(host):
+    """Test that the health checker reports upstream state as JSON"""
+    fetch = readiness.curl_fetch(lambda command: host.run(command).stdout)
+    # Ready once the first probe cycle has reported the Jenkins upstream
+    status = readiness.HttpCondition("healthcheck", "http://127.0.0.1:8099/status",
+                                     contains='"jenkins.example.com"', fetch=fetch)
+    results = readiness.wait_until([status], timeout=60)
+    assert results["healthcheck"]["ready"], results
+
+    result = host.run("curl -s http://127.0.0.1:8099/status")
+    assert result.rc == 0
+    status = json.loads(result.stdout)
+    assert "jenkins.example.com" in status["upstreams"]
+    assert host.file("/run/nginx-upstream-healthcheck/status.json").exists
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Wall-time benchmark of a make deployment target under different Ansible configurations
+
+Runs the target (default: deploy-all) once per round for every profile, with
+ANSIBLE_CONFIG pointing at the profile's configuration file, and reports
+min/median/max wall time per profile and the speedup against the first one.
+Output of every run goes to a log file so that runs can be compared afterwards.
+
+Profiles with a fact cache are measured cold in the first round (cache
+cleared) and warm afterwards; --cold clears the cache before every run.
+
+Usage:
+  deploy-benchmark.py                                    # ansible.cfg vs ansible-perf.cfg, deploy-all
+  deploy-benchmark.py --rounds 3 --target deploy-basic
+  deploy-benchmark.py --profile default=ansible.cfg --profile forks50=/tmp/forks50.cfg --cold
+  deploy-benchmark.py --dry-run
+"""
+
+import argparse
+import configparser
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROFILES = ['default=ansible.cfg', 'perf=ansible-perf.cfg']
+
+
+def parse_profile(spec):
+    name, _, path = spec.partition('=')
+    if not path:
+        name, path = os.path.splitext(os.path.basename(spec))[0], spec
+    path = path if os.path.isabs(path) else os.path.join(ROOT, path)
+    if not os.path.isfile(path):
+        raise SystemExit(f'profile {name}: {path} not found')
+    return name, path
+
+
+def fact_cache_dir(config_path):
+    """Directory of a jsonfile fact cache configured in the file, or None"""
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(config_path)
+    if config.get('defaults', 'fact_caching', fallback='memory') != 'jsonfile':
+        return None
+    directory = os.path.expanduser(config.get('defaults', 'fact_caching_connection', fallback=''))
+    if not directory:
+        return None
+    return directory if os.path.isabs(directory) else os.path.join(ROOT, directory)
+
+
+def run_once(target, name, config_path, round_number, log_dir, clear_cache):
+    cache = fact_cache_dir(config_path)
+    if clear_cache and cache:
+        shutil.rmtree(cache, ignore_errors=True)
+    log_path = os.path.join(log_dir, f'{name}-{round_number}.log')
+    environment = dict(os.environ, ANSIBLE_CONFIG=config_path, ANSIBLE_FORCE_COLOR='0')
+    start = time.monotonic()
+    with open(log_path, 'w') as log:
+        returncode = subprocess.run(['make', target], cwd=ROOT, env=environment, stdout=log,
+                                    stderr=subprocess.STDOUT).returncode
+    seconds = time.monotonic() - start
+    return {'profile': name, 'round': round_number, 'seconds': round(seconds, 2), 'returncode': returncode,
+            'fact_cache': 'cold' if clear_cache and cache else ('warm' if cache else 'none'), 'log': log_path}
+
+
+def summarize(runs, profiles):
+    summaries = []
+    for name, path in profiles:
+        times = [run['seconds'] for run in runs if run['profile'] == name and run['returncode'] == 0]
+        failed = sum(1 for run in runs if run['profile'] == name and run['returncode'] != 0)
+        summaries.append({'profile': name, 'config': os.path.relpath(path, ROOT), 'runs': len(times),
+                          'failed': failed,
+                          'min': min(times) if times else None,
+                          'median': round(statistics.median(times), 2) if times else None,
+                          'max': max(times) if times else None})
+    baseline = summaries[0]['median']
+    for summary in summaries:
+        summary['speedup'] = round(baseline / summary['median'], 2) if baseline and summary['median'] else None
+    return summaries
+
+
+def print_report(target, summaries, runs):
+    print(f'\nmake {target}: wall time in seconds')
+    print(f"{'profile':<12} {'config':<20} {'runs':>4} {'failed':>6} {'min':>8} {'median':>8} {'max':>8} {'speedup':>8}")
+    for summary in summaries:
+        cells = [f'{summary[key]:>8.1f}' if summary[key] is not None else f"{'-':>8}" for key in ('min', 'median', 'max')]
+        speedup = f"{summary['speedup']:>7.2f}x" if summary['speedup'] else f"{'-':>8}"
+        print(f"{summary['profile']:<12} {summary['config']:<20} {summary['runs']:>4} {summary['failed']:>6} "
+              f"{' '.join(cells)} {speedup}")
+    print('\nruns:')
+    for run in runs:
+        status = 'ok' if run['returncode'] == 0 else f"failed ({run['returncode']})"
+        print(f"  {run['profile']:<12} round {run['round']}  {run['seconds']:>8.1f}s  facts {run['fact_cache']:<5} "
+              f"{status}  {run['log']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare wall time of a make deployment target across Ansible configurations')
+    parser.add_argument('--target', default='deploy-all', help='make target to run (default: deploy-all)')
+    parser.add_argument('--profile', action='append', default=[],
+                        help='NAME=CONFIG or CONFIG (repeatable; default: ansible.cfg and ansible-perf.cfg)')
+    parser.add_argument('--rounds', type=int, default=1, help='runs per profile (default: 1)')
+    parser.add_argument('--cold', action='store_true', help='clear the fact cache before every run')
+    parser.add_argument('--log-dir', help='directory for run logs (default: a new temporary directory)')
+    parser.add_argument('--dry-run', action='store_true', help='print the runs without executing them')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    profiles = [parse_profile(spec) for spec in args.profile or DEFAULT_PROFILES]
+    if args.dry_run:
+        for round_number in range(1, args.rounds + 1):
+            for name, path in profiles:
+                cache = fact_cache_dir(path)
+                clear = ' (fact cache cleared)' if cache and (args.cold or round_number == 1) else ''
+                print(f'round {round_number}: ANSIBLE_CONFIG={path} make {args.target}{clear}')
+        return 0
+
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix='deploy-benchmark-')
+    os.makedirs(log_dir, exist_ok=True)
+    runs = []
+    # Profiles alternate within a round so that drift on the hosts hits all of them alike
+    for round_number in range(1, args.rounds + 1):
+        for name, path in profiles:
+            print(f'Round {round_number}/{args.rounds}: {name} ({os.path.relpath(path, ROOT)})...', file=sys.stderr)
+            runs.append(run_once(args.target, name, path, round_number, log_dir, args.cold or round_number == 1))
+
+    summaries = summarize(runs, profiles)
+    if args.json:
+        print(json.dumps({'target': args.target, 'profiles': summaries, 'runs': runs}, indent=2))
+    else:
+        print_report(args.target, summaries, runs)
+    return 0 if all(run['returncode'] == 0 for run in runs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
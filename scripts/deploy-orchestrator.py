@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Run the project's playbooks as a dependency graph, independent ones in parallel
+
+Reads deploy-graph.yml: every node is a playbook with the inventory groups it
+changes and the nodes it needs. A node starts as soon as everything it needs
+has succeeded, no other running node touches the same host group and fewer
+than --jobs nodes are running. When several nodes are ready, the one heading
+the longest remaining chain starts first, weighted by the playbook durations
+recorded by the task_history callback when available.
+
+Each node writes its output to <log-dir>/<node>.log. The report lists every
+node with its start, end and duration, and the critical path: the chain of
+dependent nodes that took longest and bounds the wall time of the run.
+
+Policies:
+  fail-fast   a failed node stops new nodes from starting; running ones finish
+  continue    only nodes that need a failed node are skipped
+
+Usage:
+  deploy-orchestrator.py                                 # full-stack target
+  deploy-orchestrator.py jenkins --jobs 2                # same steps as make deploy-all
+  deploy-orchestrator.py --only install-sonarqube,install-keycloak
+  deploy-orchestrator.py full-stack --policy continue --log-dir /tmp/deploy
+  deploy-orchestrator.py --dry-run
+  deploy-orchestrator.py jenkins -- -e artifact_cache_offline=true   # extra ansible-playbook arguments
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_GRAPH = os.path.join(ROOT, 'deploy-graph.yml')
+HISTORY_FILE = os.path.join(ROOT, '.ansible', 'task-history.jsonl')
+POLICIES = ('fail-fast', 'continue')
+
+
+def load_graph(path):
+    """Nodes with defaults filled in; exits on unknown needs, cycles or missing playbooks"""
+    with open(path) as handle:
+        graph = yaml.safe_load(handle)
+    nodes = {}
+    for name, node in (graph.get('nodes') or {}).items():
+        node = dict(node or {})
+        if bool(node.get('playbook')) == bool(node.get('command')):
+            raise SystemExit(f'{path}: node {name} needs exactly one of playbook or command')
+        if node.get('playbook') and not os.path.isfile(os.path.join(ROOT, node['playbook'])):
+            raise SystemExit(f"{path}: node {name}: {node['playbook']} not found")
+        node['hosts'] = list(node.get('hosts') or [])
+        node['needs'] = list(node.get('needs') or [])
+        node['allow_failure'] = bool(node.get('allow_failure', False))
+        nodes[name] = node
+    for name, node in nodes.items():
+        unknown = [need for need in node['needs'] if need not in nodes]
+        if unknown:
+            raise SystemExit(f"{path}: node {name} needs unknown node(s) {', '.join(unknown)}")
+    topological_order(nodes)
+    targets = graph.get('targets') or {}
+    for target, roots in targets.items():
+        unknown = [root for root in roots if root not in nodes]
+        if unknown:
+            raise SystemExit(f"{path}: target {target} lists unknown node(s) {', '.join(unknown)}")
+    policy = graph.get('policy', 'fail-fast')
+    if policy not in POLICIES:
+        raise SystemExit(f'{path}: policy must be one of {", ".join(POLICIES)}')
+    return {'nodes': nodes, 'targets': targets, 'policy': policy}
+
+
+def topological_order(nodes):
+    """Node names with every node after the nodes it needs; exits on a cycle"""
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise SystemExit('dependency cycle: ' + ' -> '.join(path[path.index(name):] + [name]))
+        state[name] = 'visiting'
+        for need in nodes[name]['needs']:
+            if need in nodes:
+                visit(need, path + [name])
+        state[name] = 'done'
+        order.append(name)
+
+    for name in sorted(nodes):
+        visit(name, [])
+    return order
+
+
+def select(nodes, roots):
+    """The roots and everything they need, transitively"""
+    selected, pending = set(), list(roots)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(nodes[name]['needs'])
+    return dict((name, nodes[name]) for name in nodes if name in selected)
+
+
+def waves(nodes):
+    """Nodes grouped by dependency depth: each wave only needs earlier ones"""
+    depth = {}
+    for name in topological_order(nodes):
+        depth[name] = 1 + max([depth[need] for need in nodes[name]['needs']], default=-1)
+    return [sorted(name for name in nodes if depth[name] == level) for level in range(max(depth.values(), default=-1) + 1)]
+
+
+def estimates(nodes, history_file=HISTORY_FILE):
+    """Median recorded duration per node (task_history callback), 1 second when unknown"""
+    seconds = {}
+    if os.path.exists(history_file):
+        spec = importlib.util.spec_from_file_location(
+            'task_history', os.path.join(ROOT, 'callback_plugins', 'task_history.py'))
+        task_history = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(task_history)
+        for name, node in nodes.items():
+            runs = task_history.load_history(history_file, node.get('playbook'))[-10:]
+            if node.get('playbook') and runs:
+                seconds[name] = statistics.median(run['seconds'] for run in runs)
+    return dict((name, seconds.get(name, 1.0)) for name in nodes)
+
+
+def priorities(nodes, weights):
+    """Length of the longest chain of dependents starting at each node"""
+    dependents = dict((name, [other for other in nodes if name in nodes[other]['needs']]) for name in nodes)
+    priority = {}
+    for name in reversed(topological_order(nodes)):
+        priority[name] = weights[name] + max([priority[other] for other in dependents[name]], default=0)
+    return priority
+
+
+def schedule(nodes, launch, jobs=4, policy='fail-fast', weights=None):
+    """Run launch(name, node) for every node as soon as it may start; return {name: result}
+
+    launch returns a dict with at least 'returncode'; start/end times are added here.
+    """
+    priority = priorities(nodes, weights or dict((name, 1.0) for name in nodes))
+    results, running, busy = {}, {}, set()
+    stopped = False
+    origin = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while True:
+            for name in nodes:
+                if name in results or name in running.values():
+                    continue
+                needs = [results.get(need, {}).get('status') for need in nodes[name]['needs']]
+                if any(status in ('failed', 'skipped', 'not run') for status in needs):
+                    results[name] = {'status': 'skipped', 'start': None, 'end': None, 'seconds': None,
+                                     'reason': 'needs ' + ', '.join(need for need in nodes[name]['needs']
+                                                                    if results.get(need, {}).get('status') != 'ok')}
+            ready = sorted((name for name in nodes if name not in results and name not in running.values()
+                            and all(results.get(need, {}).get('status') == 'ok' for need in nodes[name]['needs'])),
+                           key=lambda name: (-priority[name], name))
+            for name in ready:
+                if stopped or len(running) >= max(1, jobs):
+                    break
+                if busy & set(nodes[name]['hosts']):
+                    continue
+                busy.update(nodes[name]['hosts'])
+                start = time.monotonic() - origin
+
+                def task(name=name, start=start):
+                    result = launch(name, nodes[name])
+                    end = time.monotonic() - origin
+                    return dict(result, start=round(start, 2), end=round(end, 2), seconds=round(end - start, 2))
+
+                running[pool.submit(task)] = name
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                busy.difference_update(nodes[name]['hosts'])
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'returncode': None, 'error': str(e), 'start': None, 'end': None, 'seconds': None}
+                result['status'] = 'ok' if result.get('returncode') == 0 else 'failed'
+                results[name] = result
+                if result['status'] == 'failed' and policy == 'fail-fast' and not nodes[name]['allow_failure']:
+                    stopped = True
+    for name in nodes:
+        results.setdefault(name, {'status': 'not run', 'start': None, 'end': None, 'seconds': None})
+    return results
+
+
+def critical_path(nodes, results):
+    """Longest chain of dependent nodes by measured duration: (seconds, [names])"""
+    best = {}
+    for name in topological_order(nodes):
+        seconds = results[name].get('seconds')
+        if seconds is None:
+            continue
+        chains = [best[need] for need in nodes[name]['needs'] if need in best]
+        before = max(chains, default=(0, []))
+        best[name] = (round(before[0] + seconds, 2), before[1] + [name])
+    return max(best.values(), default=(0, []))
+
+
+def playbook_launcher(log_dir, extra_args, config=None):
+    def launch(name, node):
+        if node.get('playbook'):
+            command = ['ansible-playbook', node['playbook']] + list(extra_args)
+        else:
+            command = node['command'] if isinstance(node['command'], list) else ['sh', '-c', node['command']]
+        log_path = os.path.join(log_dir, f'{name}.log')
+        environment = dict(os.environ, ANSIBLE_FORCE_COLOR='0')
+        if config:
+            environment['ANSIBLE_CONFIG'] = config
+        print(f'▶️  {name}: {" ".join(command)}', file=sys.stderr)
+        with open(log_path, 'w') as log:
+            returncode = subprocess.run(command, cwd=ROOT, env=environment, stdin=subprocess.DEVNULL, stdout=log,
+                                        stderr=subprocess.STDOUT).returncode
+        print(f"{'✅' if returncode == 0 else '❌'} {name} (exit {returncode})", file=sys.stderr)
+        return {'returncode': returncode, 'log': log_path}
+    return launch
+
+
+def report(nodes, results, wall):
+    total = round(sum(result['seconds'] or 0 for result in results.values()), 2)
+    path_seconds, path = critical_path(nodes, results)
+    return {'wall': round(wall, 2), 'sequential': total, 'critical_path': path, 'critical_path_seconds': path_seconds,
+            'nodes': dict((name, dict(results[name], hosts=nodes[name]['hosts'], needs=nodes[name]['needs']))
+                          for name in nodes)}
+
+
+def print_report(summary):
+    def cell(value):
+        return f'{value:>8.1f}' if value is not None else f"{'-':>8}"
+
+    print(f"\n{'node':<30} {'status':<8} {'start':>8} {'end':>8} {'seconds':>8}  hosts")
+    ordered = sorted(summary['nodes'].items(), key=lambda item: (item[1]['start'] is None, item[1]['start'] or 0, item[0]))
+    for name, node in ordered:
+        print(f"{name:<30} {node['status']:<8} {cell(node['start'])} {cell(node['end'])} {cell(node['seconds'])}  "
+              f"{','.join(node['hosts'])}{'  (' + node['reason'] + ')' if node.get('reason') else ''}")
+    print(f"\nWall time: {summary['wall']:.1f}s  sequential sum: {summary['sequential']:.1f}s  "
+          f"critical path: {summary['critical_path_seconds']:.1f}s")
+    if summary['critical_path']:
+        print('Critical path: ' + ' → '.join(f"{name} ({summary['nodes'][name]['seconds']:.0f}s)"
+                                             for name in summary['critical_path']))
+    logs = [node['log'] for node in summary['nodes'].values() if node.get('log')]
+    if logs:
+        print(f'Logs: {os.path.dirname(logs[0])}')
+
+
+def main():
+    arguments = sys.argv[1:]
+    extra_args = []
+    if '--' in arguments:
+        extra_args = arguments[arguments.index('--') + 1:]
+        arguments = arguments[:arguments.index('--')]
+
+    parser = argparse.ArgumentParser(description='Run the deployment graph with independent playbooks in parallel')
+    parser.add_argument('targets', nargs='*', help='targets or node names from the graph (default: full-stack)')
+    parser.add_argument('--graph', default=DEFAULT_GRAPH, help='graph file (default: deploy-graph.yml)')
+    parser.add_argument('--only', help='comma-separated nodes to run without the nodes they need')
+    parser.add_argument('--jobs', type=int, default=4, help='playbooks running at once (default: 4)')
+    parser.add_argument('--policy', choices=POLICIES, help='on failure (default: from the graph, fail-fast)')
+    parser.add_argument('--config', help='ANSIBLE_CONFIG for every playbook, e.g. ansible-perf.cfg')
+    parser.add_argument('--log-dir', help='directory for node logs (default: a new temporary directory)')
+    parser.add_argument('--dry-run', action='store_true', help='print the waves of nodes without running them')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(arguments)
+
+    graph = load_graph(args.graph)
+    if args.only:
+        names = [name.strip() for name in args.only.split(',') if name.strip()]
+        unknown = [name for name in names if name not in graph['nodes']]
+        if unknown:
+            raise SystemExit(f"unknown node(s): {', '.join(unknown)}")
+        nodes = dict((name, dict(graph['nodes'][name], needs=[need for need in graph['nodes'][name]['needs']
+                                                              if need in names])) for name in names)
+    else:
+        roots = []
+        for target in args.targets or ['full-stack']:
+            if target in graph['targets']:
+                roots.extend(graph['targets'][target])
+            elif target in graph['nodes']:
+                roots.append(target)
+            else:
+                raise SystemExit(f'unknown target or node: {target}')
+        nodes = select(graph['nodes'], roots)
+
+    weights = estimates(nodes)
+    if args.dry_run:
+        for number, wave in enumerate(waves(nodes), 1):
+            print(f'wave {number}: ' + ', '.join(f"{name} [{','.join(nodes[name]['hosts'])}]" for name in wave))
+        path_seconds, path = critical_path(nodes, dict((name, {'seconds': weights[name]}) for name in nodes))
+        print(f"estimated critical path: {' → '.join(path)} ({path_seconds:.0f}s"
+              f"{' from task history' if os.path.exists(HISTORY_FILE) else ', 1s per node without task history'})")
+        return 0
+
+    config = os.path.abspath(args.config) if args.config else None
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix='deploy-orchestrator-')
+    os.makedirs(log_dir, exist_ok=True)
+    start = time.monotonic()
+    results = schedule(nodes, playbook_launcher(log_dir, extra_args, config), args.jobs,
+                       args.policy or graph['policy'], weights)
+    summary = report(nodes, results, time.monotonic() - start)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+    return 0 if all(result['status'] == 'ok' or nodes[name]['allow_failure']
+                    for name, result in results.items()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
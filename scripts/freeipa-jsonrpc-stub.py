@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the FreeIPA JSON-RPC API, for testing the freeipa_batch
+module and playbooks without a FreeIPA server
+
+Implements password login (/ipa/session/login_password), the session
+endpoint (/ipa/session/json) and the commands the provisioning uses:
+batch, ping, group_add/show/del, user_add/show/del and group_add_member,
+with FreeIPA's result and error formats. Data is kept in memory.
+
+Usage:
+  python3 scripts/freeipa-jsonrpc-stub.py --port 8443 --password admin123
+  ansible-playbook playbooks/configure-freeipa-sonarqube-users.yml \\
+      -e freeipa_api_url=http://127.0.0.1:8443 -e freeipa_admin_password=admin123
+"""
+
+import argparse
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class IPAError(Exception):
+    def __init__(self, code, name, message):
+        super().__init__(message)
+        self.code = code
+        self.name = name
+
+
+def not_found(kind, name):
+    return IPAError(4001, 'NotFound', '%s: %s not found' % (name, kind))
+
+
+class Directory:
+    """Users and groups with the semantics of the FreeIPA commands"""
+
+    def __init__(self):
+        self.users = {}
+        self.groups = {}
+        self.lock = threading.Lock()
+        self.commands = []
+
+    def group_add(self, args, options):
+        name = args[0]
+        if name in self.groups:
+            raise IPAError(4002, 'DuplicateEntry', 'group with name "%s" already exists' % name)
+        self.groups[name] = {'cn': [name], 'description': [options.get('description', '')], 'member_user': []}
+        return {'result': self.groups[name], 'value': name, 'summary': 'Added group "%s"' % name}
+
+    def group_show(self, args, options):
+        if args[0] not in self.groups:
+            raise not_found('group', args[0])
+        return {'result': self.groups[args[0]], 'value': args[0], 'summary': None}
+
+    def group_del(self, args, options):
+        if self.groups.pop(args[0], None) is None:
+            raise not_found('group', args[0])
+        return {'result': {'failed': []}, 'value': args, 'summary': 'Deleted group "%s"' % args[0]}
+
+    def user_add(self, args, options):
+        name = args[0]
+        if name in self.users:
+            raise IPAError(4002, 'DuplicateEntry', 'user with name "%s" already exists' % name)
+        self.users[name] = {'uid': [name], 'givenname': [options['givenname']], 'sn': [options['sn']],
+                            'mail': [options.get('mail', '%s@ipa.test' % name)],
+                            'has_password': 'userpassword' in options, 'memberof_group': ['ipausers']}
+        return {'result': self.users[name], 'value': name, 'summary': 'Added user "%s"' % name}
+
+    def user_show(self, args, options):
+        if args[0] not in self.users:
+            raise not_found('user', args[0])
+        return {'result': self.users[args[0]], 'value': args[0], 'summary': None}
+
+    def user_del(self, args, options):
+        if self.users.pop(args[0], None) is None:
+            raise not_found('user', args[0])
+        for group in self.groups.values():
+            if args[0] in group['member_user']:
+                group['member_user'].remove(args[0])
+        return {'result': {'failed': []}, 'value': args, 'summary': 'Deleted user "%s"' % args[0]}
+
+    def group_add_member(self, args, options):
+        group = self.groups.get(args[0])
+        if group is None:
+            raise not_found('group', args[0])
+        failed, completed = [], 0
+        for name in options.get('user', []):
+            if name not in self.users:
+                failed.append([name, 'no such entry'])
+            elif name in group['member_user']:
+                failed.append([name, 'This entry is already a member'])
+            else:
+                group['member_user'].append(name)
+                self.users[name]['memberof_group'].append(args[0])
+                completed += 1
+        return {'result': group, 'failed': {'member': {'user': failed, 'group': []}}, 'completed': completed}
+
+    def ping(self, args, options):
+        return {'summary': 'IPA server version 4.11.0-stub. API version 2.253'}
+
+    def execute(self, method, args, options):
+        handler = getattr(self, method, None) if not method.startswith('_') else None
+        if handler is None or method in ('execute', 'batch'):
+            raise IPAError(901, 'CommandError', 'unknown command "%s"' % method)
+        self.commands.append(method)
+        return handler(args, options)
+
+    def batch(self, calls):
+        results = []
+        for call in calls:
+            args, options = call['params']
+            try:
+                results.append(dict(self.execute(call['method'], args, options), error=None))
+            except IPAError as e:
+                results.append({'error': str(e), 'error_code': e.code, 'error_name': e.name, 'error_kw': {}})
+        return {'count': len(results), 'results': results}
+
+
+class FreeIPAStub(BaseHTTPRequestHandler):
+    """HTTP front end; the server carries directory, credentials, sessions and latency"""
+
+    def send(self, status, body, content_type='application/json', cookie=None):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if cookie:
+            self.send_header('Set-Cookie', 'ipa_session=MagBearerToken=%s; Path=/ipa; HttpOnly' % cookie)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+
+    def do_POST(self):
+        server = self.server
+        if not (self.headers.get('Referer') or '').rstrip('/').endswith('/ipa'):
+            return self.send(400, 'Missing or invalid HTTP Referer', 'text/plain')
+        if server.latency:
+            time.sleep(server.latency)
+        if self.path == '/ipa/session/login_password':
+            form = parse_qs(self.body())
+            if form.get('user') != [server.user] or form.get('password') != [server.password]:
+                return self.send(401, 'Unauthorized', 'text/plain')
+            token = secrets.token_hex(8)
+            server.sessions.add(token)
+            server.logins += 1
+            return self.send(200, '', 'text/plain', cookie=token)
+        if self.path != '/ipa/session/json':
+            return self.send(404, 'Not Found', 'text/plain')
+        cookie = self.headers.get('Cookie', '')
+        if not any(cookie.find('MagBearerToken=%s' % token) >= 0 for token in server.sessions):
+            return self.send(401, 'Unauthorized', 'text/plain')
+
+        request = json.loads(self.body())
+        args, options = request['params']
+        server.requests += 1
+        with server.directory.lock:
+            try:
+                if request['method'] == 'batch':
+                    result = server.directory.batch(args)
+                else:
+                    result = server.directory.execute(request['method'], args, options)
+                reply = {'result': result, 'error': None, 'id': request.get('id'), 'principal': 'admin@IPA.TEST'}
+            except IPAError as e:
+                reply = {'result': None, 'error': {'code': e.code, 'name': e.name, 'message': str(e), 'data': {}},
+                         'id': request.get('id')}
+        self.send(200, json.dumps(reply))
+
+    def log_message(self, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=0, user='admin', password='admin123', latency=0.0):
+    """A stub server (not started); latency adds a delay per HTTP request like a remote server"""
+    server = ThreadingHTTPServer((host, port), FreeIPAStub)
+    server.directory = Directory()
+    server.user = user
+    server.password = password
+    server.latency = latency
+    server.sessions = set()
+    server.logins = 0
+    server.requests = 0
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local FreeIPA JSON-RPC stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every HTTP request')
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.user, args.password, args.latency)
+    print(f"FreeIPA stand-in on http://{args.host}:{server.server_address[1]} (user {args.user})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
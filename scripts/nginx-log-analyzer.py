@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Streaming analyzer for the nginx 'upstream_json' access log format
+
+Reads plain or gzip-rotated access logs line by line (plain files are
+memory-mapped, gzip files are decompressed as a stream) and reports per-backend
+and per-route latency percentiles, upstream vs proxy time, status mix and the
+slowest requests. With --follow it tails a live log and prints a rolling report.
+
+Usage:
+  nginx-log-analyzer.py /var/log/nginx/access.log /var/log/nginx/access.log.*.gz
+  nginx-log-analyzer.py --by route --top 20 /var/log/nginx/jenkins.example.com-ssl.access.log
+  nginx-log-analyzer.py --follow --interval 10 /var/log/nginx/access.log
+"""
+
+import argparse
+import gzip
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+PERCENTILES = (50, 95, 99)
+
+# Path segments that identify a single object rather than a route
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F]{8,}|[0-9a-fA-F-]{36}|lastSuccessfulBuild|lastBuild|lastFailedBuild)$')
+# Segments following these names are user-chosen (job, view, project keys)
+_NAMED_PARENTS = {'job': ':job', 'view': ':view', 'user': ':user', 'computer': ':node'}
+
+
+class LatencyHistogram:
+    """Fixed-memory latency histogram with ~2% relative error per bucket"""
+
+    GROWTH = 1.04
+    FLOOR = 0.0001  # 0.1 ms
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        if seconds <= self.FLOOR:
+            self.buckets[0] += 1
+        else:
+            self.buckets[int(math.log(seconds / self.FLOOR, self.GROWTH)) + 1] += 1
+
+    def percentile(self, pct):
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * pct / 100.0))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                if index == 0:
+                    return self.FLOOR
+                # Upper edge of the bucket, capped by the observed maximum
+                return min(self.FLOOR * self.GROWTH ** index, self.maximum)
+        return self.maximum
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class Stats:
+    """Aggregated statistics for one backend or route"""
+
+    def __init__(self):
+        self.requests = 0
+        self.request_time = LatencyHistogram()
+        self.upstream_time = LatencyHistogram()
+        self.connect_time = LatencyHistogram()
+        self.proxy_time = LatencyHistogram()
+        self.statuses = Counter()
+        self.cache = Counter()
+
+    def add(self, record):
+        self.requests += 1
+        self.statuses[record['status_class']] += 1
+        if record['request_time'] is not None:
+            self.request_time.add(record['request_time'])
+        if record['upstream_response_time'] is not None:
+            self.upstream_time.add(record['upstream_response_time'])
+            if record['request_time'] is not None:
+                self.proxy_time.add(max(0.0, record['request_time'] - record['upstream_response_time']))
+        if record['upstream_connect_time'] is not None:
+            self.connect_time.add(record['upstream_connect_time'])
+        if record['upstream_cache_status']:
+            self.cache[record['upstream_cache_status']] += 1
+
+    def to_dict(self):
+        def summary(hist):
+            result = {'count': hist.count, 'mean': hist.mean(), 'max': hist.maximum if hist.count else None}
+            for pct in PERCENTILES:
+                result[f'p{pct}'] = hist.percentile(pct)
+            return result
+
+        return {
+            'requests': self.requests,
+            'request_time': summary(self.request_time),
+            'upstream_response_time': summary(self.upstream_time),
+            'upstream_connect_time': summary(self.connect_time),
+            'proxy_time': summary(self.proxy_time),
+            'status': dict(sorted(self.statuses.items())),
+            'cache': dict(sorted(self.cache.items())),
+        }
+
+
+class Report:
+    """Streaming aggregation over parsed log records"""
+
+    def __init__(self, route_depth=4, top=10):
+        self.route_depth = route_depth
+        self.top = top
+        self.backends = {}
+        self.routes = {}
+        self.slowest = []
+        self.parsed = 0
+        self.skipped = 0
+
+    def add(self, record):
+        self.parsed += 1
+        backend = record['backend']
+        route = route_key(record['uri'], self.route_depth)
+        self.backends.setdefault(backend, Stats()).add(record)
+        self.routes.setdefault((backend, route), Stats()).add(record)
+
+        if record['request_time'] is not None:
+            entry = (record['request_time'], record['time'], backend, record['method'], record['uri'], record['status'])
+            if len(self.slowest) < self.top:
+                heapq.heappush(self.slowest, entry)
+            elif entry[0] > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def to_dict(self):
+        return {
+            'parsed': self.parsed,
+            'skipped': self.skipped,
+            'backends': {name: stats.to_dict() for name, stats in sorted(self.backends.items())},
+            'routes': [
+                dict(backend=backend, route=route, **stats.to_dict())
+                for (backend, route), stats in sorted(
+                    self.routes.items(), key=lambda item: item[1].request_time.total, reverse=True)
+            ],
+            'slowest': [
+                {'request_time': entry[0], 'time': entry[1], 'backend': entry[2],
+                 'method': entry[3], 'uri': entry[4], 'status': entry[5]}
+                for entry in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+def parse_time(value):
+    """Parse an nginx timing value; retries ('0.1, 0.2') and redirects ('0.1 : 0.2') are summed"""
+    if value is None:
+        return None
+    total = None
+    for part in re.split(r'[,:]', str(value)):
+        part = part.strip()
+        if not part or part == '-':
+            continue
+        try:
+            total = (total or 0.0) + float(part)
+        except ValueError:
+            continue
+    return total
+
+
+def route_key(uri, depth=4):
+    """Collapse a request URI into a route: drop the query and replace IDs and names with placeholders"""
+    path = (uri or '/').split('?', 1)[0]
+    segments = [segment for segment in path.split('/') if segment]
+    normalized = []
+    for index, segment in enumerate(segments[:depth]):
+        parent = segments[index - 1] if index else None
+        if parent in _NAMED_PARENTS:
+            normalized.append(_NAMED_PARENTS[parent])
+        elif _ID_SEGMENT.match(segment):
+            normalized.append(':id')
+        else:
+            normalized.append(segment)
+    route = '/' + '/'.join(normalized)
+    if len(segments) > depth:
+        route += '/...'
+    return route
+
+
+def parse_record(line):
+    """Turn one JSON log line into a normalized record, or None if it is not an upstream_json line"""
+    try:
+        raw = json.loads(line)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(raw, dict) or 'request_time' not in raw:
+        return None
+    status = str(raw.get('status', ''))
+    cache_status = raw.get('upstream_cache_status') or ''
+    return {
+        'time': raw.get('time', ''),
+        'backend': raw.get('backend') or raw.get('host') or '-',
+        'method': raw.get('method', ''),
+        'uri': raw.get('uri', '/'),
+        'status': status,
+        'status_class': status[:1] + 'xx' if status[:1].isdigit() else status or '-',
+        'request_time': parse_time(raw.get('request_time')),
+        'upstream_response_time': parse_time(raw.get('upstream_response_time')),
+        'upstream_connect_time': parse_time(raw.get('upstream_connect_time')),
+        'upstream_cache_status': cache_status if cache_status != '-' else '',
+    }
+
+
+def iter_lines(path):
+    """Yield decoded lines from a plain (memory-mapped) or gzip-compressed log file"""
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as handle:
+            for line in handle:
+                yield line.decode('utf-8', 'replace')
+        return
+
+    with open(path, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b''):
+                yield line.decode('utf-8', 'replace')
+
+
+def iter_records(lines, report=None):
+    """Parse lines into records, counting unparseable lines on the report"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        record = parse_record(line)
+        if record is None:
+            if report is not None:
+                report.skipped += 1
+            continue
+        yield record
+
+
+def follow(path, poll_interval=1.0):
+    """Tail a log file, reopening it when logrotate replaces or truncates it"""
+    handle = open(path, 'rb')
+    handle.seek(0, os.SEEK_END)
+    inode = os.fstat(handle.fileno()).st_ino
+    buffered = b''
+    try:
+        while True:
+            chunk = handle.readline()
+            if chunk:
+                buffered += chunk
+                if buffered.endswith(b'\n'):
+                    yield buffered.decode('utf-8', 'replace')
+                    buffered = b''
+                continue
+            time.sleep(poll_interval)
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if current.st_ino != inode or current.st_size < handle.tell():
+                handle.close()
+                handle = open(path, 'rb')
+                inode = os.fstat(handle.fileno()).st_ino
+                buffered = b''
+    finally:
+        handle.close()
+
+
+def format_seconds(value):
+    if value is None:
+        return '-'
+    if value < 1:
+        return f'{value * 1000:.0f}ms'
+    return f'{value:.2f}s'
+
+
+def print_report(report, group_by, limit, stream=sys.stdout):
+    data = report.to_dict()
+    write = stream.write
+    write(f"\n📊 Parsed {data['parsed']} requests ({data['skipped']} skipped lines)\n")
+
+    header = f"{'requests':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'upstream p95':>13} {'proxy p95':>10} {'connect p95':>12}  status\n"
+
+    def row(name, stats):
+        status = ' '.join(f'{key}:{value}' for key, value in stats['status'].items())
+        cache = ' '.join(f'{key}:{value}' for key, value in stats['cache'].items())
+        write(
+            f"{stats['requests']:>9} "
+            f"{format_seconds(stats['request_time']['p50']):>8} "
+            f"{format_seconds(stats['request_time']['p95']):>8} "
+            f"{format_seconds(stats['request_time']['p99']):>8} "
+            f"{format_seconds(stats['upstream_response_time']['p95']):>13} "
+            f"{format_seconds(stats['proxy_time']['p95']):>10} "
+            f"{format_seconds(stats['upstream_connect_time']['p95']):>12}  "
+            f"{status}{'  cache ' + cache if cache else ''}  {name}\n"
+        )
+
+    if group_by in ('backend', 'all'):
+        write('\n=== Per-backend latency ===\n')
+        write(header)
+        for name, stats in data['backends'].items():
+            row(name, stats)
+
+    if group_by in ('route', 'all'):
+        write(f'\n=== Top {limit} routes by total time ===\n')
+        write(header)
+        for stats in data['routes'][:limit]:
+            row(f"{stats['backend']} {stats['route']}", stats)
+
+    write(f'\n=== Slowest {len(data["slowest"])} requests ===\n')
+    for entry in data['slowest']:
+        write(f"{format_seconds(entry['request_time']):>8}  {entry['status']}  {entry['backend']:<10} "
+              f"{entry['method']} {entry['uri']}  ({entry['time']})\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze nginx upstream_json access logs')
+    parser.add_argument('logs', nargs='+', help='Access log files (plain or .gz)')
+    parser.add_argument('--by', choices=['backend', 'route', 'all'], default='all', help='Grouping to report')
+    parser.add_argument('--top', type=int, default=10, help='Number of routes and slowest requests to show')
+    parser.add_argument('--route-depth', type=int, default=4, help='Path segments kept when grouping routes')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--follow', action='store_true', help='Tail the (single) log file and report periodically')
+    parser.add_argument('--interval', type=float, default=10.0, help='Seconds between reports in --follow mode')
+
+    args = parser.parse_args()
+    report = Report(route_depth=args.route_depth, top=args.top)
+
+    def emit():
+        if args.json:
+            json.dump(report.to_dict(), sys.stdout, indent=2)
+            sys.stdout.write('\n')
+        else:
+            print_report(report, args.by, args.top)
+        sys.stdout.flush()
+
+    try:
+        if args.follow:
+            if len(args.logs) != 1 or args.logs[0].endswith('.gz'):
+                parser.error('--follow needs exactly one uncompressed log file')
+            next_report = time.monotonic() + args.interval
+            for record in iter_records(follow(args.logs[0]), report):
+                report.add(record)
+                if time.monotonic() >= next_report:
+                    emit()
+                    next_report = time.monotonic() + args.interval
+        else:
+            for path in args.logs:
+                for record in iter_records(iter_lines(path), report):
+                    report.add(record)
+            emit()
+    except KeyboardInterrupt:
+        emit()
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
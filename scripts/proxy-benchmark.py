@@ -0,0 +1,701 @@
+#!/usr/bin/env python3
+"""
+Load-testing harness for the dynamic nginx proxy templates
+
+Starts local stub backends that imitate Jenkins (pages, streamed console
+output, large artifacts, websocket agents), SonarQube (JSON API) and Keycloak
+(discovery document, token endpoint), renders dynamic-backends.conf.j2 or
+dynamic-backends-ssl.conf.j2 against them, runs a throwaway nginx with the
+result and drives concurrent load with an asyncio client. Reports requests/s,
+latency percentiles per scenario, upstream connection reuse and nginx CPU per
+request, so template variants can be compared before they are rolled out.
+
+A variant is a YAML file of role variable overrides (see examples/proxy-variants/);
+'backend_options' entries are merged into the stub backends whose server name
+starts with the given key (e.g. to try 'limits').
+
+Usage:
+  proxy-benchmark.py                                   # HTTP template, role defaults
+  proxy-benchmark.py --template ssl --duration 30 --concurrency 64
+  proxy-benchmark.py --variant defaults --variant keepalive=examples/proxy-variants/keepalive-64.yml
+  proxy-benchmark.py --direct                          # stub backends without nginx (baseline)
+  proxy-benchmark.py --render-only --variant examples/proxy-variants/jenkins-artifacts-unbuffered.yml
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import yaml
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES = {
+    'http': ('roles/setup-nginx-reverse-proxy', 'dynamic-backends.conf.j2'),
+    'ssl': ('roles/install-ssl-cert', 'dynamic-backends-ssl.conf.j2'),
+}
+BACKENDS = {
+    'jenkins': 'jenkins.bench.local',
+    'sonar': 'sonar.bench.local',
+    'keycloak': 'keycloak.bench.local',
+}
+# name: (backend, method, path, default weight)
+SCENARIOS = {
+    'jenkins_page': ('jenkins', 'GET', '/job/demo/', 30),
+    'jenkins_console': ('jenkins', 'GET', '/job/demo/1/logText/progressiveText?start=0', 10),
+    'jenkins_artifact': ('jenkins', 'GET', '/job/demo/1/artifact/build.tar', 2),
+    'jenkins_websocket': ('jenkins', 'GET', '/wsagents/', 3),
+    'sonar_api': ('sonar', 'GET', '/api/measures/component?component=demo&metricKeys=coverage', 25),
+    'keycloak_discovery': ('keycloak', 'GET', '/realms/demo/.well-known/openid-configuration', 20),
+    'keycloak_token': ('keycloak', 'POST', '/realms/demo/protocol/openid-connect/token', 10),
+}
+STATS_PATH = '/__bench/stats'
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC11B65'
+WEBSOCKET_MESSAGES = 10
+
+
+# --- HTTP/1.1 wire helpers shared by the stubs and the client -----------------
+
+async def read_head(reader):
+    """Read a request or response head; return (first line, lower-cased headers)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+async def read_body(reader, headers):
+    """Consume a message body; return its length in bytes"""
+    if 'chunked' in headers.get('transfer-encoding', ''):
+        total = 0
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b''):
+                    pass
+                return total
+            await reader.readexactly(size + 2)
+            total += size
+    if 'content-length' in headers:
+        remaining = int(headers['content-length'])
+        total = remaining
+        while remaining:
+            remaining -= len(await reader.readexactly(min(remaining, 65536)))
+        return total
+    return 0
+
+
+def websocket_frame(payload, opcode=0x1, mask=False):
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 65536:
+        header += bytes([mask_bit | 126]) + length.to_bytes(2, 'big')
+    else:
+        header += bytes([mask_bit | 127]) + length.to_bytes(8, 'big')
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + bytes(byte ^ key[i % 4] for i, byte in enumerate(payload))
+
+
+async def read_websocket_frame(reader):
+    first, second = await reader.readexactly(2)
+    length = second & 0x7f
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), 'big')
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), 'big')
+    key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if key:
+        payload = bytes(byte ^ key[i % 4] for i, byte in enumerate(payload))
+    return first & 0x0f, payload
+
+
+# --- Stub backends -------------------------------------------------------------
+
+class StubBackend:
+    """Keep-alive HTTP/1.1 server imitating the response shapes of one service"""
+
+    def __init__(self, name, artifact_bytes, console_lines):
+        self.name = name
+        self.artifact_bytes = artifact_bytes
+        self.console_lines = console_lines
+        self.connections = 0
+        self.requests = 0
+        self.websockets = 0
+        self.page = (b'<html><body>' + b'<div class="build">#1 SUCCESS</div>' * 250 + b'</body></html>')
+        self.block = os.urandom(65536)
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request_line, headers = await read_head(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                await read_body(reader, headers)
+                method, target = request_line.split(' ')[:2]
+                path = target.split('?')[0]
+                if path == STATS_PATH:
+                    await self.respond(writer, 200, json.dumps(self.stats()).encode(), 'application/json')
+                    continue
+                self.requests += 1
+                if headers.get('upgrade', '').lower() == 'websocket':
+                    await self.websocket(reader, writer, headers)
+                    return
+                await self.route(writer, method, path)
+                if headers.get('connection', '').lower() == 'close':
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, writer, method, path):
+        if self.name == 'jenkins':
+            if path.endswith('/progressiveText'):
+                await self.stream_console(writer)
+            elif '/artifact/' in path:
+                await self.send_artifact(writer)
+            else:
+                await self.respond(writer, 200, self.page, 'text/html;charset=utf-8')
+        elif self.name == 'sonar':
+            body = {'component': {'key': 'demo', 'measures': [{'metric': 'coverage', 'value': '87.5'}] * 40}}
+            await self.respond(writer, 200, json.dumps(body).encode(), 'application/json')
+        elif path.endswith('/token') and method == 'POST':
+            body = {'access_token': base64.b64encode(os.urandom(900)).decode(), 'expires_in': 300, 'token_type': 'Bearer'}
+            await self.respond(writer, 200, json.dumps(body).encode(), 'application/json',
+                               extra={'Cache-Control': 'no-store'})
+        else:
+            realm = 'http://keycloak.bench.local/realms/demo'
+            body = {'issuer': realm, 'jwks_uri': f'{realm}/protocol/openid-connect/certs',
+                    'token_endpoint': f'{realm}/protocol/openid-connect/token',
+                    'grant_types_supported': ['authorization_code', 'client_credentials', 'refresh_token'] * 10}
+            await self.respond(writer, 200, json.dumps(body).encode(), 'application/json')
+
+    async def respond(self, writer, status, body, content_type, extra=None):
+        headers = {'Content-Type': content_type, 'Content-Length': str(len(body)), **(extra or {})}
+        writer.write(f'HTTP/1.1 {status} OK\r\n'.encode()
+                     + ''.join(f'{name}: {value}\r\n' for name, value in headers.items()).encode() + b'\r\n' + body)
+        await writer.drain()
+
+    async def stream_console(self, writer):
+        """Chunked console output written as the 'build' progresses"""
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/plain;charset=utf-8\r\n'
+                     b'X-More-Data: true\r\nTransfer-Encoding: chunked\r\n\r\n')
+        for line in range(self.console_lines):
+            chunk = f'[{line:05d}] Building module {line % 7} ... ok\n'.encode()
+            writer.write(f'{len(chunk):x}\r\n'.encode() + chunk + b'\r\n')
+            await writer.drain()
+            await asyncio.sleep(0.002)
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    async def send_artifact(self, writer):
+        writer.write(f'HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream\r\n'
+                     f'Content-Length: {self.artifact_bytes}\r\n\r\n'.encode())
+        remaining = self.artifact_bytes
+        while remaining:
+            chunk = self.block[:min(remaining, len(self.block))]
+            writer.write(chunk)
+            remaining -= len(chunk)
+            await writer.drain()
+
+    async def websocket(self, reader, writer, headers):
+        """Echo server for the /wsagents/ handshake and frames"""
+        self.websockets += 1
+        accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + WEBSOCKET_GUID).encode()).digest())
+        writer.write(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                     b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+        await writer.drain()
+        while True:
+            try:
+                opcode, payload = await read_websocket_frame(reader)
+            except asyncio.IncompleteReadError:
+                return
+            if opcode == 0x8:
+                writer.write(websocket_frame(payload, opcode=0x8))
+                await writer.drain()
+                return
+            writer.write(websocket_frame(payload, opcode=opcode))
+            await writer.drain()
+
+    def stats(self):
+        return {'connections': self.connections, 'requests': self.requests, 'websockets': self.websockets}
+
+
+def run_stubs(queue, artifact_bytes, console_lines):
+    """Child process entry point: serve all stub backends until terminated"""
+    async def serve():
+        ports = {}
+        servers = []
+        for name in BACKENDS:
+            stub = StubBackend(name, artifact_bytes, console_lines)
+            server = await asyncio.start_server(stub.handle, '127.0.0.1', 0, backlog=1024)
+            servers.append(server)
+            ports[name] = server.sockets[0].getsockname()[1]
+        queue.put(ports)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+async def fetch_stub_stats(ports):
+    stats = {}
+    for name, port in ports.items():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {STATS_PATH} HTTP/1.1\r\nHost: stub\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        _, headers = await read_head(reader)
+        stats[name] = json.loads(await reader.readexactly(int(headers['content-length'])))
+        writer.close()
+    return stats
+
+
+# --- Template rendering and the throwaway nginx --------------------------------
+
+def load_defaults(role):
+    """Load role defaults and resolve self-references like '{{ ssl_cert_dir }}/site.crt'"""
+    with open(os.path.join(ROOT, role, 'defaults', 'main.yml')) as handle:
+        variables = yaml.safe_load(handle) or {}
+    env = Environment()
+    for _ in range(5):
+        for key, value in variables.items():
+            if isinstance(value, str) and '{{' in value:
+                try:
+                    variables[key] = env.from_string(value).render(**variables)
+                except Exception:
+                    pass
+    return variables
+
+
+def load_variant(spec):
+    """'name=file.yml', 'file.yml' or a bare name for role defaults"""
+    name, _, path = spec.rpartition('=') if '=' in spec else ('', '', spec)
+    if not path.endswith(('.yml', '.yaml')):
+        return name or path, {}
+    with open(path) as handle:
+        overrides = yaml.safe_load(handle) or {}
+    return name or os.path.splitext(os.path.basename(path))[0], overrides
+
+
+def render_config(template, workdir, ports, listen_port, overrides):
+    role, template_name = TEMPLATES[template]
+    overrides = dict(overrides)
+    backend_options = overrides.pop('backend_options', {})
+    site_backends = []
+    for name, server_name in BACKENDS.items():
+        backend = {'server_name': server_name, 'ip': '127.0.0.1', 'port': ports[name]}
+        for prefix, options in backend_options.items():
+            if server_name.startswith(prefix):
+                backend.update(options)
+        site_backends.append(backend)
+
+    variables = load_defaults(role)
+    variables.update({
+        'ansible_date_time': {'iso8601': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())},
+        'site_backends': site_backends,
+        'nginx_listen_port': listen_port,
+        'nginx_http_port': listen_port + 1,
+        'nginx_https_port': listen_port,
+        'nginx_access_log': f'{workdir}/logs/access.log',
+        'nginx_error_log': f'{workdir}/logs/error.log',
+        'jenkins_war_root': f'{workdir}/war',
+        'jenkins_home': f'{workdir}/jenkins',
+        'ssl_cert_dir': f'{workdir}/tls',
+        'ssl_dhparam_file': f'{workdir}/tls/dhparam.pem',
+        'nginx_upstream_healthcheck_enabled': False,
+        # Resolved from the inventory by Ansible; the stub backends are single local servers
+        'nginx_upstream_servers': {backend['server_name']: [f"{backend['ip']}:{backend['port']}"]
+                                   for backend in site_backends},
+    })
+    variables.update(overrides)
+    env = Environment(loader=FileSystemLoader(os.path.join(ROOT, role, 'templates')),
+                      trim_blocks=True, undefined=StrictUndefined)
+    config = env.get_template(template_name).render(**variables)
+    # The SSL template hardcodes system paths; keep everything inside the work directory
+    for system_path, local in (('/var/log/nginx/', 'logs/'), ('/var/run/jenkins/war/', 'war/'), ('/var/lib/jenkins/', 'jenkins/')):
+        config = config.replace(system_path, f'{workdir}/{local}')
+    return config
+
+
+def create_certificates(workdir):
+    tls = os.path.join(workdir, 'tls')
+    for server_name in BACKENDS.values():
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-subj', f'/CN={server_name}', '-keyout', f'{tls}/{server_name}.key',
+                        '-out', f'{tls}/{server_name}.crt'], check=True, capture_output=True)
+    subprocess.run(['openssl', 'dhparam', '-dsaparam', '-out', f'{tls}/dhparam.pem', '2048'],
+                   check=True, capture_output=True)
+
+
+def write_nginx_conf(workdir, workers):
+    with open(os.path.join(workdir, 'nginx.conf'), 'w') as handle:
+        handle.write(f"""worker_processes {workers};
+pid {workdir}/nginx.pid;
+error_log {workdir}/logs/error.log warn;
+
+events {{
+  worker_connections 4096;
+}}
+
+http {{
+  client_body_temp_path {workdir}/tmp/client;
+  proxy_temp_path {workdir}/tmp/proxy;
+  fastcgi_temp_path {workdir}/tmp/fastcgi;
+  uwsgi_temp_path {workdir}/tmp/uwsgi;
+  scgi_temp_path {workdir}/tmp/scgi;
+  access_log {workdir}/logs/access.log;
+  include {workdir}/conf.d/*.conf;
+}}
+""")
+
+
+def start_nginx(nginx, workdir, port):
+    command = [nginx, '-p', workdir, '-c', os.path.join(workdir, 'nginx.conf')]
+    test = subprocess.run(command + ['-t'], capture_output=True, text=True)
+    if test.returncode != 0:
+        raise RuntimeError(f'nginx -t failed:\n{test.stderr}')
+    process = subprocess.Popen(command + ['-g', 'daemon off;'], stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f'nginx exited: {process.stderr.read().decode()}')
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('nginx did not start listening')
+
+
+def process_cpu_seconds(root_pid):
+    """User+system CPU of a process and its children from /proc (Linux only)"""
+    ticks = os.sysconf('SC_CLK_TCK')
+    total = 0
+    try:
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as handle:
+                    fields = handle.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+            if int(entry) == root_pid or int(fields[1]) == root_pid:
+                total += int(fields[11]) + int(fields[12])
+    except OSError:
+        return None
+    return total / ticks
+
+
+# --- Load client -----------------------------------------------------------------
+
+class Results:
+    def __init__(self):
+        self.latencies = {name: [] for name in SCENARIOS}
+        self.status = Counter()
+        self.errors = Counter()
+        self.bytes = 0
+
+    def record(self, scenario, seconds, status, size):
+        self.latencies[scenario].append(seconds)
+        self.status[f'{status // 100}xx'] += 1
+        self.bytes += size
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))]
+
+
+class LoadClient:
+    """One simulated user: keep-alive connections per virtual host, weighted scenario mix"""
+
+    def __init__(self, targets, tls, weights, results):
+        self.targets = targets
+        self.tls = tls
+        self.names = list(weights)
+        self.weights = [weights[name] for name in self.names]
+        self.results = results
+        self.connections = {}
+
+    async def connect(self, host):
+        address, port = self.targets[host]
+        if not self.tls:
+            return await asyncio.open_connection(address, port)
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return await asyncio.open_connection(address, port, ssl=context, server_hostname=host)
+
+    async def request(self, host, method, path):
+        if host not in self.connections:
+            self.connections[host] = await self.connect(host)
+        reader, writer = self.connections[host]
+        head = f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: proxy-benchmark\r\n'
+        body = b''
+        if method == 'POST':
+            body = b'grant_type=client_credentials&client_id=bench&client_secret=bench'
+            head += f'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(body)}\r\n'
+        writer.write(head.encode() + b'\r\n' + body)
+        await writer.drain()
+        status_line, headers = await read_head(reader)
+        size = await read_body(reader, headers)
+        if headers.get('connection', '').lower() == 'close':
+            writer.close()
+            del self.connections[host]
+        return int(status_line.split()[1]), size
+
+    async def websocket(self, host, path):
+        reader, writer = await self.connect(host)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                     f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n'.encode())
+        await writer.drain()
+        status_line, _ = await read_head(reader)
+        status = int(status_line.split()[1])
+        size = 0
+        if status == 101:
+            for message in range(WEBSOCKET_MESSAGES):
+                writer.write(websocket_frame(f'ping {message}'.encode() * 8, mask=True))
+                await writer.drain()
+                _, payload = await read_websocket_frame(reader)
+                size += len(payload)
+            writer.write(websocket_frame(b'', opcode=0x8, mask=True))
+            await writer.drain()
+        writer.close()
+        return status, size
+
+    async def run(self, stop_at, record_from):
+        while time.monotonic() < stop_at:
+            scenario = random.choices(self.names, self.weights)[0]
+            backend, method, path, _ = SCENARIOS[scenario]
+            host = BACKENDS[backend]
+            started = time.monotonic()
+            try:
+                if scenario == 'jenkins_websocket':
+                    status, size = await self.websocket(host, path)
+                else:
+                    status, size = await self.request(host, method, path)
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                if started >= record_from:
+                    self.results.errors[f'{scenario}: {type(e).__name__}'] += 1
+                if host in self.connections:
+                    self.connections.pop(host)[1].close()
+                continue
+            if started >= record_from:
+                self.results.record(scenario, time.monotonic() - started, status, size)
+        for _, writer in self.connections.values():
+            writer.close()
+
+
+async def drive_load(targets, tls, weights, concurrency, duration, warmup):
+    results = Results()
+    record_from = time.monotonic() + warmup
+    stop_at = record_from + duration
+    clients = [LoadClient(targets, tls, weights, results) for _ in range(concurrency)]
+    await asyncio.gather(*(client.run(stop_at, record_from) for client in clients))
+    return results
+
+
+# --- Benchmark runs and reporting ------------------------------------------------
+
+def summarize(name, results, duration, upstream_before, upstream_after, nginx_cpu, client_cpu):
+    requests = sum(len(values) for values in results.latencies.values())
+    overall = [value for values in results.latencies.values() for value in values]
+    upstream = {}
+    for backend in BACKENDS:
+        connections = upstream_after[backend]['connections'] - upstream_before[backend]['connections'] - 1
+        served = upstream_after[backend]['requests'] - upstream_before[backend]['requests']
+        upstream[backend] = {
+            'connections': connections,
+            'requests': served,
+            'requests_per_connection': round(served / connections, 1) if connections > 0 else None,
+        }
+    return {
+        'variant': name,
+        'requests': requests,
+        'errors': sum(results.errors.values()),
+        'error_detail': dict(results.errors),
+        'requests_per_second': round(requests / duration, 1),
+        'megabytes_per_second': round(results.bytes / duration / 1e6, 1),
+        'status': dict(results.status),
+        'latency_ms': {'p50': ms(percentile(overall, 50)), 'p95': ms(percentile(overall, 95)),
+                       'p99': ms(percentile(overall, 99))},
+        'scenarios': {
+            scenario: {'requests': len(values), 'p50_ms': ms(percentile(values, 50)),
+                       'p95_ms': ms(percentile(values, 95)), 'p99_ms': ms(percentile(values, 99))}
+            for scenario, values in results.latencies.items() if values
+        },
+        'upstream': upstream,
+        'nginx_cpu_us_per_request': round(nginx_cpu / requests * 1e6, 1) if nginx_cpu is not None and requests else None,
+        'client_cpu_us_per_request': round(client_cpu / requests * 1e6, 1) if requests else None,
+    }
+
+
+def ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+async def run_variant(args, name, overrides, ports, weights):
+    workdir = tempfile.mkdtemp(prefix='proxy-benchmark-')
+    nginx = None
+    try:
+        if args.direct:
+            targets = {host: ('127.0.0.1', ports[backend]) for backend, host in BACKENDS.items()}
+            tls = False
+        else:
+            for directory in ('conf.d', 'logs', 'tmp', 'tls', 'war', 'jenkins'):
+                os.makedirs(os.path.join(workdir, directory))
+            tls = args.template == 'ssl'
+            if tls:
+                create_certificates(workdir)
+            with open(os.path.join(workdir, 'conf.d', 'dynamic-backends.conf'), 'w') as handle:
+                handle.write(render_config(args.template, workdir, ports, args.port, overrides))
+            write_nginx_conf(workdir, args.workers)
+            nginx = start_nginx(args.nginx, workdir, args.port)
+            targets = {host: ('127.0.0.1', args.port) for host in BACKENDS.values()}
+
+        upstream_before = await fetch_stub_stats(ports)
+        cpu_before = process_cpu_seconds(nginx.pid) if nginx else None
+        client_before = resource.getrusage(resource.RUSAGE_SELF)
+        results = await drive_load(targets, tls, weights, args.concurrency, args.duration, args.warmup)
+        client_after = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_after = process_cpu_seconds(nginx.pid) if nginx else None
+        upstream_after = await fetch_stub_stats(ports)
+    finally:
+        if nginx:
+            nginx.terminate()
+            nginx.wait()
+        if args.keep:
+            print(f'Work directory kept: {workdir}', file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    nginx_cpu = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+    client_cpu = (client_after.ru_utime + client_after.ru_stime) - (client_before.ru_utime + client_before.ru_stime)
+    # Warmup traffic is included in the CPU and upstream deltas; scale to the measured window
+    share = args.duration / (args.duration + args.warmup)
+    return summarize(name, results, args.duration, upstream_before, upstream_after,
+                     None if nginx_cpu is None else nginx_cpu * share, client_cpu * share)
+
+
+def print_report(summaries):
+    def row(label, values):
+        print(f"{label:<34}" + ''.join(f"{'-' if value is None else value!s:>16}" for value in values))
+
+    print()
+    row('', [summary['variant'] for summary in summaries])
+    row('requests/s', [summary['requests_per_second'] for summary in summaries])
+    row('MB/s', [summary['megabytes_per_second'] for summary in summaries])
+    row('errors', [summary['errors'] for summary in summaries])
+    for pct in ('p50', 'p95', 'p99'):
+        row(f'latency {pct} ms', [summary['latency_ms'][pct] for summary in summaries])
+    for scenario in SCENARIOS:
+        row(f'{scenario} p95 ms', [summary['scenarios'].get(scenario, {}).get('p95_ms') for summary in summaries])
+    for backend in BACKENDS:
+        row(f'{backend} requests/upstream conn',
+            [summary['upstream'][backend]['requests_per_connection'] for summary in summaries])
+    row('nginx CPU us/request', [summary['nginx_cpu_us_per_request'] for summary in summaries])
+    row('client CPU us/request', [summary['client_cpu_us_per_request'] for summary in summaries])
+    for summary in summaries:
+        if summary['error_detail']:
+            print(f"\nErrors for {summary['variant']}: {summary['error_detail']}")
+
+
+def parse_mix(spec):
+    weights = {name: scenario[3] for name, scenario in SCENARIOS.items()}
+    if spec:
+        weights = dict.fromkeys(SCENARIOS, 0)
+        for item in spec.split(','):
+            name, _, weight = item.partition('=')
+            if name not in SCENARIOS:
+                raise SystemExit(f'Unknown scenario {name}; choose from {", ".join(SCENARIOS)}')
+            weights[name] = float(weight or 1)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dynamic nginx proxy templates against stub backends')
+    parser.add_argument('--template', choices=TEMPLATES, default='http', help='template to render (default: http)')
+    parser.add_argument('--variant', action='append', default=[],
+                        help="NAME=overrides.yml, overrides.yml or NAME for role defaults (repeatable)")
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent simulated clients')
+    parser.add_argument('--duration', type=float, default=15, help='measured seconds per variant')
+    parser.add_argument('--warmup', type=float, default=2, help='unmeasured seconds before each run')
+    parser.add_argument('--mix', help='scenario weights, e.g. jenkins_page=5,sonar_api=1 (default: built-in mix)')
+    parser.add_argument('--artifact-mb', type=float, default=8, help='size of the Jenkins artifact download')
+    parser.add_argument('--console-lines', type=int, default=50, help='lines per streamed console response')
+    parser.add_argument('--port', type=int, default=18080, help='local port for the benchmark nginx')
+    parser.add_argument('--workers', default='2', help='nginx worker_processes')
+    parser.add_argument('--nginx', default='nginx', help='nginx binary')
+    parser.add_argument('--direct', action='store_true', help='load the stub backends directly, without nginx')
+    parser.add_argument('--render-only', action='store_true', help='print the rendered configuration and exit')
+    parser.add_argument('--keep', action='store_true', help='keep the nginx work directory (logs, config)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    variants = [load_variant(spec) for spec in args.variant] or [('defaults', {})]
+    if args.direct:
+        variants = [('direct', {})]
+    elif args.render_only:
+        for name, overrides in variants:
+            print(f'# --- variant: {name} ---')
+            placeholder_ports = {backend: args.port + 10 + index for index, backend in enumerate(BACKENDS)}
+            print(render_config(args.template, '/tmp/proxy-benchmark', placeholder_ports, args.port, overrides))
+        return 0
+    elif not shutil.which(args.nginx):
+        print(f'nginx binary not found ({args.nginx}); use --nginx or --direct', file=sys.stderr)
+        return 1
+
+    weights = parse_mix(args.mix)
+    queue = multiprocessing.Queue()
+    stubs = multiprocessing.Process(target=run_stubs, daemon=True,
+                                    args=(queue, int(args.artifact_mb * 1024 * 1024), args.console_lines))
+    stubs.start()
+    try:
+        ports = queue.get(timeout=10)
+        summaries = []
+        for name, overrides in variants:
+            print(f'Running {name}: {args.concurrency} clients for {args.duration:g}s...', file=sys.stderr)
+            summaries.append(asyncio.run(run_variant(args, name, overrides, ports, weights)))
+    finally:
+        stubs.terminate()
+        stubs.join()
+
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        print_report(summaries)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Query the task duration history recorded by the task_history callback plugin
+
+Every playbook run appends one line to .ansible/task-history.jsonl (see
+callback_plugins/task_history.py); this script summarizes it.
+
+Usage:
+  task-history.py runs                                   # recent runs: playbook, revision, duration, counts
+  task-history.py slowest --playbook playbooks/install-jenkins.yml
+  task-history.py trend --task 'install-jenkins : Install Jenkins plugins'
+  task-history.py regressions --threshold 1.3            # latest run of every playbook against its median
+  task-history.py runs --json
+"""
+
+import argparse
+import fnmatch
+import importlib.util
+import json
+import os
+import statistics
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location('task_history', os.path.join(ROOT, 'callback_plugins', 'task_history.py'))
+task_history = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(task_history)
+
+DEFAULT_FILE = os.path.join(ROOT, '.ansible', 'task-history.jsonl')
+
+
+def counts(run):
+    totals = {}
+    for summary in run.get('hosts', {}).values():
+        for key in ('ok', 'changed', 'skipped', 'failures', 'unreachable'):
+            totals[key] = totals.get(key, 0) + summary.get(key, 0)
+    return totals
+
+
+def revision(run):
+    return (run.get('revision') or '-') + ('+' if run.get('dirty') else '')
+
+
+def runs_report(runs, limit):
+    rows = []
+    for run in runs[-limit:]:
+        rows.append(dict({'time': run['time'], 'playbook': run['playbook'], 'revision': revision(run),
+                          'seconds': run['seconds'], 'hosts': len(run.get('hosts', {}))}, **counts(run)))
+    return rows
+
+
+def slowest_report(runs, limit):
+    """Median seconds per task and host over the given runs, slowest first"""
+    rows = []
+    for (task, host), samples in task_history.durations(runs).items():
+        rows.append({'task': task, 'host': host, 'runs': len(samples), 'median': round(statistics.median(samples), 2),
+                     'max': max(samples)})
+    return sorted(rows, key=lambda row: row['median'], reverse=True)[:limit]
+
+
+def trend_report(runs, pattern):
+    rows = []
+    for run in runs:
+        for task in run.get('tasks', []):
+            if fnmatch.fnmatch(task['task'], pattern):
+                rows.append({'time': run['time'], 'playbook': run['playbook'], 'revision': revision(run),
+                             'task': task['task'], 'host': task['host'], 'seconds': task['seconds'],
+                             'status': task['status']})
+    return rows
+
+
+def regressions_report(runs, threshold, window, min_seconds):
+    """Latest run of every playbook against the runs of the same playbook before it"""
+    rows = []
+    for playbook in sorted(set(run['playbook'] for run in runs)):
+        history = [run for run in runs if run['playbook'] == playbook]
+        latest = history[-1]
+        for task in task_history.find_regressions(latest, history[:-1], threshold, window, min_seconds):
+            rows.append(dict(task, playbook=playbook, time=latest['time'], revision=revision(latest)))
+    return rows
+
+
+def print_table(rows, columns):
+    if not rows:
+        print('no matching runs')
+        return
+    widths = [max(len(column), *(len(str(row.get(column, ''))) for row in rows)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row.get(column, '')).ljust(width) for column, width in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query task durations recorded by the task_history callback')
+    parser.add_argument('--file', default=os.environ.get('TASK_HISTORY_FILE', DEFAULT_FILE),
+                        help='history file (default: .ansible/task-history.jsonl)')
+    parser.add_argument('--playbook', help='only runs of this playbook (path relative to the repository)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+    runs_parser = commands.add_parser('runs', help='list recent runs')
+    runs_parser.add_argument('--limit', type=int, default=20)
+    slowest_parser = commands.add_parser('slowest', help='tasks with the highest median duration')
+    slowest_parser.add_argument('--limit', type=int, default=20)
+    slowest_parser.add_argument('--last', type=int, default=10, help='runs to take the median over (default: 10)')
+    trend_parser = commands.add_parser('trend', help='duration of matching tasks run by run')
+    trend_parser.add_argument('--task', required=True, help="task name or glob, e.g. 'install-jenkins : *'")
+    regressions_parser = commands.add_parser('regressions', help='tasks of the latest runs slower than their median')
+    regressions_parser.add_argument('--threshold', type=float, default=1.5)
+    regressions_parser.add_argument('--window', type=int, default=10)
+    regressions_parser.add_argument('--min-seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    runs = task_history.load_history(args.file, args.playbook)
+    if args.command == 'runs':
+        rows = runs_report(runs, args.limit)
+        columns = ['time', 'playbook', 'revision', 'seconds', 'hosts', 'ok', 'changed', 'skipped', 'failures']
+    elif args.command == 'slowest':
+        rows = slowest_report(runs[-args.last:], args.limit)
+        columns = ['median', 'max', 'runs', 'host', 'task']
+    elif args.command == 'trend':
+        rows = trend_report(runs, args.task)
+        columns = ['time', 'revision', 'host', 'seconds', 'status', 'task']
+    else:
+        rows = regressions_report(runs, args.threshold, args.window, args.min_seconds)
+        columns = ['factor', 'seconds', 'median', 'host', 'playbook', 'revision', 'task']
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, columns)
+    return 1 if args.command == 'regressions' and rows else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the controller-side artifact cache against a local
+HTTP server
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = os.path.join(ROOT, 'roles', 'artifact-cache', 'library', 'artifact_cache.py')
+
+print("🧪 Testing artifact cache\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+TARBALL = os.urandom(2 * 1024 * 1024)
+DIGEST = hashlib.sha256(TARBALL).hexdigest()
+SHA1 = hashlib.sha1(TARBALL).hexdigest()
+
+
+class StubDownloads(BaseHTTPRequestHandler):
+    """Serves a tarball, its sha256sum and sha1 files and a key, counting requests per path"""
+    files = {
+        '/keycloak-22.0.5.tar.gz': TARBALL,
+        '/keycloak-22.0.5.tar.gz.sha256': f'{DIGEST}  keycloak-22.0.5.tar.gz\n'.encode(),
+        '/keycloak-22.0.5.tar.gz.sha1': SHA1.encode(),
+        '/jenkins.io-2023.key': b'-----BEGIN PGP PUBLIC KEY BLOCK-----\n',
+    }
+    requests = {}
+
+    def do_GET(self):
+        StubDownloads.requests[self.path] = StubDownloads.requests.get(self.path, 0) + 1
+        body = self.files.get(self.path)
+        self.send_response(200 if body is not None else 404)
+        self.send_header('Content-Length', str(len(body or b'')))
+        self.end_headers()
+        self.wfile.write(body or b'')
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), StubDownloads)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f'http://127.0.0.1:{server.server_address[1]}'
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    def run(artifacts, offline=False, allow_unverified=False):
+        args = {'ANSIBLE_MODULE_ARGS': {'artifacts': artifacts, 'cache_dir': cache_dir, 'offline': offline,
+                                        'allow_unverified': allow_unverified}}
+        output = subprocess.run([sys.executable, MODULE], input=json.dumps(args), capture_output=True, text=True)
+        return json.loads(output.stdout)
+
+    tarball = {'url': f'{url}/keycloak-22.0.5.tar.gz', 'sha256': DIGEST}
+    result = run([tarball])
+    cached = result['artifacts'][0]
+    check('Missing artifact downloaded and verified', result['changed'] and cached['downloaded']
+          and cached['sha256'] == DIGEST and cached['verified'] == 'sha256', result)
+    with open(cached['path'], 'rb') as handle:
+        check('Cached file is the download', handle.read() == TARBALL)
+
+    result = run([tarball])
+    check('Cached artifact is not downloaded again', not result['changed']
+          and StubDownloads.requests['/keycloak-22.0.5.tar.gz'] == 1, StubDownloads.requests)
+
+    result = run([dict(tarball, sha256='0' * 64)])
+    check('Checksum mismatch fails and drops the file', result.get('failed') and 'checksum mismatch' in result['msg']
+          and not os.path.exists(cached['path']), result)
+
+    result = run([{'url': tarball['url'], 'checksum_url': f'{url}/keycloak-22.0.5.tar.gz.sha256'}])
+    check('SHA-256 taken from a sha256sum file', result['artifacts'][0]['sha256'] == DIGEST
+          and result['artifacts'][0]['verified'] == 'checksum_url', result)
+
+    sha1 = {'url': tarball['url'], 'checksum_url': f'{url}/keycloak-22.0.5.tar.gz.sha1', 'checksum_algorithm': 'sha1',
+            'filename': 'keycloak-sha1.tar.gz'}
+    result = run([sha1])
+    check('SHA-1 checksum files verify the download', result['artifacts'][0]['sha256'] == DIGEST
+          and result['artifacts'][0]['verified'] == 'checksum_url', result)
+    StubDownloads.files['/keycloak-22.0.5.tar.gz.sha1'] = ('0' * 40).encode()
+    result = run([dict(sha1, filename='keycloak-bad-sha1.tar.gz')])
+    check('SHA-1 mismatch fails', result.get('failed') and 'expected SHA1' in result['msg'], result)
+
+    key = {'url': f'{url}/jenkins.io-2023.key', 'filename': 'jenkins-repo.key'}
+    result = run([key])
+    check('Unknown checksum fails by default', result.get('failed') and 'no known checksum' in result['msg']
+          and '/jenkins.io-2023.key' not in StubDownloads.requests, result)
+    result = run([dict(key, verified_by='gpg fingerprint')])
+    check('Artifacts verified by the caller are cached without a warning',
+          result['artifacts'][0]['verified'] == 'gpg fingerprint' and not result.get('warnings'), result)
+    key = dict(key, filename='jenkins-pinned.key')
+    result = run([key], allow_unverified=True)
+    check('Unknown checksum pinned with a warning when unverified downloads are allowed',
+          result['artifacts'][0]['verified'] == 'pinned' and 'pinned' in json.dumps(result.get('warnings')), result)
+    result = run([key])
+    check('Pinned cache entries fail once unverified downloads are disallowed',
+          result.get('failed') and 'no known checksum' in result['msg'], result)
+    with open(os.path.join(cache_dir, 'files', 'jenkins-pinned.key'), 'ab') as handle:
+        handle.write(b'tampered')
+    result = run([key], allow_unverified=True)
+    check('Changed cache file detected and replaced', result['changed'] and StubDownloads.requests['/jenkins.io-2023.key'] == 3
+          and result['artifacts'][0]['size'] == len(StubDownloads.files['/jenkins.io-2023.key']), result)
+
+    result = run([tarball, key], offline=True, allow_unverified=True)
+    check('Offline mode works from the cache', not result.get('failed') and not result['changed'], result)
+    sonarqube = {'url': f'{url}/sonarqube-10.3.0.82913.zip', 'checksum_url': f'{url}/sonarqube-10.3.0.82913.zip.sha256'}
+    result = run([sonarqube], offline=True)
+    check('Offline mode fails for uncached artifacts', result.get('failed') and 'offline' in result['msg'], result)
+    result = run([sonarqube])
+    check('Download errors are reported', result.get('failed') and 'cannot download' in result['msg'], result)
+
+    # Several hosts ask for the same artifact at once (strategy: free): one download
+    StubDownloads.files['/sonarqube-10.3.0.82913.zip'] = TARBALL[::-1]
+    StubDownloads.files['/sonarqube-10.3.0.82913.zip.sha256'] = hashlib.sha256(TARBALL[::-1]).hexdigest().encode()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: run([sonarqube]), range(4)))
+    check('Concurrent runs download once', StubDownloads.requests['/sonarqube-10.3.0.82913.zip'] == 1
+          and sum(result['changed'] for result in results) == 1, (StubDownloads.requests, results))
+
+server.shutdown()
+
+if all_passed:
+    print("🎉 All tests passed! The artifact cache is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the artifact cache.")
+    sys.exit(1)
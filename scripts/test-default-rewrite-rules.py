@@ -112,6 +112,7 @@ def test_default_rewrite_rules():
         ("Mixed global + per-backend rewrite rules", test_data_4)
     ]
 
+    failures = 0
     for test_name, test_data in test_cases:
         print(f"\n{test_name}:")
         print("-" * 40)
@@ -119,10 +120,18 @@ def test_default_rewrite_rules():
         try:
             rendered = template.render(test_data)
             print(rendered)
+            # Without nginx_upstream_servers the upstreams fall back to each backend's ip:port
+            for backend in test_data['site_backends']:
+                if f"server {backend['ip']}:{backend['port']};" not in rendered:
+                    print(f"ERROR: no upstream server for {backend['server_name']}")
+                    failures += 1
         except Exception as e:
             print(f"ERROR: {e}")
+            failures += 1
 
         print()
 
+    return failures
+
 if __name__ == '__main__':
-    test_default_rewrite_rules()
+    sys.exit(1 if test_default_rewrite_rules() else 0)
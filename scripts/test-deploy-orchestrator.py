@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the deployment graph and the parallel orchestrator
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'scripts', 'deploy-orchestrator.py')
+spec = importlib.util.spec_from_file_location('deploy_orchestrator', SCRIPT)
+orchestrator = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(orchestrator)
+
+print("🧪 Testing deploy orchestrator\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+graph = orchestrator.load_graph(orchestrator.DEFAULT_GRAPH)
+check('Project graph loads: playbooks exist, no cycles, targets resolve', set(graph['targets'])
+      >= {'jenkins', 'full-stack'}, graph['targets'])
+full = orchestrator.select(graph['nodes'], graph['targets']['full-stack'])
+check('Full stack covers every node of the graph', set(full) == set(graph['nodes']), set(graph['nodes']) - set(full))
+jenkins = orchestrator.select(graph['nodes'], graph['targets']['jenkins'])
+check('jenkins target runs the deploy-all steps', set(jenkins) == {'install-jenkins', 'setup-nginx-proxy',
+                                                                   'install-ssl-cert'}, jenkins)
+check('Installs on different hosts share the first wave', {'install-jenkins', 'install-sonarqube', 'install-keycloak'}
+      <= set(orchestrator.waves(full)[0]), orchestrator.waves(full))
+
+
+def node(hosts, needs=(), seconds=0.0, fail=False, allow_failure=False):
+    return {'hosts': list(hosts), 'needs': list(needs), 'allow_failure': allow_failure,
+            'command': f"sleep {seconds}{'; exit 3' if fail else ''}"}
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    def run(nodes, jobs=4, policy='fail-fast'):
+        events = []
+
+        def launch(name, node):
+            events.append(name)
+            return {'returncode': subprocess.run(['sh', '-c', node['command']]).returncode}
+
+        results = orchestrator.schedule(nodes, launch, jobs, policy)
+        return results, events
+
+    nodes = {
+        'install-a': node(['a'], seconds=0.6),
+        'install-b': node(['b'], seconds=0.6),
+        'install-c': node(['c'], seconds=0.6),
+        'configure-a': node(['a'], ['install-a'], seconds=0.3),
+        'wire-ab': node(['a', 'b'], ['install-a', 'install-b'], seconds=0.3),
+    }
+    results, events = run(nodes)
+    summary = orchestrator.report(nodes, results, max(result['end'] for result in results.values()))
+    check('Independent nodes run concurrently', summary['wall'] < summary['sequential'] * 0.7, summary)
+    check('Wall time close to the critical path', summary['wall'] < summary['critical_path_seconds'] + 0.6
+          and summary['critical_path'][0] in ('install-a', 'install-b'), summary)
+    a, wire = results['configure-a'], results['wire-ab']
+    check('Nodes sharing a host group never overlap', a['end'] <= wire['start'] or wire['end'] <= a['start'], results)
+    check('Dependencies finish before dependents start', all(results[need]['end'] <= results[name]['start']
+                                                             for name in nodes for need in nodes[name]['needs']))
+
+    results, events = run(nodes, jobs=1)
+    starts = sorted(result['start'] for result in results.values())
+    ends = sorted(result['end'] for result in results.values())
+    check('Parallelism cap respected', all(start >= end for start, end in zip(starts[1:], ends)), results)
+
+    nodes = {
+        'install-a': node(['a'], seconds=0.1, fail=True),
+        'install-b': node(['b'], seconds=0.5),
+        'configure-a': node(['a'], ['install-a']),
+        'configure-b': node(['b'], ['install-b']),
+    }
+    results, events = run(nodes, policy='fail-fast')
+    check('fail-fast: running nodes finish, nothing new starts', results['install-b']['status'] == 'ok'
+          and results['configure-b']['status'] == 'not run' and results['configure-a']['status'] == 'skipped', results)
+    results, events = run(nodes, policy='continue')
+    check('continue: only dependents of the failure are skipped', results['configure-b']['status'] == 'ok'
+          and results['configure-a']['status'] == 'skipped' and 'configure-a' not in events, results)
+    nodes['install-a']['allow_failure'] = True
+    results, events = run(nodes, policy='fail-fast')
+    check('allow_failure does not stop the run', results['configure-b']['status'] == 'ok', results)
+
+    cyclic = os.path.join(tmp, 'cyclic.yml')
+    with open(cyclic, 'w') as handle:
+        handle.write('nodes:\n  a: {command: "true", needs: [b]}\n  b: {command: "true", needs: [a]}\n')
+    output = subprocess.run([sys.executable, SCRIPT, '--graph', cyclic, '--dry-run', 'a'], capture_output=True, text=True)
+    check('Dependency cycles are rejected', output.returncode != 0 and 'cycle' in output.stderr, output.stderr)
+
+    graph_file = os.path.join(tmp, 'graph.yml')
+    with open(graph_file, 'w') as handle:
+        handle.write('targets:\n  all: [b]\nnodes:\n'
+                     '  a: {command: "echo step a", hosts: [x]}\n'
+                     '  b: {command: ["sh", "-c", "echo step b; exit 2"], hosts: [y], needs: [a]}\n')
+    output = subprocess.run([sys.executable, SCRIPT, '--graph', graph_file, '--json', '--log-dir', tmp, 'all'],
+                            capture_output=True, text=True)
+    summary = json.loads(output.stdout)
+    with open(os.path.join(tmp, 'a.log')) as handle:
+        log = handle.read()
+    check('CLI writes per-node logs and fails with the failed node', output.returncode == 1 and log == 'step a\n'
+          and summary['nodes']['b']['status'] == 'failed' and summary['critical_path'] == ['a', 'b'], output)
+
+if all_passed:
+    print("🎉 All tests passed! The deploy orchestrator is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the deploy orchestrator.")
+    sys.exit(1)
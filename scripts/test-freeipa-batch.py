@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script to validate batched FreeIPA provisioning (freeipa_batch module and
+JSON-RPC client) against the local FreeIPA stand-in
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROLE = os.path.join(ROOT, 'roles', 'freeipa-directory')
+
+
+def load(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    loaded = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(loaded)
+    return loaded
+
+
+# The module imports the shared client the way Ansible ships it
+jsonrpc = sys.modules['ansible.module_utils.freeipa_jsonrpc'] = load(
+    'freeipa_jsonrpc', os.path.join(ROLE, 'module_utils', 'freeipa_jsonrpc.py'))
+module = load('freeipa_batch', os.path.join(ROLE, 'library', 'freeipa_batch.py'))
+stub = load('freeipa_jsonrpc_stub', os.path.join(ROOT, 'scripts', 'freeipa-jsonrpc-stub.py'))
+
+print("🧪 Testing FreeIPA batch provisioning\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+server = stub.make_server(password='admin123')
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def client(password='admin123'):
+    return jsonrpc.FreeIPAClient(url, 'admin', password, timeout=10)
+
+
+groups = [
+    {'name': 'sonar-admins', 'description': 'SonarQube Administrators'},
+    {'name': 'sonar-users', 'description': 'SonarQube Users', 'members': ['sonar-admin']},
+    {'name': 'sonar-developers'},
+]
+users = [
+    {'name': 'sonar-admin', 'first': 'SonarQube', 'last': 'Administrator', 'password': 'S3cret!',
+     'groups': ['sonar-admins']},
+    {'name': 'sonar-dev', 'first': 'SonarQube', 'last': 'Developer', 'groups': ['sonar-users', 'sonar-developers']},
+]
+
+check('Members collected from groups and users', module.wanted_members(groups, users) == {
+    'sonar-users': ['sonar-admin', 'sonar-dev'], 'sonar-admins': ['sonar-admin'], 'sonar-developers': ['sonar-dev']},
+    module.wanted_members(groups, users))
+problems = module.validate([{}], [{'name': 'x', 'first': 'X'}, {'name': 'y', 'state': 'gone'}])
+check('Invalid entries are rejected before any call', problems == [
+    'group 0: missing name', 'user x: missing last', 'user y: state must be present or absent'], problems)
+
+ipa = client()
+report, errors = module.run(ipa, groups, users, 100, check_mode=True)
+check('Check mode previews without changing anything', not server.directory.groups and not server.directory.users
+      and report['groups']['sonar-admins'] == {'changed': True, 'action': 'created'}
+      and report['memberships']['sonar-users']['added'] == ['sonar-admin', 'sonar-dev'], report)
+
+server.requests = 0
+report, errors = module.run(ipa, groups, users, 100, check_mode=False)
+check('Groups, users and memberships created in one request', not errors and server.requests == 1
+      and server.logins == 1 and all(entry['changed'] for section in report.values() for entry in section.values())
+      and sorted(server.directory.groups['sonar-users']['member_user']) == ['sonar-admin', 'sonar-dev'], (report, errors))
+check('Password and attributes sent with user_add', server.directory.users['sonar-admin']['has_password']
+      and not server.directory.users['sonar-dev']['has_password']
+      and server.directory.users['sonar-dev']['givenname'] == ['SonarQube'])
+
+server.requests = 0
+report, errors = module.run(ipa, groups, users, 100, check_mode=False)
+check('Re-run: "already exists" and "already a member" are no-ops', not errors and not any(
+    entry['changed'] for section in report.values() for entry in section.values())
+    and report['users']['sonar-dev']['action'] == 'exists' and server.logins == 1, (report, errors))
+report, errors = module.run(ipa, groups, users, 100, check_mode=True)
+check('Check mode reports nothing to do on a provisioned directory', not any(
+    entry['changed'] for section in report.values() for entry in section.values()), report)
+
+report, errors = module.run(ipa, [], [{'name': 'sonar-qa', 'first': 'Sonar', 'last': 'QA', 'groups': ['sonar-qa-team']},
+                                      {'name': 'sonar-dev', 'state': 'absent'}], 100, check_mode=False)
+check('Per-object failures reported, the rest of the batch applied', errors == [
+    'group_add_member: sonar-qa-team: group not found'] and report['users']['sonar-qa']['changed']
+    and report['users']['sonar-dev']['action'] == 'deleted'
+    and 'sonar-dev' not in server.directory.groups['sonar-users']['member_user'], (report, errors))
+
+server.sessions.clear()
+report, errors = module.run(ipa, [{'name': 'sonar-admins'}], [], 100, check_mode=False)
+check('Expired session: logs in again and continues', not errors and server.logins == 2, (report, server.logins))
+
+try:
+    client('wrong').call('ping')
+    error = None
+except jsonrpc.FreeIPAError as e:
+    error = str(e)
+check('Bad credentials fail the login', error and 'login as admin failed: HTTP 401' in error, error)
+
+# Onboarding: 600 users in 3 groups with a remote-like 50 ms per request
+server.latency = 0.05
+server.requests = 0
+many = [{'name': f'user{index:04d}', 'first': 'Load', 'last': f'User {index}', 'password': 'Initial1!',
+         'groups': [f'team-{index % 3}']} for index in range(600)]
+start = time.monotonic()
+report, errors = module.run(client(), [{'name': f'team-{index}'} for index in range(3)], many, 100, check_mode=False)
+elapsed = time.monotonic() - start
+check('600 users onboarded in chunked batches within seconds', not errors and server.requests == 7
+      and len(server.directory.groups['team-1']['member_user']) == 200 and elapsed < 5,
+      (server.requests, round(elapsed, 2), errors[:3]))
+server.latency = 0
+
+# The role task and module through Ansible, as the playbook runs them
+with tempfile.TemporaryDirectory() as tmp:
+    playbook = os.path.join(tmp, 'freeipa.yml')
+    with open(playbook, 'w') as handle:
+        handle.write(f'''
+- hosts: localhost
+  gather_facts: false
+  vars:
+    freeipa_api_url: {url}
+    freeipa_admin_password: admin123
+    freeipa_groups: [{{name: ansible-group, description: From Ansible}}]
+    freeipa_users: [{{name: ansible-user, first: An, last: Sible, password: x, groups: [ansible-group]}}]
+  tasks:
+    - include_role:
+        name: freeipa-directory
+        tasks_from: users
+''')
+    env = dict(os.environ, ANSIBLE_ROLES_PATH=os.path.join(ROOT, 'roles'), ANSIBLE_STDOUT_CALLBACK='default',
+               ANSIBLE_LOCALHOST_WARNING='false', ANSIBLE_INVENTORY_UNPARSED_WARNING='false')
+    runs = [subprocess.run(['ansible-playbook', '-c', 'local', playbook], capture_output=True, text=True, env=env,
+                           cwd=tmp, stdin=subprocess.DEVNULL) for _ in range(2)]
+    check('Playbook run creates the entries, the re-run changes nothing', runs[0].returncode == 0
+          and 'changed=1' in runs[0].stdout and 'changed=0' in runs[1].stdout
+          and 'ansible-user' in server.directory.groups['ansible-group']['member_user'],
+          runs[0].stdout[-1500:] + runs[0].stderr[-1500:])
+
+server.shutdown()
+
+if all_passed:
+    print("🎉 All tests passed! FreeIPA batch provisioning is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review FreeIPA batch provisioning.")
+    sys.exit(1)
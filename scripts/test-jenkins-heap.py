@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the Jenkins heap sizing of install-jenkins: the -Xms/-Xmx
+values of the systemd drop-in and the early memory checks, rendered through
+Ansible with the role defaults for hosts of different sizes
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROLE = os.path.join(ROOT, 'roles', 'install-jenkins')
+
+print("🧪 Testing Jenkins heap sizing\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+def render(tmp, memtotal_mb, extra_vars=None):
+    """Run the heap checks and render the drop-in for a host with memtotal_mb of RAM"""
+    playbook = os.path.join(tmp, 'render.yml')
+    dest = os.path.join(tmp, f'override-{memtotal_mb}.conf')
+    with open(playbook, 'w') as handle:
+        handle.write(f'''
+- hosts: localhost
+  connection: local
+  gather_facts: false
+  vars_files:
+    - {ROLE}/defaults/main.yml
+  tasks:
+    - name: Check the heap
+      include_tasks: {ROLE}/tasks/heap.yml
+    - name: Render the drop-in
+      template:
+        src: {ROLE}/templates/jenkins-override.conf.j2
+        dest: {dest}
+''')
+    env = dict(os.environ, ANSIBLE_STDOUT_CALLBACK='default', ANSIBLE_LOCALHOST_WARNING='false',
+               ANSIBLE_INVENTORY_UNPARSED_WARNING='false')
+    overrides = dict({'ansible_memtotal_mb': memtotal_mb}, **(extra_vars or {}))
+    run = subprocess.run(['ansible-playbook', '-i', 'localhost,', playbook, '-e', json.dumps(overrides)],
+                         capture_output=True, text=True, env=env, cwd=tmp, stdin=subprocess.DEVNULL)
+    heap = None
+    if run.returncode == 0:
+        with open(dest) as handle:
+            options = re.findall(r'-Xm([sx])(-?\d+)m', handle.read())
+        heap = {flag: int(value) for flag, value in options}
+    return run, heap
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    for memtotal_mb, expected in ((900, 450), (1024, 512), (1770, 885), (4000, 2000), (65536, 16384)):
+        run, heap = render(tmp, memtotal_mb)
+        check(f'{memtotal_mb} MB host renders a {expected} MB heap', heap == {'s': expected, 'x': expected},
+              heap or run.stdout[-1500:] + run.stderr[-1500:])
+
+    run, heap = render(tmp, 1024, {'jenkins_heap_min_mb': 2048})
+    check('Heap still leaves half of a 1 GB host free with a larger minimum', heap == {'s': 512, 'x': 512},
+          heap or run.stdout[-1500:])
+
+    run, heap = render(tmp, 400)
+    check('Host too small for the heap floor fails with a clear message', run.returncode != 0
+          and 'too small for the minimum Jenkins heap' in run.stdout, run.stdout[-1500:])
+
+    run, heap = render(tmp, 400, {'jenkins_heap_size_mb': 128})
+    check('Explicit heap skips the floor check', heap == {'s': 128, 'x': 128}, heap or run.stdout[-1500:])
+
+    run, heap = render(tmp, 2048, {'jenkins_heap_size_mb': 1536})
+    check('Explicit heap that leaves no headroom fails', run.returncode != 0
+          and 'lower jenkins_heap_size_mb' in run.stdout, run.stdout[-1500:])
+
+if all_passed:
+    print("🎉 All tests passed! Jenkins heap sizing is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the Jenkins heap sizing.")
+    sys.exit(1)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script to validate Jenkins plugin dependency resolution and the
+controller-side plugin cache against a local update-center snapshot
+"""
+
+import base64
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location(
+    'jenkins_plugin_resolve', os.path.join(ROOT, 'roles', 'install-jenkins-plugins', 'library', 'jenkins_plugin_resolve.py'))
+resolver = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(resolver)
+
+print("🧪 Testing Jenkins plugin resolver\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+def expect_error(function, *args):
+    try:
+        function(*args)
+    except resolver.ResolveError as e:
+        return str(e)
+    return None
+
+
+# Version ordering
+check('Numeric version parts compare numerically', resolver.version_key('1.10') > resolver.version_key('1.9'))
+check('Releases sort after pre-releases', resolver.version_key('2.0') > resolver.version_key('2.0-rc1'))
+check('Longer version is newer', resolver.version_key('1.0.1') > resolver.version_key('1.0'))
+check('Incremental versions compare by build number',
+      resolver.version_key('1850.va_a_8c31d3158b_') > resolver.version_key('1775.v810dc950b_514'))
+
+check('Requests accept names, name:version and dicts',
+      resolver.parse_requests(['git', 'oic-auth:4.2', {'name': 'matrix-auth', 'version': 'latest'}])
+      == {'git': None, 'oic-auth': '4.2', 'matrix-auth': None})
+
+with tempfile.TemporaryDirectory() as tmp:
+    # Local update center: plugin files served from file:// URLs with real checksums
+    files = {}
+
+    def plugin(name, version, dependencies=(), content=None):
+        path = os.path.join(tmp, 'mirror', f'{name}-{version}.hpi')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content or f'{name} {version}'.encode())
+        with open(path, 'rb') as handle:
+            sha256 = base64.b64encode(hashlib.sha256(handle.read()).digest()).decode()
+        files[name, version] = path
+        return {'name': name, 'version': version, 'url': f'file://{path}', 'sha256': sha256,
+                'dependencies': [{'name': dep[0], 'version': dep[1], 'optional': dep[2:] == (True,)}
+                                 for dep in dependencies]}
+
+    update_center = {'plugins': {
+        'oic-auth': plugin('oic-auth', '4.2', [('jackson2-api', '2.15'), ('mailer', '1.30', True)]),
+        'jackson2-api': plugin('jackson2-api', '2.17', [('snakeyaml-api', '2.0')]),
+        'snakeyaml-api': plugin('snakeyaml-api', '2.2'),
+        'mailer': plugin('mailer', '1.32'),
+        'git': plugin('git', '5.2', [('jackson2-api', '2.16')]),
+    }}
+    history = {'plugins': {'jackson2-api': {'2.14': plugin('jackson2-api', '2.14')},
+                           'git': {'5.0': plugin('git', '5.0', [('jackson2-api', '2.14')])}}}
+    with open(os.path.join(tmp, 'update-center.json'), 'w') as handle:
+        handle.write('updateCenter.post(\n' + json.dumps(update_center) + '\n);')
+    with open(os.path.join(tmp, 'plugin-versions.json'), 'w') as handle:
+        json.dump(history, handle)
+
+    def lookup(name, version):
+        return history['plugins'][name][version]
+
+    resolved = resolver.resolve({'oic-auth': None, 'git': None}, update_center, lookup)
+    check('Transitive dependencies resolved, optional ones skipped',
+          sorted(resolved) == ['git', 'jackson2-api', 'oic-auth', 'snakeyaml-api'], sorted(resolved))
+    check('Dependencies record their dependants', resolved['jackson2-api']['required_by'] == ['git', 'oic-auth'],
+          resolved['jackson2-api']['required_by'])
+    check('Optional dependencies on request',
+          'mailer' in resolver.resolve({'oic-auth': None}, update_center, lookup, include_optional=True))
+    check('Pinned older version comes from the version history',
+          resolver.resolve({'git': '5.0'}, update_center, lookup)['git']['version'] == '5.0')
+    error = expect_error(resolver.resolve, {'git': None, 'jackson2-api': '2.14'}, update_center, lookup)
+    check('Pin below a dependency minimum is rejected', error and 'requires at least 2.16' in error, error)
+    check('Unknown plugin is rejected', expect_error(resolver.resolve, {'nope': None}, update_center, lookup))
+
+    params = {
+        'plugins': ['oic-auth', 'git:5.0'],
+        'cache_dir': os.path.join(tmp, 'cache'),
+        'update_center_url': f"file://{os.path.join(tmp, 'update-center.json')}",
+        'plugin_versions_url': f"file://{os.path.join(tmp, 'plugin-versions.json')}",
+        'snapshot_max_age': 3600,
+        'offline': False,
+        'include_optional': False,
+        'parallel': 4,
+        'timeout': 10,
+    }
+    result = resolver.run(params)
+    names = [entry['name'] for entry in result['plugins']]
+    check('Run downloads every resolved plugin into the cache',
+          result['downloaded'] == sorted(names) and all(os.path.exists(entry['path']) for entry in result['plugins']),
+          result['downloaded'])
+    check('Cached entries carry sha1 for comparison with installed files',
+          all(len(entry['checksum']) == 40 for entry in result['plugins']))
+
+    result = resolver.run(dict(params, offline=True))
+    check('Second run is served from the cache offline', result['downloaded'] == [] and len(result['plugins']) == 4,
+          result['downloaded'])
+
+    # A corrupted cache entry is replaced; a mirror serving wrong content is rejected
+    with open(result['plugins'][0]['path'], 'wb') as handle:
+        handle.write(b'corrupted')
+    result = resolver.run(params)
+    check('Corrupted cache entry is downloaded again', result['downloaded'] == [result['plugins'][0]['name']],
+          result['downloaded'])
+    with open(files['snakeyaml-api', '2.2'], 'wb') as handle:
+        handle.write(b'tampered')
+    error = expect_error(resolver.run, dict(params, plugins=['snakeyaml-api'],
+                                            cache_dir=os.path.join(tmp, 'cache-2')))
+    check('Checksum mismatch fails the run', error and 'checksum mismatch' in error, error)
+    error = expect_error(resolver.run, dict(params, cache_dir=os.path.join(tmp, 'empty'), offline=True))
+    check('Offline run without a snapshot fails clearly', error and 'offline' in error, error)
+
+if all_passed:
+    print("🎉 All tests passed! The plugin resolver is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the plugin resolver.")
+    sys.exit(1)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the script-console modules (security realm apply and
+bulk user provisioning) against a stub Jenkins
+"""
+
+import base64
+import importlib.util
+import json
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+ROLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'roles', 'jenkins-security-realm')
+
+
+def load(name, path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROLE, path))
+    loaded = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(loaded)
+    return loaded
+
+
+# The modules import the shared client the way Ansible ships it
+console_utils = sys.modules['ansible.module_utils.jenkins_script_console'] = load(
+    'jenkins_script_console', 'module_utils/jenkins_script_console.py')
+module = load('jenkins_security_realm', 'library/jenkins_security_realm.py')
+users_module = load('jenkins_users', 'library/jenkins_users.py')
+
+print("🧪 Testing Jenkins script-console modules\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+class StubJenkins(BaseHTTPRequestHandler):
+    """Crumb issuer and script console answering with a canned script result"""
+    scripts = []
+    crumbs = 0
+    reply = None
+
+    def send(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if self.path.startswith('/crumbIssuer'):
+            self.send_header('Set-Cookie', 'JSESSIONID=abc; Path=/')
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def do_GET(self):
+        if self.headers.get('Authorization') != 'Basic ' + base64.b64encode(b'admin:token').decode():
+            return self.send(401, 'unauthorized')
+        StubJenkins.crumbs += 1
+        self.send(200, json.dumps({'crumbRequestField': 'Jenkins-Crumb', 'crumb': 'c0ffee'}))
+
+    def do_POST(self):
+        if self.headers.get('Jenkins-Crumb') != 'c0ffee' or 'JSESSIONID=abc' not in self.headers.get('Cookie', ''):
+            return self.send(403, 'No valid crumb was included in the request')
+        script = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())['script'][0]
+        StubJenkins.scripts.append(script)
+        self.send(200, StubJenkins.reply(script), 'text/plain')
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), StubJenkins)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f'http://127.0.0.1:{server.server_address[1]}/'
+
+realm = '<securityRealm class="org.jenkinsci.plugins.saml.SamlSecurityRealm" plugin="saml@2.2.2">\n  <xml>&lt;md/&gt;</xml>\n</securityRealm>\n'
+script = module.build_script(realm, None, apply=False)
+encoded = re.search(r"securityRealm: decode\('([^']*)'\)", script).group(1)
+check('Realm XML travels base64 encoded, untouched by Groovy quoting', base64.b64decode(encoded).decode() == realm.strip())
+check('Unset sections are left alone', "authorizationStrategy: decode('')" in script)
+check('Check mode never applies', 'if (false)' in script and 'if (true)' not in script)
+check('Apply mode swaps and saves', 'if (true)' in module.build_script(realm, None, apply=True))
+check('Secrets are compared by a per-run HMAC, never returned in clear', 'plainText)' not in script.replace(
+      'mask(secret.plainText)', '') and 'UUID.randomUUID()' in script and 'element.setValue(mask(' in script)
+
+StubJenkins.reply = lambda script: 'Result: ok\n' + json.dumps({'changed': ['securityRealm'], 'before': {}, 'after': {}}) + '\n'
+console = console_utils.ScriptConsole(url, 'admin', 'token', True, 10)
+result = console.run_json(script)
+check('Script runs with basic auth, crumb and session cookie', result['changed'] == ['securityRealm'], result)
+check('Script posted as form field', StubJenkins.scripts and 'XSTREAM2.fromXML' in StubJenkins.scripts[-1])
+
+StubJenkins.reply = lambda script: ('groovy.lang.MissingPropertyException\ncom.thoughtworks.xstream.mapper.'
+                                    'CannotResolveClassException: org.jenkinsci.plugins.saml.SamlSecurityRealm')
+try:
+    console.run_json(script)
+    error = None
+except ValueError as e:
+    error = str(e)
+check('Groovy errors (missing plugin) surface as failures', error and 'CannotResolveClassException' in error, error)
+
+try:
+    console_utils.ScriptConsole(url, 'admin', 'wrong', True, 10).run(script)
+    status = None
+except console_utils.HTTPError as e:
+    status = e.code
+check('Bad credentials are reported as HTTP errors', status == 401, status)
+
+# Bulk user provisioning: all users travel in one payload, one script call per run
+users = [
+    {'username': 'breakglass', 'password': 'S3cret!', 'permissions': ['Overall/Administer'], 'email': None},
+    {'username': 'svc-deploy', 'api_tokens': ['deploy-pipeline'], 'permissions': ['Overall/Read', 'Job/Build']},
+    {'username': 'old-bot', 'state': 'absent'},
+]
+script = users_module.build_script(users, 'on_create', apply=True)
+payload = json.loads(base64.b64decode(re.search(r"parseText\(new String\('([^']*)'", script).group(1)))
+check('All users sent in one JSON payload', [user['username'] for user in payload['users']]
+      == ['breakglass', 'svc-deploy', 'old-bot'] and payload['update_password'] == 'on_create', payload)
+check('Unset fields are not sent', 'email' not in payload['users'][0], payload['users'][0])
+check('Configuration saved once, after the loop', script.count('jenkins.save()') == 1
+      and script.index('jenkins.save()') > script.index('payload.users.each'))
+check('Check mode only reports', 'def apply = false' in users_module.build_script(users, 'on_create', apply=False))
+
+StubJenkins.crumbs = 0
+StubJenkins.reply = lambda script: json.dumps({'users': {
+    'breakglass': {'created': True, 'changed': ['account', 'permission:hudson.model.Hudson.Administer'],
+                   'tokens': {}, 'skipped': []},
+    'svc-deploy': {'created': False, 'changed': ['api_token:deploy-pipeline'], 'tokens': {'deploy-pipeline': '11ab'},
+                   'skipped': []},
+}, 'saved': True})
+console = console_utils.ScriptConsole(url, 'admin', 'token', True, 10)
+result = console.run_json(script)
+console.run_json(script)
+check('Per-user results returned', result['users']['svc-deploy']['tokens'] == {'deploy-pipeline': '11ab'}, result)
+check('One session: the crumb is fetched once for several scripts', StubJenkins.crumbs == 1
+      and len(StubJenkins.scripts) == 4, StubJenkins.crumbs)
+
+server.shutdown()
+
+if all_passed:
+    print("🎉 All tests passed! The script-console modules are working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the script-console modules.")
+    sys.exit(1)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the Keycloak cluster configuration of install-keycloak:
+database and pool settings, JDBC_PING/TCPPING cache discovery and the
+PostgreSQL connection budget, rendered through Ansible with the role defaults
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROLE = os.path.join(ROOT, 'roles', 'install-keycloak')
+ISPN = '{urn:infinispan:config:14.0}'
+
+print("🧪 Testing Keycloak cluster configuration\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+INVENTORY = '''
+[keycloak]
+kc1.local ansible_host=192.168.201.12
+kc2.local ansible_host=192.168.201.13
+kc3.local
+'''
+
+
+def render(tmp, extra_vars=None, name='render'):
+    """Render the role's templates for every keycloak host into tmp/<host>/"""
+    inventory = os.path.join(tmp, 'inventory')
+    with open(inventory, 'w') as handle:
+        handle.write(INVENTORY)
+    playbook = os.path.join(tmp, f'{name}.yml')
+    with open(playbook, 'w') as handle:
+        handle.write(f'''
+- hosts: keycloak
+  connection: local
+  gather_facts: false
+  vars_files:
+    - {ROLE}/defaults/main.yml
+  tasks:
+    - name: Check the connection budget
+      include_tasks: {ROLE}/tasks/database.yml
+    - name: Render templates
+      template:
+        src: "{ROLE}/templates/{{{{ item }}}}.j2"
+        dest: "{tmp}/{{{{ inventory_hostname }}}}/{{{{ item }}}}"
+      loop: [keycloak.conf, cache-ispn-cluster.xml, postgresql-keycloak.conf]
+''')
+        for host in ('kc1.local', 'kc2.local', 'kc3.local'):
+            os.makedirs(os.path.join(tmp, host), exist_ok=True)
+    env = dict(os.environ, ANSIBLE_STDOUT_CALLBACK='default', ANSIBLE_INVENTORY_UNPARSED_WARNING='false')
+    overrides = dict({'keycloak_home': os.path.join(tmp, '{{ inventory_hostname }}'), 'keycloak_db_provision': False},
+                     **(extra_vars or {}))
+    return subprocess.run(['ansible-playbook', '-i', inventory, playbook, '-e', json.dumps(overrides)],
+                          capture_output=True, text=True, env=env, cwd=tmp, stdin=subprocess.DEVNULL)
+
+
+def read(tmp, host, name):
+    with open(os.path.join(tmp, host, name)) as handle:
+        return handle.read()
+
+
+def properties(text):
+    return dict(line.split('=', 1) for line in text.splitlines() if line and not line.startswith('#'))
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    run = render(tmp, {'keycloak_db_password': 'p&ss"<word>'})
+    check('Defaults render on every node', run.returncode == 0, run.stdout[-1500:] + run.stderr[-1500:])
+    if run.returncode == 0:
+        conf = properties(read(tmp, 'kc2.local', 'keycloak.conf'))
+        check('Nodes point at the shared PostgreSQL database on the first node', conf['db'] == 'postgres'
+              and conf['db-url-host'] == '192.168.201.12' and conf['db-url-database'] == 'keycloak', conf)
+        check('Connection pool sized per node', conf['db-pool-initial-size'] == '10'
+              and conf['db-pool-min-size'] == '10' and conf['db-pool-max-size'] == '40', conf)
+        check('Clustered Infinispan cache from the rendered file', conf['cache'] == 'ispn'
+              and conf['cache-config-file'] == 'cache-ispn-cluster.xml' and 'cache-stack' not in conf, conf)
+
+        xml = read(tmp, 'kc2.local', 'cache-ispn-cluster.xml')
+        tree = ET.fromstring(xml)
+        stack = tree.find(f'{ISPN}jgroups/{ISPN}stack')
+        protocols = {child.tag.split('}')[-1]: child.attrib for child in stack}
+        check('JDBC_PING replaces multicast discovery', protocols.get('JDBC_PING', {}).get('stack.position') == 'MPING'
+              and protocols['JDBC_PING']['stack.combine'] == 'REPLACE' and 'MPING' not in protocols
+              and 'PING' not in protocols and 'UDP' not in protocols, protocols)
+        check('JDBC_PING uses the Keycloak database', protocols['JDBC_PING']['connection_url']
+              == 'jdbc:postgresql://192.168.201.12:5432/keycloak'
+              and protocols['JDBC_PING']['connection_password'] == 'p&ss"<word>', protocols)
+        check('Database password kept verbatim in keycloak.conf', conf['db-password'] == 'p&ss"<word>', conf)
+        check('Each node binds JGroups to its own address', protocols['TCP']['bind_addr'] == '192.168.201.13'
+              and protocols['TCP']['bind_port'] == '7800' and protocols['FD_SOCK2']['offset'] == '50000', protocols)
+        container = tree.find(f'{ISPN}cache-container')
+        distributed = {cache.get('name'): cache.get('owners') for cache in container.findall(f'{ISPN}distributed-cache')}
+        check('Sessions are distributed with two owners', distributed.get('sessions') == '2'
+              and distributed.get('authenticationSessions') == '2' and distributed.get('actionTokens') == '2'
+              and container.find(f'{ISPN}transport').get('stack') == 'cluster-tcp', distributed)
+
+        pg = properties(read(tmp, 'kc1.local', 'postgresql-keycloak.conf').replace(' = ', '='))
+        check('PostgreSQL max_connections covers every node\'s pool', pg['max_connections'] == str(3 * 40 + 10)
+              and pg['listen_addresses'] == "'*'", pg)
+
+    run = render(tmp, {'keycloak_cache_discovery': 'tcpping'}, 'tcpping')
+    check('Static TCP discovery renders', run.returncode == 0, run.stdout[-1500:] + run.stderr[-1500:])
+    if run.returncode == 0:
+        xml = read(tmp, 'kc1.local', 'cache-ispn-cluster.xml')
+        tree = ET.fromstring(xml)
+        tcpping = tree.find(f'{ISPN}jgroups/{ISPN}stack/{ISPN}TCPPING')
+        check('TCPPING lists every node of the keycloak group', tcpping is not None and tcpping.get('initial_hosts')
+              == '192.168.201.12[7800],192.168.201.13[7800],kc3.local[7800]' and 'JDBC_PING' not in xml,
+              tcpping.attrib if tcpping is not None else xml)
+
+    run = render(tmp, {'keycloak_db': 'dev-file'}, 'devfile')
+    check('Single-node dev-file configuration renders', run.returncode == 0, run.stdout[-1500:] + run.stderr[-1500:])
+    if run.returncode == 0:
+        conf = properties(read(tmp, 'kc1.local', 'keycloak.conf'))
+        check('dev-file keeps the local cache and no database URL', conf == {'db': 'dev-file', 'cache': 'local'}, conf)
+
+    run = render(tmp, {'keycloak_postgresql_max_connections': 100}, 'budget')
+    check('Pools larger than max_connections are rejected', run.returncode != 0
+          and re.search(r'3 Keycloak node\(s\) with db-pool-max-size=40', run.stdout), run.stdout[-1500:])
+
+if all_passed:
+    print("🎉 All tests passed! Keycloak cluster configuration is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the Keycloak cluster configuration.")
+    sys.exit(1)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the keycloak_ldap_federation module (find-by-name
+update, duplicate cleanup, incremental sync) against a stub Keycloak admin API
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROLE = os.path.join(ROOT, 'roles', 'keycloak-ldap-federation')
+
+spec = importlib.util.spec_from_file_location(
+    'keycloak_ldap_federation', os.path.join(ROLE, 'library', 'keycloak_ldap_federation.py'))
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+print("🧪 Testing Keycloak LDAP federation\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+class StubKeycloak(BaseHTTPRequestHandler):
+    """Token endpoint, realm components and user-storage sync of one realm"""
+    components = {}
+    tokens = set()
+    logins = 0
+    writes = []
+    syncs = []
+    sync_result = {'added': 0, 'updated': 0, 'removed': 0, 'failed': 0, 'ignored': False, 'status': ''}
+
+    def send(self, status, body=None, headers=None):
+        content = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+
+    def route(self, method):
+        url = urlsplit(self.path)
+        if url.path == '/realms/master/protocol/openid-connect/token':
+            form = parse_qs(self.body())
+            if form.get('password') != ['admin123']:
+                return self.send(401, {'error': 'invalid_grant'})
+            StubKeycloak.logins += 1
+            token = uuid.uuid4().hex
+            StubKeycloak.tokens.add(token)
+            return self.send(200, {'access_token': token})
+        if self.headers.get('Authorization', '')[7:] not in StubKeycloak.tokens:
+            return self.send(401, {'error': 'HTTP 401 Unauthorized'})
+        path = url.path[len('/admin/realms/sonar'):]
+        query = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+        if method == 'GET' and path == '':
+            return self.send(200, {'id': 'sonar-id', 'realm': 'sonar'})
+        if method == 'GET' and path == '/components':
+            found = [self.masked(c) for c in StubKeycloak.components.values()
+                     if all(c.get({'type': 'providerType', 'parent': 'parentId'}.get(k, k)) == v
+                            for k, v in query.items())]
+            return self.send(200, found)
+        if method == 'POST' and path == '/components':
+            component = json.loads(self.body())
+            component['id'] = uuid.uuid4().hex
+            StubKeycloak.components[component['id']] = component
+            StubKeycloak.writes.append(('POST', component['name']))
+            return self.send(201, headers={'Location': f'{self.base()}/admin/realms/sonar/components/{component["id"]}'})
+        if path.startswith('/components/'):
+            component_id = path.rsplit('/', 1)[1]
+            if component_id not in StubKeycloak.components:
+                return self.send(404, {'error': 'Could not find component'})
+            if method == 'DELETE':
+                StubKeycloak.writes.append(('DELETE', component_id))
+                del StubKeycloak.components[component_id]
+                return self.send(204)
+            if method == 'PUT':
+                component = json.loads(self.body())
+                stored = StubKeycloak.components[component_id]
+                if component['config'].get('bindCredential') == ['**********']:
+                    component['config']['bindCredential'] = stored['config']['bindCredential']
+                StubKeycloak.components[component_id] = component
+                StubKeycloak.writes.append(('PUT', component['name']))
+                return self.send(204)
+        if method == 'POST' and path.startswith('/user-storage/') and path.endswith('/sync'):
+            StubKeycloak.syncs.append(query['action'])
+            return self.send(200, StubKeycloak.sync_result)
+        self.send(404, {'error': 'unknown resource'})
+
+    def base(self):
+        return f'http://{self.headers["Host"]}'
+
+    @staticmethod
+    def masked(component):
+        config = dict(component.get('config', {}))
+        if 'bindCredential' in config:
+            config['bindCredential'] = ['**********']
+        return dict(component, config=config)
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def do_PUT(self):
+        self.route('PUT')
+
+    def do_DELETE(self):
+        self.route('DELETE')
+
+    def log_message(self, *args):
+        pass
+
+
+def reset():
+    StubKeycloak.writes = []
+    StubKeycloak.syncs = []
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), StubKeycloak)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f'http://127.0.0.1:{server.server_address[1]}'
+
+config = {'connectionUrl': 'ldap://ipa:389', 'usersDn': 'cn=users,cn=accounts,dc=freeipa,dc=local',
+          'bindDn': 'cn=Directory Manager', 'bindCredential': 'secret', 'batchSizeForSync': 500,
+          'pagination': True, 'connectionPooling': True, 'fullSyncPeriod': -1}
+mappers = [{'name': 'group-ldap-mapper', 'providerId': 'group-ldap-mapper',
+            'config': {'groups.dn': 'cn=groups,cn=accounts,dc=freeipa,dc=local', 'mode': 'READ_ONLY'}}]
+
+
+def client(password='admin123'):
+    return module.KeycloakAdmin(url, 'sonar', 'admin', password, timeout=10)
+
+
+def apply(sync='auto', check_mode=False, update_credential='on_create', wanted=None):
+    return module.apply(client(), 'FreeIPA LDAP', wanted or config, mappers, update_credential, sync, check_mode)
+
+
+def providers():
+    return [c for c in StubKeycloak.components.values() if c['providerType'] == module.PROVIDER_TYPE]
+
+
+check('Config values normalized to Keycloak string lists',
+      module.normalize({'a': True, 'b': 500, 'c': ['x', False], 'd': None}) ==
+      {'a': ['true'], 'b': ['500'], 'c': ['x', 'false'], 'd': ['']})
+
+result = apply(check_mode=True)
+check('Check mode plans the creation without writing', result['action'] == 'created' and not StubKeycloak.components
+      and result['sync'] == {'mode': 'none', 'planned': 'full'} and result['mappers'] == {'group-ldap-mapper': 'created'},
+      result)
+
+StubKeycloak.sync_result = dict(StubKeycloak.sync_result, added=1200, status='1200 imported users')
+result = apply()
+check('First run creates provider and mapper and runs a full sync', result['changed'] and result['action'] == 'created'
+      and len(providers()) == 1 and providers()[0]['parentId'] == 'sonar-id'
+      and providers()[0]['config']['batchSizeForSync'] == ['500']
+      and result['mappers'] == {'group-ldap-mapper': 'created'} and StubKeycloak.syncs == ['triggerFullSync']
+      and result['sync']['mode'] == 'full' and result['sync']['added'] == 1200 and 'seconds' in result['sync'], result)
+provider_id = result['id']
+
+reset()
+StubKeycloak.sync_result = dict(StubKeycloak.sync_result, added=0, status='0 imported users')
+result = apply()
+check('Re-run: same provider, no writes, changed-users sync, not changed', not result['changed']
+      and result['id'] == provider_id and result['action'] == 'unchanged' and not StubKeycloak.writes
+      and StubKeycloak.syncs == ['triggerChangedUsersSync'] and len(providers()) == 1, (result, StubKeycloak.writes))
+
+reset()
+StubKeycloak.sync_result = dict(StubKeycloak.sync_result, updated=3, status='3 updated users')
+result = apply(wanted=dict(config, batchSizeForSync=1000, pagination=False))
+check('Changed settings update the provider in place, secret kept', result['action'] == 'updated'
+      and result['changed_keys'] == ['batchSizeForSync', 'pagination'] and StubKeycloak.writes == [('PUT', 'FreeIPA LDAP')]
+      and StubKeycloak.components[provider_id]['config']['bindCredential'] == ['secret']
+      and StubKeycloak.components[provider_id]['config']['batchSizeForSync'] == ['1000']
+      and StubKeycloak.syncs == ['triggerChangedUsersSync'] and result['sync']['updated'] == 3, result)
+StubKeycloak.sync_result = dict(StubKeycloak.sync_result, updated=0, status='')
+
+reset()
+result = apply(update_credential='always', wanted=dict(config, bindCredential='rotated'))
+check('update_credential=always sends the bind password',
+      result['changed_keys'] == ['batchSizeForSync', 'bindCredential', 'pagination']
+      and StubKeycloak.components[provider_id]['config']['bindCredential'] == ['rotated'], result)
+
+reset()
+mapper = [c for c in StubKeycloak.components.values() if c['providerType'] == module.MAPPER_TYPE][0]
+mapper['config']['mode'] = ['LDAP_ONLY']
+result = apply()
+check('Drifted mapper is updated by name', result['mappers'] == {'group-ldap-mapper': 'updated'}
+      and mapper['id'] in StubKeycloak.components
+      and StubKeycloak.components[mapper['id']]['config']['mode'] == ['READ_ONLY'], result)
+
+reset()
+for _ in range(2):
+    duplicate = dict(providers()[0], id=uuid.uuid4().hex)
+    StubKeycloak.components[duplicate['id']] = duplicate
+result = apply()
+check('Duplicates from older runs removed, followed by a full sync', result['changed'] and result['id'] == provider_id
+      and len(result['duplicates_removed']) == 2 and len(providers()) == 1
+      and StubKeycloak.syncs == ['triggerFullSync'], result)
+
+reset()
+result = apply(sync='full')
+check('sync=full forces a full import', StubKeycloak.syncs == ['triggerFullSync'] and not result['changed'], result)
+reset()
+result = apply(sync='none')
+check('sync=none only applies the configuration', not StubKeycloak.syncs and result['sync'] == {
+    'mode': 'none', 'planned': 'none'}, result)
+
+reset()
+admin = client()
+admin.login()
+StubKeycloak.tokens.clear()
+logins = StubKeycloak.logins
+admin.call('GET', '')
+check('Expired admin token: logs in again and continues', StubKeycloak.logins == logins + 1)
+
+try:
+    client('wrong').call('GET', '')
+    error = None
+except module.KeycloakError as e:
+    error = str(e)
+check('Bad credentials fail the login', error and 'login as admin failed: HTTP 401' in error, error)
+
+# The role through Ansible, as configure-keycloak-freeipa-federation runs it
+with tempfile.TemporaryDirectory() as tmp:
+    StubKeycloak.components.clear()
+    with open(os.path.join(tmp, 'inventory'), 'w') as handle:
+        handle.write('[keycloak]\nkeycloak.local\n[freeipa]\nfreeipa.local\n')
+    playbook = os.path.join(tmp, 'federation.yml')
+    with open(playbook, 'w') as handle:
+        handle.write(f'''
+- hosts: localhost
+  connection: local
+  gather_facts: false
+  vars:
+    keycloak_ldap_keycloak_url: {url}
+    keycloak_ldap_admin_password: admin123
+  roles:
+    - keycloak-ldap-federation
+''')
+    env = dict(os.environ, ANSIBLE_ROLES_PATH=os.path.join(ROOT, 'roles'), ANSIBLE_STDOUT_CALLBACK='default',
+               ANSIBLE_LOCALHOST_WARNING='false')
+    reset()
+    runs = [subprocess.run(['ansible-playbook', '-i', 'inventory', playbook], capture_output=True, text=True,
+                           env=env, cwd=tmp, stdin=subprocess.DEVNULL) for _ in range(2)]
+    check('Playbook run creates the provider, the re-run changes nothing', runs[0].returncode == 0
+          and 'changed=1' in runs[0].stdout and 'changed=0' in runs[1].stdout and len(providers()) == 1
+          and StubKeycloak.syncs == ['triggerFullSync', 'triggerChangedUsersSync']
+          and providers()[0]['config']['connectionUrl'] == ['ldap://freeipa.local:389'],
+          runs[0].stdout[-1500:] + runs[0].stderr[-1500:] + runs[1].stdout[-1500:])
+
+server.shutdown()
+
+if all_passed:
+    print("🎉 All tests passed! Keycloak LDAP federation is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review Keycloak LDAP federation.")
+    sys.exit(1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the nginx access log analyzer against synthetic logs
+"""
+
+import gzip
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+spec = importlib.util.spec_from_file_location(
+    'nginx_log_analyzer', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nginx-log-analyzer.py'))
+analyzer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(analyzer)
+
+
+def log_line(backend, uri, status, request_time, upstream_time, connect_time='0.000', cache='-'):
+    return json.dumps({
+        'time': '2025-10-01T12:00:00+00:00',
+        'backend': backend,
+        'host': f'{backend}.example.com',
+        'method': 'GET',
+        'uri': uri,
+        'status': str(status),
+        'request_time': request_time,
+        'upstream_response_time': upstream_time,
+        'upstream_connect_time': connect_time,
+        'upstream_cache_status': cache,
+    })
+
+
+print("🧪 Testing nginx access log analyzer\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+# Route normalisation
+check('Job names and build numbers are collapsed',
+      analyzer.route_key('/job/my-app/123/console?foo=bar') == '/job/:job/:id/console',
+      analyzer.route_key('/job/my-app/123/console?foo=bar'))
+check('Deep paths are truncated',
+      analyzer.route_key('/api/measures/component/tree/more', depth=3) == '/api/measures/component/...',
+      analyzer.route_key('/api/measures/component/tree/more', depth=3))
+
+# Timing values with retries and missing upstreams
+check('Retried upstream times are summed', abs(analyzer.parse_time('0.100, 0.250') - 0.35) < 1e-9)
+check('Missing upstream time is None', analyzer.parse_time('-') is None)
+
+# Histogram accuracy
+histogram = analyzer.LatencyHistogram()
+for millis in range(1, 1001):
+    histogram.add(millis / 1000.0)
+p50, p99 = histogram.percentile(50), histogram.percentile(99)
+check('Histogram p50 within 5%', abs(p50 - 0.5) / 0.5 < 0.05, p50)
+check('Histogram p99 within 5%', abs(p99 - 0.99) / 0.99 < 0.05, p99)
+
+# Streaming plain and gzip-rotated files
+with tempfile.TemporaryDirectory() as tmp:
+    plain = os.path.join(tmp, 'access.log')
+    rotated = os.path.join(tmp, 'access.log.1.gz')
+    with open(plain, 'w') as handle:
+        for i in range(90):
+            handle.write(log_line('jenkins', f'/job/build-{i % 3}/{i}/console', 200, '0.050', '0.040') + '\n')
+        handle.write('not a json line\n')
+        handle.write(log_line('jenkins', '/login', 502, '3.000', '-') + '\n')
+    with gzip.open(rotated, 'wt') as handle:
+        for i in range(10):
+            handle.write(log_line('sonar', '/api/qualitygates/project_status', 200, '1.200', '1.100', cache='MISS') + '\n')
+
+    report = analyzer.Report(top=3)
+    for path in (rotated, plain):
+        for record in analyzer.iter_records(analyzer.iter_lines(path), report):
+            report.add(record)
+    data = report.to_dict()
+
+    check('All records parsed, bad line skipped', data['parsed'] == 101 and data['skipped'] == 1,
+          (data['parsed'], data['skipped']))
+    check('Per-backend status mix', data['backends']['jenkins']['status'] == {'2xx': 90, '5xx': 1},
+          data['backends']['jenkins']['status'])
+    check('Proxy time separated from upstream time',
+          abs(data['backends']['sonar']['proxy_time']['p50'] - 0.1) < 0.01,
+          data['backends']['sonar']['proxy_time'])
+    check('Cache status counted', data['backends']['sonar']['cache'] == {'MISS': 10})
+    check('Slowest request is the 502', data['slowest'][0]['status'] == '502', data['slowest'][0])
+    check('Routes grouped across jobs',
+          any(route['route'] == '/job/:job/:id/console' and route['requests'] == 90 for route in data['routes']))
+
+    empty = os.path.join(tmp, 'empty.log')
+    open(empty, 'w').close()
+    check('Empty file yields no lines', list(analyzer.iter_lines(empty)) == [])
+
+if all_passed:
+    print("🎉 All tests passed! The log analyzer is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the log analyzer.")
+    sys.exit(1)
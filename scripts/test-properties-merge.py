@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the single-pass properties merge used for sonar.properties
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = os.path.join(ROOT, 'roles', 'properties-merge', 'library', 'properties_merge.py')
+spec = importlib.util.spec_from_file_location('properties_merge', MODULE)
+properties_merge = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(properties_merge)
+
+print("🧪 Testing properties merge\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+# Excerpt in the layout of the sonar.properties shipped with SonarQube
+SHIPPED = """# Property values can:
+# - be encrypted. See https://docs.sonarqube.org/latest/instance-administration/security/
+#
+#----- PostgreSQL 13 or greater
+# By default the schema named "public" is used. It can be overridden with the parameter "currentSchema".
+#sonar.jdbc.url=jdbc:postgresql://localhost/sonarqube?currentSchema=my_schema
+
+#----- Microsoft SQLServer 2014/2016/2017/2019/2022 and SQL Azure
+#sonar.jdbc.url=jdbc:sqlserver://localhost;databaseName=sonar;integratedSecurity=true
+
+#sonar.web.javaOpts=-Xmx512m -Xms128m -XX:+HeapDumpOnOutOfMemoryError
+sonar.web.port = 9000
+sonar.search.javaOpts=-Xmx512m \\
+    -Xms512m
+sonar.forceAuthentication=true
+sonar.auth.saml.certificate=MIIOLD
+"""
+
+merged, changes = properties_merge.merge(SHIPPED, {
+    'sonar.jdbc.url': 'jdbc:postgresql://localhost/sonarqube',
+    'sonar.web.port': 9000,
+    'sonar.forceAuthentication': False,
+    'sonar.search.javaOpts': '-Xmx2048m -Xms2048m',
+    'sonar.auth.saml.certificate': None,
+    'sonar.auth.saml.enabled': True,
+})
+lines = merged.splitlines()
+check('Unchanged keys are not reported, even with spaces around =',
+      'sonar.web.port' not in changes and 'sonar.web.port = 9000' in lines, changes)
+check('Commented key is added after its last commented example, comments kept',
+      lines.index('sonar.jdbc.url=jdbc:postgresql://localhost/sonarqube')
+      == lines.index('#sonar.jdbc.url=jdbc:sqlserver://localhost;databaseName=sonar;integratedSecurity=true') + 1
+      and '#sonar.jdbc.url=jdbc:postgresql://localhost/sonarqube?currentSchema=my_schema' in lines, merged)
+check('Booleans written lower case and updated in place',
+      lines.index('sonar.forceAuthentication=false') == lines.index('sonar.search.javaOpts=-Xmx2048m -Xms2048m') + 1
+      and changes['sonar.forceAuthentication'] == {'before': 'true', 'after': 'false'}, changes)
+check('Continuation lines are one entry', '    -Xms512m' not in lines
+      and changes['sonar.search.javaOpts']['before'] == '-Xmx512m -Xms512m', changes)
+check('null comments a key out', '#sonar.auth.saml.certificate=MIIOLD' in lines
+      and changes['sonar.auth.saml.certificate'] == {'before': 'MIIOLD', 'after': None}, changes)
+check('New keys are appended', lines[-1] == 'sonar.auth.saml.enabled=true', lines[-1])
+check('Prose comments are never taken for keys', lines[0] == '# Property values can:', lines[0])
+
+again, changes = properties_merge.merge(merged, {
+    'sonar.jdbc.url': 'jdbc:postgresql://localhost/sonarqube',
+    'sonar.forceAuthentication': False,
+    'sonar.auth.saml.certificate': None,
+})
+check('Second merge is a no-op', again == merged and changes == {}, changes)
+
+merged, changes = properties_merge.merge('a=1\nb=2\na=3\n', {'a': '3'})
+check('Duplicate definitions collapse to one', merged == 'a=3\nb=2\n' and changes['a']['before'] == '3', merged)
+
+# One module run end to end: atomic write, one backup, per-key changes, idempotent
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'sonar.properties')
+    with open(path, 'w') as handle:
+        handle.write(SHIPPED)
+
+    def run(properties, check_mode=False):
+        args = {'ANSIBLE_MODULE_ARGS': {'path': path, 'properties': properties, 'backup': True,
+                                        '_ansible_check_mode': check_mode, '_ansible_diff': True}}
+        output = subprocess.run([sys.executable, MODULE], input=json.dumps(args), capture_output=True, text=True)
+        return json.loads(output.stdout)
+
+    saml = {'sonar.auth.saml.enabled': True, 'sonar.auth.saml.applicationId': 'sonarqube',
+            'sonar.forceAuthentication': False, 'sonar.auth.saml.certificate': None}
+    result = run(saml, check_mode=True)
+    with open(path) as handle:
+        untouched = handle.read() == SHIPPED
+    check('Check mode reports without writing', result['changed'] and untouched, result)
+    result = run(saml)
+    backups = [name for name in os.listdir(tmp) if name != 'sonar.properties']
+    check('Changes applied with exactly one backup', result['changed'] and len(backups) == 1
+          and sorted(result['changes']) == sorted(saml), (result, backups))
+    check('Diff covers the whole file', 'sonar.auth.saml.enabled' not in result['diff']['before']
+          and 'sonar.auth.saml.enabled=true' in result['diff']['after'], result.get('diff'))
+    result = run(saml)
+    check('Rerun is idempotent and makes no new backup', not result['changed'] and len(os.listdir(tmp)) == 2, result)
+    result = run({'sonar.jdbc.password': 's3cret'})
+    check('Passwords are masked in the reported changes',
+          result['changes']['sonar.jdbc.password'] == {'before': None, 'after': '********'}, result['changes'])
+    result = run({'sonar.auth.saml.certificate.secured': 'line1\nline2'})
+    check('Multi-line values are rejected', result.get('failed') and 'line breaks' in result['msg'], result)
+
+if all_passed:
+    print("🎉 All tests passed! The properties merge is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the properties merge.")
+    sys.exit(1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the proxy benchmark harness: template rendering for
+local nginx runs and a short load run directly against the stub backends
+"""
+
+import importlib.util
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'proxy-benchmark.py')
+spec = importlib.util.spec_from_file_location('proxy_benchmark', SCRIPT)
+benchmark = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(benchmark)
+
+print("🧪 Testing proxy benchmark harness\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+ports = {'jenkins': 19001, 'sonar': 19002, 'keycloak': 19003}
+workdir = tempfile.mkdtemp(prefix='proxy-benchmark-test-')
+
+config = benchmark.render_config('http', workdir, ports, 18080, {})
+check('HTTP template points upstreams at the stub backends',
+      all(f'server 127.0.0.1:{port};' in config for port in ports.values()))
+check('HTTP template listens on the benchmark port only', set(re.findall(r'listen\s+(\d+)', config)) == {'18080'})
+
+config = benchmark.render_config('ssl', workdir, ports, 18080, {'nginx_keepalive_connections': 64})
+check('SSL template keeps logs and certificates in the work directory',
+      '/var/log/nginx' not in config and f'{workdir}/tls/jenkins.bench.local.crt' in config)
+
+config = benchmark.render_config('http', workdir, ports, 18080, {
+    'nginx_keepalive_connections': 64,
+    'backend_options': {'jenkins': {'limits': {'rate': '100r/s'}}},
+})
+check('Variant overrides role variables', 'keepalive 64;' in config)
+check('Variant backend options reach matching backends only',
+      'zone=jenkins_req:' in config and 'zone=sonar_req' not in config)
+
+with tempfile.NamedTemporaryFile('w', suffix='.yml', delete=False) as handle:
+    handle.write('nginx_keepalive_connections: 8\n')
+name, overrides = benchmark.load_variant(f'small={handle.name}')
+check('Variant specs accept NAME=file.yml', name == 'small' and overrides == {'nginx_keepalive_connections': 8})
+check('Bare variant name means role defaults', benchmark.load_variant('baseline') == ('baseline', {}))
+os.unlink(handle.name)
+os.rmdir(workdir)
+
+check('Percentiles use nearest rank', benchmark.percentile(list(range(1, 101)), 95) == 95)
+
+# Short load run against the stub backends (exercises streaming, artifacts and websockets)
+result = subprocess.run([sys.executable, SCRIPT, '--direct', '--json', '--duration', '1', '--warmup', '0.2',
+                         '--concurrency', '8', '--artifact-mb', '0.5', '--console-lines', '5'],
+                        capture_output=True, text=True, timeout=60)
+summary = json.loads(result.stdout)[0] if result.returncode == 0 else {}
+check('Direct run completes without errors', summary.get('requests', 0) > 0 and summary.get('errors') == 0,
+      result.stderr[-500:] or summary.get('error_detail'))
+check('All scenarios exercised',
+      set(summary.get('scenarios', {})) == set(benchmark.SCENARIOS), sorted(summary.get('scenarios', {})))
+check('Upstream connection reuse reported',
+      all(backend['requests_per_connection'] for backend in summary.get('upstream', {}).values()),
+      summary.get('upstream'))
+
+if all_passed:
+    print("🎉 All tests passed! The proxy benchmark harness is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the proxy benchmark harness.")
+    sys.exit(1)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Test script to render the nginx proxy templates with sample backends
+and validate the generated configuration
+"""
+
+import ast
+import os
+import re
+import sys
+
+import yaml
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEMPLATES = {
+    'http': ('roles/setup-nginx-reverse-proxy', 'dynamic-backends.conf.j2'),
+    'ssl': ('roles/install-ssl-cert', 'dynamic-backends-ssl.conf.j2'),
+}
+KEYCLOAK_TEMPLATE = ('roles/nginx-keycloak-proxy', 'keycloak-https.conf.j2')
+
+
+def load_defaults(role):
+    """Load role defaults and resolve self-references like '{{ ssl_cert_dir }}/site.crt'"""
+    with open(os.path.join(ROOT, role, 'defaults', 'main.yml')) as handle:
+        variables = yaml.safe_load(handle) or {}
+    env = Environment()
+    for _ in range(5):
+        for key, value in variables.items():
+            # Block templates (nginx_upstream_servers) depend on the inventory; see resolve()
+            if isinstance(value, str) and '{{' in value and '{%' not in value:
+                try:
+                    variables[key] = env.from_string(value).render(**variables)
+                except Exception:
+                    pass
+    return variables
+
+
+def render(flavour, **overrides):
+    role, template = TEMPLATES[flavour] if flavour in TEMPLATES else flavour
+    env = Environment(loader=FileSystemLoader(os.path.join(ROOT, role, 'templates')),
+                      trim_blocks=True, undefined=StrictUndefined)
+    variables = load_defaults(role)
+    # install-ssl-cert expects site_backends from group_vars; share the proxy role defaults
+    variables.setdefault('site_backends', load_defaults(TEMPLATES['http'][0])['site_backends'])
+    variables.update({
+        'ansible_date_time': {'iso8601': '2025-01-01T00:00:00Z'},
+        'ssl_cert_dir': '/etc/nginx/tls',
+    })
+    variables.update(overrides)
+    resolve(variables)
+    return env.get_template(template).render(**variables)
+
+
+def resolve(variables):
+    """Render block-template defaults against the final variables and inventory, as Ansible does"""
+    variables.setdefault('groups', {})
+    variables.setdefault('hostvars', {})
+    for key, value in variables.items():
+        if isinstance(value, str) and '{%' in value:
+            variables[key] = ast.literal_eval(Environment().from_string(value).render(**variables).strip())
+    return variables
+
+
+def server_block(config, server_name, listen=None):
+    """Return the text of the first server block for server_name (optionally on a given listen port)"""
+    for match in re.finditer(r'^server \{$(.*?)^\}$', config, re.M | re.S):
+        body = match.group(1)
+        if re.search(rf'server_name\s+{re.escape(server_name)};', body) and (listen is None or f'listen          {listen}' in body):
+            return body
+    return ''
+
+
+def location_block(server, path):
+    match = re.search(rf'^  location {re.escape(path)} \{{$(.*?)^  \}}$', server, re.M | re.S)
+    return match.group(1) if match else ''
+
+
+def balanced(config):
+    return config.count('{') == config.count('}')
+
+
+LIMITED_BACKENDS = [
+    {
+        'server_name': 'jenkins.example.com', 'ip': '192.168.201.14', 'port': '8080',
+        'limits': {
+            'key': 'token', 'rate': '20r/s', 'burst': 40, 'conn': 64,
+            'locations': [
+                {'path': '~ /api/(json|xml|python)$', 'rate': '2r/s', 'burst': 5},
+                {'path': '/github-webhook/', 'exempt': True},
+            ],
+        },
+    },
+    {
+        'server_name': 'sonar.example.com', 'ip': '192.168.201.16', 'port': '9000',
+        'limits': {'rate': '10r/s', 'locations': [{'path': '/api/qualitygates/', 'burst': 2, 'nodelay': False}]},
+    },
+    {'server_name': 'keycloak.example.com', 'ip': '192.168.201.12', 'port': '8080'},
+]
+
+print("🧪 Testing dynamic nginx proxy templates\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+for flavour in TEMPLATES:
+    print(f"=== {flavour.upper()} template ===")
+    https = 443 if flavour == 'ssl' else 80
+    upstream = {'http': 'jenkins', 'ssl': 'jenkins_example_com'}[flavour]
+
+    config = render(flavour)
+    check(f'[{flavour}] Default backends render with balanced braces', balanced(config))
+    check(f'[{flavour}] Structured log format defined once', config.count('log_format upstream_json') == 1)
+    check(f'[{flavour}] No rate limiting without limits', 'limit_req' not in config)
+    check(f'[{flavour}] Upstream servers come from health checker include files',
+          'include /etc/nginx/upstreams.d/jenkins.example.com.conf;' in config and 'server 192.168.201.14:8080' not in config)
+    check(f'[{flavour}] Static servers when health checks are disabled',
+          'server 192.168.201.14:8080' in render(flavour, nginx_upstream_healthcheck_enabled=False))
+
+    config = render(flavour, site_backends=LIMITED_BACKENDS)
+    jenkins = server_block(config, 'jenkins.example.com', https)
+    sonar = server_block(config, 'sonar.example.com', https)
+    keycloak = server_block(config, 'keycloak.example.com', https)
+    check(f'[{flavour}] Limited backends render with balanced braces', balanced(config))
+    check(f'[{flavour}] Zones rendered once at http level',
+          config.count(f'zone={upstream}_req:') == 1
+          and 'limit_req_zone' not in jenkins and config.count('limit_req_status  429;') == 1)
+    check(f'[{flavour}] Token key falls back to client address', 'map $http_authorization $limit_key_token' in config)
+    check(f'[{flavour}] 429 responses carry Retry-After',
+          'error_page 429 = @rate_limited;' in jenkins and 'add_header Retry-After 5 always;' in jenkins)
+    check(f'[{flavour}] Stricter API location uses its own zone',
+          f'zone={upstream}_req_1 burst=5 nodelay;' in location_block(jenkins, '~ /api/(json|xml|python)$'))
+    check(f'[{flavour}] Exempt prefix override takes precedence over the Jenkins regex locations',
+          'limit_req' not in location_block(jenkins, '^~ /github-webhook/')
+          and 'Upgrade           $http_upgrade' in location_block(jenkins, '^~ /github-webhook/'))
+    check(f'[{flavour}] Generic location limited with burst and conn',
+          'burst=40 nodelay;' in location_block(jenkins, '/') and '_conn 64;' in location_block(jenkins, '/'))
+    check(f'[{flavour}] Override without rate reuses backend zone without nodelay',
+          re.search(r'zone=sonar\w*_req burst=2;', location_block(sonar, '^~ /api/qualitygates/')) is not None)
+    check(f'[{flavour}] Backends without limits are untouched', keycloak and 'limit_' not in keycloak)
+
+    location_token = [dict(LIMITED_BACKENDS[1], limits={'rate': '10r/s', 'locations': [
+        {'path': '/api/measures/', 'key': 'token', 'rate': '1r/s'}]})]
+    config = render(flavour, site_backends=location_token)
+    check(f'[{flavour}] Token key on a location alone defines the token map',
+          'map $http_authorization $limit_key_token' in config
+          and re.search(r'limit_req_zone \$limit_key_token zone=sonar\w*_req_1:', config) is not None)
+    rewritten = [dict(LIMITED_BACKENDS[1], rewrite_rule='^/sonar/(.*) /$1 break')]
+    override = location_block(server_block(render(flavour, site_backends=rewritten), 'sonar.example.com', https),
+                              '^~ /api/qualitygates/')
+    check(f'[{flavour}] Override locations apply the backend rewrite rule',
+          'rewrite ^/sonar/(.*) /$1 break;' in override, override)
+
+    generated_paths = [dict(LIMITED_BACKENDS[0], limits={'rate': '20r/s', 'conn': 64, 'locations': [
+        {'path': '/', 'rate': '5r/s', 'burst': 10}, {'path': '/userContent', 'rate': '50r/s'}]})]
+    config = render(flavour, site_backends=generated_paths)
+    merged = server_block(config, 'jenkins.example.com', https)
+    paths = re.findall(r'^  location (.+?) \{$', merged, re.M)
+    check(f'[{flavour}] Overrides for generated paths are merged, never duplicated',
+          balanced(config) and len(paths) == len(set(paths)) and '^~ /' not in paths
+          and '^~ /userContent' not in paths, paths)
+    check(f'[{flavour}] Merged overrides apply their own zones',
+          f'zone={upstream}_req_1 burst=10 nodelay;' in location_block(merged, '/')
+          and '_conn 64;' in location_block(merged, '/')
+          and f'zone={upstream}_req_2 burst=40' not in location_block(merged, '/userContent')
+          and f'zone={upstream}_req_2 nodelay;' in location_block(merged, '/userContent'), merged)
+    check(f'[{flavour}] userContent stays unlimited without an override', 'limit_' not in location_block(jenkins, '/userContent'))
+
+    websocket = location_block(jenkins, '~ ^/(wsagents|cli)(/|$)')
+    console = location_block(jenkins, '~ (/logText/progressive(Text|Html)|/consoleText|^/sse-gateway/.*)$')
+    artifacts = location_block(jenkins, '~ ^/(.*/)?job/.+/(artifact|ws)/')
+    check(f'[{flavour}] Websocket and CLI unbuffered with long timeout and no limits',
+          'proxy_buffering    off;' in websocket and 'proxy_read_timeout         3600s;' in websocket
+          and 'limit_' not in websocket)
+    check(f'[{flavour}] Console streaming unbuffered but still limited',
+          'proxy_buffering    off;' in console and 'proxy_read_timeout         300s;' in console
+          and f'zone={upstream}_req burst=40 nodelay;' in console)
+    check(f'[{flavour}] Artifacts buffered to disk',
+          'proxy_buffering    on;' in artifacts and 'proxy_max_temp_file_size 1024m;' in artifacts)
+    check(f'[{flavour}] Generic location keeps default buffering',
+          'proxy_buffering' not in location_block(jenkins, '/')
+          and 'proxy_max_temp_file_size 0;' in location_block(jenkins, '/'))
+    check(f'[{flavour}] User overrides are rendered before streaming locations',
+          jenkins.index('location ~ /api/(json|xml|python)$') < jenkins.index('location ~ ^/(wsagents|cli)'))
+    check(f'[{flavour}] Streaming locations only for Jenkins', 'proxy_buffering' not in sonar + keycloak)
+
+    print(f"=== {flavour.upper()} template, upstreams from inventory groups ===")
+    inventory = {
+        'groups': {'jenkins': ['jenkins1.local', 'jenkins2.local'], 'sonarqube': ['sonar1.local', 'sonar2.local', 'sonar3']},
+        'hostvars': {'jenkins1.local': {'ansible_host': '10.0.0.11'}, 'jenkins2.local': {'ansible_host': '10.0.0.12'},
+                     'sonar1.local': {'ansible_host': '10.0.0.21'}, 'sonar2.local': {'ansible_host': '10.0.0.22'},
+                     'sonar3': {}},
+    }
+    grouped = [
+        {'server_name': 'jenkins.example.com', 'group': 'jenkins', 'port': '8080', 'balance': 'ip_hash'},
+        {'server_name': 'sonar.example.com', 'group': 'sonarqube', 'port': '9000', 'balance': 'least_conn'},
+        {'server_name': 'keycloak.example.com', 'ip': '192.168.201.12', 'port': '8080'},
+    ]
+    servers = resolve(dict(inventory, site_backends=grouped,
+                           nginx_upstream_servers=load_defaults(TEMPLATES[flavour][0])['nginx_upstream_servers']))
+    check(f'[{flavour}] Servers resolved from group members (ansible_host, else inventory name)',
+          servers['nginx_upstream_servers'] == {'jenkins.example.com': ['10.0.0.11:8080', '10.0.0.12:8080'],
+                                                'sonar.example.com': ['10.0.0.21:9000', '10.0.0.22:9000', 'sonar3:9000'],
+                                                'keycloak.example.com': ['192.168.201.12:8080']},
+          servers['nginx_upstream_servers'])
+    config = render(flavour, site_backends=grouped, nginx_upstream_healthcheck_enabled=False, **inventory)
+    sonar_upstream = re.search(r'^upstream sonar\w* \{$(.*?)^\}$', config, re.M | re.S)
+    check(f'[{flavour}] Every group member is an upstream server with the balancing method',
+          balanced(config) and sonar_upstream is not None and 'least_conn;' in sonar_upstream.group(1)
+          and all(f'server {address}:9000;' in sonar_upstream.group(1) for address in ('10.0.0.21', '10.0.0.22', 'sonar3'))
+          and 'ip_hash;' in config and 'server 192.168.201.12:8080;' in config, config[:3000])
+    check(f'[{flavour}] A new group member is added on the next render',
+          'server 10.0.0.13:8080;' in render(flavour, site_backends=grouped, nginx_upstream_healthcheck_enabled=False,
+                                             groups=dict(inventory['groups'], jenkins=['jenkins1.local', 'jenkins2.local', 'jenkins3.local']),
+                                             hostvars=dict(inventory['hostvars'], **{'jenkins3.local': {'ansible_host': '10.0.0.13'}})))
+    aliased = [{'server_name': ['jenkins.example.com', 'ci.example.com'], 'group': 'jenkins', 'port': '8080'}]
+    config = render(flavour, site_backends=aliased, nginx_upstream_healthcheck_enabled=False, **inventory)
+    check(f'[{flavour}] Backends with several server names use the first one for their servers',
+          balanced(config) and 'server 10.0.0.11:8080;' in config and 'server_name     jenkins.example.com ci.example.com;' in config)
+
+print("=== Keycloak HTTPS template ===")
+config = render(KEYCLOAK_TEMPLATE)
+metadata_location = re.search(r'^  location ~ \^/realms/.*?\{$(.*?)^  \}$', config, re.M | re.S)
+metadata = metadata_location.group(1) if metadata_location else ''
+check('[keycloak] Cache zone declared at http level', config.startswith('#') and 'keys_zone=keycloak_metadata:' in config.split('server {')[0])
+check('[keycloak] Discovery, JWKS and SAML descriptor are cached',
+      all(path in metadata_location.group(0) for path in ('openid-configuration', 'openid-connect/certs', 'saml/descriptor'))
+      if metadata_location else False)
+check('[keycloak] Cache lock, background update and stale serving',
+      all(directive in metadata for directive in ('proxy_cache_lock               on', 'proxy_cache_background_update  on', 'proxy_cache_use_stale          error timeout updating')))
+check('[keycloak] Token, login and admin paths are not cached',
+      config.count('proxy_cache ') == 1 and re.search(r'token|auth\b|admin', metadata_location.group(0).split('{')[0]) is None
+      if metadata_location else False)
+check('[keycloak] Cache can be disabled',
+      'proxy_cache' not in render(KEYCLOAK_TEMPLATE, keycloak_metadata_cache_enabled=False))
+
+if all_passed:
+    print("🎉 All tests passed! The proxy templates render correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the proxy templates.")
+    sys.exit(1)
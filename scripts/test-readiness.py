@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the shared readiness library against local stub services
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location(
+    'readiness', os.path.join(ROOT, 'roles', 'service-readiness', 'module_utils', 'readiness.py'))
+readiness = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(readiness)
+
+print("🧪 Testing readiness library\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+class StubService:
+    """Serves the Jenkins, SonarQube and Keycloak readiness URLs; becomes ready after `ready_after` seconds"""
+
+    def __init__(self, ready_after):
+        self.ready_at = time.monotonic() + ready_after
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                ready = time.monotonic() >= service.ready_at
+                if self.path == '/login':
+                    status, body = (200, 'Sign in') if ready else (503, readiness.JENKINS_STARTING)
+                elif self.path == '/api/system/status':
+                    status, body = 200, json.dumps({'status': 'UP' if ready else 'STARTING'})
+                elif self.path == '/realms/jenkins/.well-known/openid-configuration' and ready:
+                    status, body = 200, json.dumps({'issuer': 'http://localhost/realms/jenkins'})
+                else:
+                    status, body = 404, 'not found'
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+# Backoff schedule with a fake clock: 1, 2, 4, capped at 5, last probe at the deadline
+now = [0.0]
+sleeps = []
+
+
+def fake_sleep(seconds):
+    sleeps.append(seconds)
+    now[0] += seconds
+
+
+never = readiness.Condition('never', lambda: (False, 'nope'))
+result = readiness.wait_for(never, deadline=15, initial_delay=1, max_delay=5, clock=lambda: now[0], sleep=fake_sleep)
+check('Exponential backoff capped and clipped to the deadline', sleeps == [1, 2, 4, 5, 3], sleeps)
+check('Deadline reported as not ready with last detail',
+      result['ready'] is False and result['attempts'] == 6 and result['detail'] == 'nope', result)
+
+broken = readiness.Condition('broken', lambda: 1 / 0)
+check('Probe exceptions count as not ready', readiness.wait_until([broken], timeout=0)['broken']['detail']
+      .startswith('ZeroDivisionError'))
+
+# Presets against stub services; conditions are waited for concurrently
+fast, slow = StubService(0.5), StubService(2)
+start = time.monotonic()
+results = readiness.wait_until([
+    readiness.jenkins(fast.url),
+    readiness.sonarqube(slow.url),
+    readiness.keycloak_realm(slow.url, realm='jenkins'),
+], timeout=20, initial_delay=0.2, max_delay=0.5)
+elapsed = time.monotonic() - start
+check('All presets become ready', all(result['ready'] for result in results.values()), results)
+check('Conditions are probed concurrently', elapsed < 4, f'{elapsed:.1f}s')
+check('Time-to-ready recorded per service',
+      results['jenkins']['seconds'] < results['sonarqube']['seconds'] and results['jenkins']['attempts'] > 1,
+      results)
+
+starting = StubService(60)
+results = readiness.wait_until([readiness.jenkins(starting.url)], timeout=0.5, initial_delay=0.1)
+check('Jenkins "getting ready" page is not ready', results['jenkins']['detail'] == 'HTTP 503', results)
+results = readiness.wait_until([readiness.sonarqube(starting.url)], timeout=0.3, initial_delay=0.1)
+check('SonarQube STARTING is not ready', "status='STARTING'" in results['sonarqube']['detail'], results)
+
+results = readiness.wait_until([readiness.TcpCondition('tcp', '127.0.0.1', fast.server.server_address[1]),
+                                readiness.TcpCondition('closed', '127.0.0.1', 1)], timeout=0.5, initial_delay=0.1)
+check('TCP conditions', results['tcp']['ready'] and not results['closed']['ready'], results)
+
+# curl through a remote runner (testinfra host.run in the molecule tests)
+commands = []
+
+
+def run(command):
+    commands.append(command)
+    return '{"status":"UP"}\n200'
+
+
+results = readiness.wait_until([readiness.sonarqube('https://sonar', fetch=readiness.curl_fetch(run),
+                                                    validate_certs=False)], timeout=1)
+check('curl fetch parses status and body', results['sonarqube']['ready'], results)
+check('curl fetch honours validate_certs', ' -k ' in commands[0] and commands[0].endswith('https://sonar/api/system/status'),
+      commands)
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'log', 'startup-times.jsonl')
+    readiness.record_history(path, {'jenkins': {'ready': True, 'seconds': 12.5, 'attempts': 4}}, host='ci')
+    readiness.record_history(path, {'jenkins': {'ready': True, 'seconds': 14.0, 'attempts': 5}}, host='ci')
+    with open(path) as handle:
+        lines = [json.loads(line) for line in handle]
+    check('History file appends one JSON line per service and run',
+          [line['seconds'] for line in lines] == [12.5, 14.0] and lines[0]['service'] == 'jenkins', lines)
+
+if all_passed:
+    print("🎉 All tests passed! The readiness library is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the readiness library.")
+    sys.exit(1)
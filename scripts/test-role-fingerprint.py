@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script to validate role input fingerprints and their wiring into the
+install roles
+"""
+
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = os.path.join(ROOT, 'roles', 'role-fingerprint', 'library', 'role_fingerprint.py')
+spec = importlib.util.spec_from_file_location('role_fingerprint', MODULE)
+role_fingerprint = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(role_fingerprint)
+
+FINGERPRINTED_ROLES = {
+    'install-jenkins': 'jenkins_fingerprint_var_patterns',
+    'install-sonarqube': 'sonarqube_fingerprint_var_patterns',
+    'install-keycloak': 'keycloak_fingerprint_var_patterns',
+    'install-ssl-cert': 'ssl_fingerprint_var_patterns',
+    'setup-nginx-reverse-proxy': 'nginx_fingerprint_var_patterns',
+}
+
+print("🧪 Testing role fingerprints\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    role = os.path.join(tmp, 'install-demo')
+    shutil.copytree(os.path.join(ROOT, 'roles', 'install-keycloak'), role)
+    data = {'keycloak_version': '22.0.5', 'keycloak_packages': ['java-17-openjdk', 'tar'], 'keycloak_http_port': 8080}
+
+    digest, files = role_fingerprint.fingerprint([role], data)
+    check('Fingerprint is stable', role_fingerprint.fingerprint([role], dict(reversed(list(data.items())))) == (digest, files))
+    check('Molecule scenarios and byte code are not hashed', all(
+        'molecule' not in name and not name.endswith('.pyc') for name, _ in role_fingerprint.role_files(role, ['molecule', '__pycache__', '*.pyc', '.*'])))
+
+    os.makedirs(os.path.join(role, 'molecule', 'default'), exist_ok=True)
+    with open(os.path.join(role, 'molecule', 'default', 'converge.yml'), 'a') as handle:
+        handle.write('# test change\n')
+    check('Test-only changes keep the fingerprint', role_fingerprint.fingerprint([role], data, ['molecule'])[0] == digest)
+
+    changed = dict(data, keycloak_http_port=8081)
+    check('Variable change changes the fingerprint', role_fingerprint.fingerprint([role], changed)[0] != digest)
+
+    with open(os.path.join(role, 'templates', 'keycloak.service.j2'), 'a') as handle:
+        handle.write('# edited\n')
+    check('Template change changes the fingerprint', role_fingerprint.fingerprint([role], data)[0] != digest)
+
+    os.rename(os.path.join(role, 'templates', 'keycloak.service.j2'), os.path.join(role, 'templates', 'keycloak.j2'))
+    renamed = role_fingerprint.fingerprint([role], data)[0]
+    os.rename(os.path.join(role, 'templates', 'keycloak.j2'), os.path.join(role, 'templates', 'keycloak.service.j2'))
+    check('Renaming a file changes the fingerprint', renamed != role_fingerprint.fingerprint([role], data)[0])
+
+    state_file = os.path.join(tmp, 'state.json')
+    with open(state_file, 'w') as handle:
+        json.dump({'role': 'install-demo', 'fingerprint': digest}, handle)
+    args = {'ANSIBLE_MODULE_ARGS': {'paths': [role], 'data': data, 'state_file': state_file}}
+    output = subprocess.run([sys.executable, MODULE], input=json.dumps(args), capture_output=True, text=True)
+    result = json.loads(output.stdout)
+    check('Module returns the fingerprint and the stored state', result['fingerprint'] == role_fingerprint.fingerprint(
+        [role], data, ['molecule', '__pycache__', '*.pyc', '.*'])[0] and result['stored']['fingerprint'] == digest
+        and not result['changed'], result)
+
+    args['ANSIBLE_MODULE_ARGS']['state_file'] = os.path.join(tmp, 'missing.json')
+    output = subprocess.run([sys.executable, MODULE], input=json.dumps(args), capture_output=True, text=True)
+    check('Missing state file means nothing stored', json.loads(output.stdout)['stored'] == {}, output.stdout)
+
+    args['ANSIBLE_MODULE_ARGS']['paths'] = [os.path.join(tmp, 'no-such-role')]
+    output = subprocess.run([sys.executable, MODULE], input=json.dumps(args), capture_output=True, text=True)
+    check('Missing role paths fail', json.loads(output.stdout).get('failed'), output.stdout)
+
+for name, patterns in FINGERPRINTED_ROLES.items():
+    with open(os.path.join(ROOT, 'roles', name, 'tasks', 'main.yml')) as handle:
+        tasks = yaml.safe_load(handle)
+    with open(os.path.join(ROOT, 'roles', name, 'defaults', 'main.yml')) as handle:
+        defaults = yaml.safe_load(handle)
+    with open(os.path.join(ROOT, 'roles', name, 'meta', 'main.yml')) as handle:
+        dependencies = [dependency['role'] for dependency in yaml.safe_load(handle)['dependencies']]
+    steps = [task.get('include_role', {}).get('tasks_from') or task.get('include_tasks', {}).get('file') for task in tasks]
+    # Variable-only checks may run before the fingerprint, always
+    if steps[0] == 'preflight.yml':
+        check(f'{name}: preflight checks run before the fingerprint, always', 'always' in tasks[0]['tags']
+              and tasks[0]['include_tasks']['apply']['tags'] == ['always'] and 'when' not in tasks[0])
+        steps, tasks = steps[1:], tasks[1:]
+    body = tasks[1]
+    check(f'{name}: check, body and save wired around install.yml', steps == ['check', 'install.yml', 'save']
+          and all('always' in task['tags'] for task in tasks) and body['include_tasks']['apply']['tags'] == ['verify']
+          and body['when'] == tasks[2]['when'] == 'not role_fingerprint_skip' and 'role-fingerprint' in dependencies, steps)
+    check(f'{name}: variable patterns defined and used', defaults.get(patterns) and tasks[0]['vars'][
+        'role_fingerprint_var_patterns'] == '{{ %s }}' % patterns, patterns)
+
+if all_passed:
+    print("🎉 All tests passed! Role fingerprints are working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the role fingerprints.")
+    sys.exit(1)
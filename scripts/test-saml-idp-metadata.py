@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the controller-side SAML IdP metadata cache
+(saml_idp_metadata module) against a local Keycloak stand-in
+"""
+
+import importlib.util
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = os.path.join(ROOT, 'roles', 'saml-idp-metadata', 'library', 'saml_idp_metadata.py')
+
+spec = importlib.util.spec_from_file_location('saml_idp_metadata', MODULE)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+print("🧪 Testing SAML IdP metadata cache\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+def certificate(tmp, name, days):
+    """Self-signed certificate: base64 DER body, SHA-256 fingerprint and notAfter as openssl prints them"""
+    pem = os.path.join(tmp, f'{name}.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', str(days), '-subj',
+                    f'/CN={name}', '-keyout', os.path.join(tmp, f'{name}.key'), '-out', pem],
+                   check=True, capture_output=True)
+    info = subprocess.run(['openssl', 'x509', '-in', pem, '-noout', '-fingerprint', '-sha256', '-enddate'],
+                          check=True, capture_output=True, text=True).stdout
+    with open(pem) as handle:
+        body = ''.join(line for line in handle.read().splitlines() if not line.startswith('-----'))
+    return {'body': body, 'sha256': re.search(r'Fingerprint=(\S+)', info).group(1),
+            'not_after': re.search(r'notAfter=(.*)', info).group(1).strip()}
+
+
+DESCRIPTOR = '''<md:EntityDescriptor xmlns="urn:oasis:names:tc:SAML:2.0:metadata" \
+xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata" xmlns:ds="http://www.w3.org/2000/09/xmldsig#" \
+entityID="{base}/realms/jenkins">
+  <md:IDPSSODescriptor WantAuthnRequestsSigned="true" protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
+{keys}
+    <md:SingleLogoutService Binding="urn:oasis:names:tc:SAML:2.0:bindings:HTTP-POST" Location="{base}/realms/jenkins/protocol/saml"/>
+    <md:NameIDFormat>urn:oasis:names:tc:SAML:1.1:nameid-format:unspecified</md:NameIDFormat>
+    <md:SingleSignOnService Binding="urn:oasis:names:tc:SAML:2.0:bindings:HTTP-POST" Location="{base}/realms/jenkins/protocol/saml"/>
+  </md:IDPSSODescriptor>
+</md:EntityDescriptor>'''
+
+KEY = '''    <md:KeyDescriptor use="{use}">
+      <ds:KeyInfo>
+        <ds:KeyName>{kid}</ds:KeyName>
+        <ds:X509Data><ds:X509Certificate>{body}</ds:X509Certificate></ds:X509Data>
+      </ds:KeyInfo>
+    </md:KeyDescriptor>'''
+
+
+class StubKeycloak(BaseHTTPRequestHandler):
+    """Serves the jenkins realm's JWKS and SAML descriptor, counting requests per endpoint"""
+    keys = []          # (kid, use, certificate)
+    broken = None      # replaces the descriptor when set
+    down = False
+    requests = {'certs': 0, 'descriptor': 0}
+
+    def do_GET(self):
+        base = f'http://{self.headers["Host"]}'
+        if self.down:
+            body, status = b'', 503
+        elif self.path == '/realms/jenkins/protocol/openid-connect/certs':
+            StubKeycloak.requests['certs'] += 1
+            body, status = json.dumps({'keys': [{'kid': kid, 'kty': 'RSA', 'use': 'sig' if use == 'signing' else 'enc',
+                                                 'x5c': [cert['body']]} for kid, use, cert in self.keys]}).encode(), 200
+        elif self.path == '/realms/jenkins/protocol/saml/descriptor':
+            StubKeycloak.requests['descriptor'] += 1
+            keys = '\n'.join(KEY.format(use=use, kid=kid, body=cert['body']) for kid, use, cert in self.keys)
+            body, status = (self.broken or DESCRIPTOR.format(base=base, keys=keys)).encode(), 200
+        else:
+            body, status = b'', 404
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def reset():
+    StubKeycloak.requests = {'certs': 0, 'descriptor': 0}
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), StubKeycloak)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f'http://127.0.0.1:{server.server_address[1]}'
+
+with tempfile.TemporaryDirectory() as tmp:
+    first = certificate(tmp, 'first', 3650)
+    rotated = certificate(tmp, 'rotated', 3650)
+    encryption = certificate(tmp, 'encryption', 3650)
+    expiring = certificate(tmp, 'expiring', 5)
+    long_lived = certificate(tmp, 'long-lived', 36500)
+    cache_dir = os.path.join(tmp, 'cache')
+
+    def ensure(**params):
+        cache = module.MetadataCache(dict({'base_url': url + '/', 'realm': 'jenkins', 'cache_dir': cache_dir,
+                                           'refresh_period': 86400, 'force': False, 'expiry_warning_days': 14,
+                                           'validate_certs': True, 'timeout': 5}, **params))
+        entry, source, changed = cache.ensure()
+        return entry, source, changed, cache.warnings
+
+    StubKeycloak.keys = [('kid-1', 'signing', first), ('kid-enc', 'encryption', encryption)]
+    reset()
+    entry, source, changed, warnings = ensure()
+    signing = entry['certificates'][0]
+    check('First run downloads, validates and fingerprints the descriptor', source == 'keycloak' and changed
+          and StubKeycloak.requests == {'certs': 1, 'descriptor': 1} and entry['key_ids'] == ['kid-1', 'kid-enc']
+          and entry['entity_id'] == f'{url}/realms/jenkins' and entry['sso_url'] == f'{url}/realms/jenkins/protocol/saml'
+          and not warnings, (source, StubKeycloak.requests, entry['key_ids'], warnings))
+    check('Certificate fingerprint and expiry match openssl', signing['kid'] == 'kid-1'
+          and signing['sha256'] == first['sha256'] and signing['not_after'][:4] in first['not_after'], signing)
+    check('Signing certificate chosen over the encryption key', entry['signing_certificate'] == first['body']
+          and entry['certificates'][1]['use'] == 'encryption', entry['certificates'])
+
+    reset()
+    entry, source, changed, warnings = ensure()
+    check('Within the refresh period: served from the cache without any request', source == 'cache' and not changed
+          and StubKeycloak.requests == {'certs': 0, 'descriptor': 0}, (source, StubKeycloak.requests))
+
+    reset()
+    entry, source, changed, warnings = ensure(refresh_period=0)
+    check('Refresh with unchanged key IDs reads only the JWKS', source == 'cache' and not changed
+          and StubKeycloak.requests == {'certs': 1, 'descriptor': 0}, (source, StubKeycloak.requests))
+
+    StubKeycloak.keys = [('kid-2', 'signing', rotated), ('kid-1', 'signing', first), ('kid-enc', 'encryption', encryption)]
+    reset()
+    entry, source, changed, warnings = ensure(refresh_period=0)
+    check('Key rotation: new key ID triggers a download', source == 'keycloak' and changed
+          and StubKeycloak.requests == {'certs': 1, 'descriptor': 1} and entry['key_ids'] == ['kid-1', 'kid-2', 'kid-enc'],
+          (source, StubKeycloak.requests, entry['key_ids']))
+
+    StubKeycloak.down = True
+    entry, source, changed, warnings = ensure(refresh_period=0)
+    check('Keycloak down: the cached descriptor is used with a warning', source == 'stale-cache' and not changed
+          and entry['key_ids'] == ['kid-1', 'kid-2', 'kid-enc'] and 'not reachable' in warnings[0], (source, warnings))
+    StubKeycloak.down = False
+
+    StubKeycloak.broken = '<md:EntityDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata" entityID="x"/>'
+    try:
+        ensure(force=True)
+        error = None
+    except module.MetadataError as e:
+        error = str(e)
+    entry, source, changed, warnings = ensure()
+    check('Invalid descriptor rejected, the cached one kept', error == 'descriptor has no EntityDescriptor with an '
+          'IDPSSODescriptor' and source == 'cache' and entry['key_ids'] == ['kid-1', 'kid-2', 'kid-enc'], (error, source))
+    StubKeycloak.broken = None
+
+    StubKeycloak.keys = [('kid-3', 'signing', {'body': 'MIIBbm90IGEgY2VydGlmaWNhdGU='})]
+    try:
+        ensure(force=True)
+        error = None
+    except module.MetadataError as e:
+        error = str(e)
+    check('Garbage certificate rejected', error == 'certificate is not a valid DER X.509 certificate', error)
+
+    StubKeycloak.keys = [('kid-4', 'signing', expiring)]
+    entry, source, changed, warnings = ensure(force=True)
+    check('Signing certificate close to expiry is reported', changed
+          and warnings == ['signing certificate kid-4 expires in 4 days'], warnings)
+
+    StubKeycloak.keys = [('kid-5', 'signing', long_lived)]
+    entry, source, changed, warnings = ensure(force=True)
+    check('GeneralizedTime validity (after 2049) parsed', entry['certificates'][0]['not_after'][:4]
+          in long_lived['not_after'] and int(entry['certificates'][0]['not_after'][:4]) > 2100, entry['certificates'])
+
+    with open(os.path.join(cache_dir, 'jenkins.xml'), 'a') as handle:
+        handle.write('<!-- edited -->')
+    reset()
+    entry, source, changed, warnings = ensure()
+    check('Edited cache file detected and downloaded again', source == 'keycloak'
+          and StubKeycloak.requests['descriptor'] == 1 and 'does not match its stamp' in warnings[0], (source, warnings))
+
+    # The role task and the Jenkins template through Ansible, as the SAML roles run them
+    playbook = os.path.join(tmp, 'saml.yml')
+    with open(playbook, 'w') as handle:
+        handle.write(f'''
+- hosts: localhost
+  gather_facts: false
+  vars_files:
+    - {ROOT}/roles/jenkins-keycloak-saml/defaults/main.yml
+  tasks:
+    - include_role:
+        name: jenkins-keycloak-saml
+        tasks_from: get_keycloak_certificate
+    - copy:
+        content: "{{{{ lookup('template', '{ROOT}/roles/jenkins-keycloak-saml/templates/jenkins-saml-config.xml.j2') }}}}"
+        dest: {tmp}/jenkins-saml-config.xml
+''')
+    env = dict(os.environ, ANSIBLE_ROLES_PATH=os.path.join(ROOT, 'roles'), ANSIBLE_STDOUT_CALLBACK='default',
+               ANSIBLE_LOCALHOST_WARNING='false', ANSIBLE_INVENTORY_UNPARSED_WARNING='false')
+    StubKeycloak.keys = [('kid-6', 'signing', rotated)]
+    reset()
+    overrides = {'saml_idp_metadata_cache_dir': cache_dir, 'saml_idp_metadata_refresh_period': 0,
+                 'keycloak': {'base_url': url, 'realm': 'jenkins'}}
+    runs = [subprocess.run(['ansible-playbook', '-c', 'local', playbook, '-e', json.dumps(overrides)], capture_output=True, text=True, env=env,
+                           cwd=tmp, stdin=subprocess.DEVNULL) for _ in range(2)]
+    check('Playbook run downloads once, the re-run only checks the key IDs', runs[0].returncode == 0
+          and 'changed=2' in runs[0].stdout and 'changed=0' in runs[1].stdout
+          and StubKeycloak.requests == {'certs': 2, 'descriptor': 1},
+          (StubKeycloak.requests, runs[0].stdout[-1500:] + runs[0].stderr[-1500:]))
+    if runs[0].returncode == 0:
+        with open(os.path.join(tmp, 'jenkins-saml-config.xml')) as handle:
+            realm = ET.fromstring(handle.read())
+        with open(os.path.join(cache_dir, 'jenkins.xml')) as handle:
+            cached = handle.read()
+        check('Jenkins gets the cached descriptor as static metadata', realm.findtext('idpMetadataConfiguration/xml')
+              == cached and realm.find('idpMetadataConfiguration/url') is None
+              and realm.findtext('idpMetadataConfiguration/period') == '0' and rotated['body'] in cached)
+
+server.shutdown()
+
+if all_passed:
+    print("🎉 All tests passed! SAML IdP metadata caching is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review SAML IdP metadata caching.")
+    sys.exit(1)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the task_history callback plugin and its query script
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location('task_history', os.path.join(ROOT, 'callback_plugins', 'task_history.py'))
+task_history = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(task_history)
+
+print("🧪 Testing task duration history\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+def fake_run(seconds):
+    return {'playbook': 'playbooks/site.yml', 'tasks': [
+        {'task': 'install-jenkins : Install plugins', 'role': 'install-jenkins', 'host': 'jenkins1', 'seconds': seconds},
+        {'task': 'Ping', 'role': None, 'host': 'jenkins1', 'seconds': 0.1},
+    ]}
+
+
+history = [fake_run(seconds) for seconds in (20, 22, 21, 19)]
+check('Slower task flagged against its rolling median',
+      [task['task'] for task in task_history.find_regressions(fake_run(40), history)]
+      == ['install-jenkins : Install plugins'])
+check('Duration within the threshold is not flagged', task_history.find_regressions(fake_run(25), history) == [])
+check('Too few earlier runs give no median', task_history.find_regressions(fake_run(40), history[:2]) == [])
+check('Window limits the median to recent runs',
+      task_history.find_regressions(fake_run(40), [fake_run(60)] * 5 + history, window=4) != []
+      and task_history.find_regressions(fake_run(40), [fake_run(60)] * 5 + history, window=0) == [])
+check('Role totals include playbook-level tasks', task_history.role_totals(fake_run(20))
+      == {('install-jenkins', 'jenkins1'): 20, ('(playbook)', 'jenkins1'): 0.1})
+
+PLAYBOOK = """- hosts: localhost
+  connection: local
+  gather_facts: false
+  roles:
+    - timed
+  tasks:
+    - name: Slow step
+      command: sleep {{ pause }}
+    - name: Never runs
+      command: "true"
+      when: false
+"""
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.makedirs(os.path.join(tmp, 'roles', 'timed', 'tasks'))
+    with open(os.path.join(tmp, 'roles', 'timed', 'tasks', 'main.yml'), 'w') as handle:
+        handle.write('- name: Role step\n  debug:\n    msg: timed\n')
+    with open(os.path.join(tmp, 'site.yml'), 'w') as handle:
+        handle.write(PLAYBOOK)
+    history_file = os.path.join(tmp, 'history.jsonl')
+    environment = dict(os.environ, ANSIBLE_CALLBACK_PLUGINS=os.path.join(ROOT, 'callback_plugins'),
+                       ANSIBLE_CALLBACKS_ENABLED='task_history', ANSIBLE_STDOUT_CALLBACK='default',
+                       ANSIBLE_ROLES_PATH=os.path.join(tmp, 'roles'), ANSIBLE_NOCOLOR='1',
+                       TASK_HISTORY_FILE=history_file, TASK_HISTORY_MIN_SECONDS='0.2', TASK_HISTORY_TOP='3')
+
+    def play(pause):
+        return subprocess.run(['ansible-playbook', '-i', 'localhost,', 'site.yml', '-e', f'pause={pause}'],
+                              cwd=tmp, env=environment, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+
+    outputs = [play(pause) for pause in (0.3, 0.3, 0.3, 1.2)]
+    runs = task_history.load_history(history_file)
+    check('Playbooks ran', all(output.returncode == 0 for output in outputs), outputs[0].stdout + outputs[0].stderr)
+    check('One history line per run, keyed by playbook', len(runs) == 4 and runs[0]['playbook'] == 'site.yml', runs)
+    tasks = dict((task['task'], task) for task in runs[0]['tasks'])
+    check('Tasks recorded with role, host and status', tasks.get('timed : Role step', {}).get('role') == 'timed'
+          and tasks.get('Slow step', {}).get('status') == 'changed'
+          and tasks.get('Never runs', {}).get('status') == 'skipped', tasks)
+    check('Per-host counts recorded', runs[0]['hosts']['localhost']['skipped'] == 1
+          and runs[0]['hosts']['localhost']['changed'] == 1, runs[0]['hosts'])
+    check('Slowest tasks printed at the end of the run', 'SLOWEST TASKS' in outputs[0].stdout
+          and 'role timed' in outputs[0].stdout, outputs[0].stdout)
+    check('No regression while durations are stable', 'REGRESSIONS' not in outputs[2].stdout, outputs[2].stdout)
+    check('Regression warned on the slow run', 'Slow step on localhost took' in outputs[3].stdout + outputs[3].stderr,
+          outputs[3].stdout)
+
+    def query(*args):
+        return subprocess.run([sys.executable, os.path.join(ROOT, 'scripts', 'task-history.py'), '--file', history_file]
+                              + list(args), capture_output=True, text=True)
+
+    result = query('--json', 'trend', '--task', 'Slow*')
+    trend = json.loads(result.stdout)
+    check('Trend lists the task run by run', len(trend) == 4
+          and trend[-1]['seconds'] > max(row['seconds'] for row in trend[:-1]), trend)
+    result = query('--json', 'regressions', '--min-seconds', '0.2')
+    check('Regressions query exits non-zero with the slow task', result.returncode == 1
+          and [row['task'] for row in json.loads(result.stdout)] == ['Slow step'], result.stdout)
+    result = query('runs')
+    check('Runs listed as a table', result.returncode == 0 and result.stdout.count('site.yml') == 4, result.stdout)
+
+if all_passed:
+    print("🎉 All tests passed! The task duration history is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the task duration history.")
+    sys.exit(1)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the nginx upstream health checker against local stub backends
+"""
+
+import ast
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+import yaml
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+ROLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'roles', 'setup-nginx-reverse-proxy')
+
+spec = importlib.util.spec_from_file_location(
+    'nginx_upstream_healthcheck', os.path.join(ROLE, 'files', 'nginx-upstream-healthcheck.py'))
+healthcheck = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(healthcheck)
+
+
+class StubBackend:
+    """HTTP server answering every request with a configurable status and body"""
+
+    def __init__(self, status=200, body='ok'):
+        self.status = status
+        self.body = body
+        self.requests = []
+        self.server = None
+
+    async def handle(self, reader, writer):
+        request = await reader.readuntil(b'\r\n\r\n')
+        self.requests.append(request.split(b'\r\n')[0].decode())
+        body = self.body.encode()
+        writer.write(f'HTTP/1.0 {self.status} X\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+        await writer.drain()
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return f"127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+
+print("🧪 Testing nginx upstream health checker\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+def read(path):
+    with open(path) as handle:
+        return handle.read()
+
+
+async def scenario(tmp):
+    jenkins, sonar = StubBackend(), StubBackend(body='{"status":"STARTING"}')
+    jenkins_address, sonar_address = await jenkins.start(), await sonar.start()
+    include_dir = os.path.join(tmp, 'upstreams.d')
+    checker = healthcheck.HealthChecker({
+        'include_dir': include_dir,
+        'rise': 2,
+        'fall': 3,
+        'timeout': 1,
+        'status_file': os.path.join(tmp, 'status.json'),
+        'test_command': [sys.executable, '-c', 'pass'],
+        'reload_command': [sys.executable, '-c', 'pass'],
+        'upstreams': [
+            {'name': 'jenkins.example.com', 'path': '/login', 'servers': [jenkins_address]},
+            {'name': 'sonar.example.com', 'path': '/api/system/status', 'expect_body': '"status":"UP"',
+             'servers': [sonar_address]},
+            {'name': 'keycloak.example.com', 'path': '/health/ready', 'servers': ['127.0.0.1:1']},
+        ],
+    })
+    jenkins_file = os.path.join(include_dir, 'jenkins.example.com.conf')
+    sonar_file = os.path.join(include_dir, 'sonar.example.com.conf')
+
+    # Startup writes all include files and reloads once, replacing a seed from an earlier membership
+    os.makedirs(include_dir)
+    with open(jenkins_file, 'w') as handle:
+        handle.write(healthcheck.HEADER + 'server 10.0.0.99:8080;\n')
+    checker.sync()
+    check('Include files written at startup', read(jenkins_file).endswith(f'server {jenkins_address};\n'))
+    check('Stale membership replaced at startup', '10.0.0.99' not in read(jenkins_file), read(jenkins_file))
+    check('Startup counts as one reload', checker.reloads == 1, checker.reloads)
+
+    # Failures below the fall threshold do not change membership
+    changed = [await checker.check() for _ in range(2)]
+    check('No state change before fall threshold', changed == [[], []], changed)
+    check('Probe uses readiness path and Host header', jenkins.requests[0] == 'GET /login HTTP/1.0', jenkins.requests)
+
+    changed = await checker.check()
+    check('Unready SonarQube and unreachable Keycloak marked down',
+          sorted(upstream.name for upstream in changed) == ['keycloak.example.com', 'sonar.example.com'],
+          [upstream.name for upstream in changed])
+    checker.sync()
+    check('Down servers rendered with down flag', read(sonar_file).endswith(f'server {sonar_address} down;\n'),
+          read(sonar_file))
+    check('Membership change triggers exactly one reload', checker.reloads == 2, checker.reloads)
+    check('Healthy upstream untouched', 'down' not in read(jenkins_file))
+
+    # Recovery needs 'rise' consecutive successes
+    sonar.body = '{"status":"UP"}'
+    first = await checker.check()
+    second = await checker.check()
+    check('Recovery waits for rise threshold', first == [] and [u.name for u in second] == ['sonar.example.com'],
+          (first, second))
+    checker.sync()
+    checker.sync()
+    check('Recovered server back in rotation without extra reloads',
+          read(sonar_file).endswith(f'server {sonar_address};\n') and checker.reloads == 3, checker.reloads)
+
+    # A failing nginx -t restores the previous include files
+    checker.config['test_command'] = [sys.executable, '-c', 'import sys; sys.exit(1)']
+    sonar.body = '{"status":"DOWN"}'
+    for _ in range(3):
+        await checker.check()
+    checker.sync()
+    check('Include files restored when nginx -t fails',
+          'down' not in read(sonar_file) and checker.reload_errors == 1, read(sonar_file))
+
+    checker.write_status()
+    status = json.loads(read(os.path.join(tmp, 'status.json')))
+    keycloak = status['upstreams']['keycloak.example.com']['servers'][0]
+    check('Status file reports health, latency and errors',
+          keycloak['healthy'] is False and keycloak['error'] and keycloak['latency_ms'] is not None
+          and status['upstreams']['jenkins.example.com']['healthy'] == 1, keycloak)
+
+    # Status endpoint serves the same document
+    endpoint = await asyncio.start_server(checker.handle_status, '127.0.0.1', 0)
+    reader, writer = await asyncio.open_connection('127.0.0.1', endpoint.sockets[0].getsockname()[1])
+    writer.write(b'GET /status HTTP/1.0\r\n\r\n')
+    response = await reader.read()
+    endpoint.close()
+    headers, _, body = response.partition(b'\r\n\r\n')
+    check('Status endpoint returns JSON',
+          headers.startswith(b'HTTP/1.0 200') and 'sonar.example.com' in json.loads(body)['upstreams'])
+
+    jenkins.server.close()
+    sonar.server.close()
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    asyncio.run(scenario(tmp))
+
+# The rendered daemon configuration picks readiness probes by server name
+with open(os.path.join(ROLE, 'defaults', 'main.yml')) as handle:
+    variables = yaml.safe_load(handle)
+env = Environment(loader=FileSystemLoader(os.path.join(ROLE, 'templates')), trim_blocks=True, undefined=StrictUndefined)
+variables['site_backends'].append({'server_name': ['nexus.example.com', 'repo.example.com'], 'ip': '10.0.0.5', 'port': 8081,
+                                   'health_check': {'path': '/service/rest/v1/status'}})
+variables['site_backends'].append({'server_name': 'sonar-cluster.example.com', 'group': 'sonarqube', 'port': 9000})
+variables.update(groups={'sonarqube': ['sonar1', 'sonar2']}, hostvars={'sonar1': {'ansible_host': '10.0.0.21'}, 'sonar2': {}})
+# Resolved by Ansible from the inventory when the template is rendered
+variables['nginx_upstream_servers'] = ast.literal_eval(
+    Environment().from_string(variables['nginx_upstream_servers']).render(**variables).strip())
+config = json.loads(env.get_template('upstream-healthcheck.json.j2').render(**variables))
+probes = {upstream['name']: upstream for upstream in config['upstreams']}
+check('Rendered config probes Jenkins, SonarQube and Keycloak readiness URLs',
+      probes['jenkins.example.com']['path'] == '/login'
+      and probes['sonar.example.com']['expect_body'] == '"status":"UP"'
+      and probes['keycloak.example.com']['path'] == '/health/ready', probes)
+check('Per-backend health_check overrides the default probe',
+      probes['nexus.example.com']['path'] == '/service/rest/v1/status'
+      and probes['nexus.example.com']['servers'] == ['10.0.0.5:8081'], probes.get('nexus.example.com'))
+check('Every member of an inventory group is probed',
+      probes['sonar-cluster.example.com']['servers'] == ['10.0.0.21:9000', 'sonar2:9000']
+      and probes['sonar-cluster.example.com']['expect_body'] == '"status":"UP"', probes.get('sonar-cluster.example.com'))
+
+if all_passed:
+    print("🎉 All tests passed! The upstream health checker is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the upstream health checker.")
+    sys.exit(1)
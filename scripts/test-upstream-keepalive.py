@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test script to validate upstream keepalive in the nginx proxy templates: the
+Connection header each proxied location sends, the Jenkins keepalive pool
+settings and connection reuse against the proxy benchmark's stub backends
+(end to end through nginx when an nginx binary is installed)
+"""
+
+import asyncio
+import glob
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'proxy-benchmark.py')
+ROOT = os.path.dirname(os.path.dirname(SCRIPT))
+spec = importlib.util.spec_from_file_location('proxy_benchmark', SCRIPT)
+benchmark = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(benchmark)
+
+print("🧪 Testing upstream keepalive\n")
+
+all_passed = True
+
+
+def check(name, condition, detail=''):
+    global all_passed
+    print(f"Test: {name}")
+    if condition:
+        print("  ✅ PASS\n")
+    else:
+        print(f"  ❌ FAIL {detail}\n")
+        all_passed = False
+
+
+def upgrade_map(config):
+    """Entries of the $connection_upgrade map with nginx quoting removed"""
+    block = re.search(r'map \$http_upgrade \$connection_upgrade \{(.*?)\}', config, re.S)
+    if not block:
+        return {}
+    entries = re.findall(r'^\s*(\S+)\s+(\S+);', block.group(1), re.M)
+    return {key.strip('\'"'): value.strip('\'"') for key, value in entries}
+
+
+def connection_headers(config, server_name):
+    """Connection header value per proxied location of the server blocks for server_name"""
+    headers = {}
+    for start in (match.end() for match in re.finditer(rf'server_name\s+{re.escape(server_name)};', config)):
+        server = config[start:config.find('\nserver {', start)]
+        for location in re.finditer(r'location ([^{]+)\{(.*?)\n  \}', server, re.S):
+            if 'proxy_pass' in location.group(2):
+                header = re.search(r'proxy_set_header\s+Connection\s+(\S+);', location.group(2))
+                headers[location.group(1).strip()] = header.group(1).strip('"') if header else None
+    return headers
+
+
+def sent_header(value, mapping, upgrade):
+    """What nginx sends upstream: no directive means 'close', an empty value omits the header"""
+    if value is None:
+        return 'close'
+    if value == '$connection_upgrade':
+        return mapping.get('default') if upgrade else mapping.get('')
+    return value
+
+
+ports = {'jenkins': 19101, 'sonar': 19102, 'keycloak': 19103}
+workdir = tempfile.mkdtemp(prefix='upstream-keepalive-test-')
+rendered = {flavour: benchmark.render_config(flavour, workdir, ports, 18180, {}) for flavour in benchmark.TEMPLATES}
+os.rmdir(workdir)
+
+for flavour, config in rendered.items():
+    mapping = upgrade_map(config)
+    check(f'[{flavour}] Plain requests clear Connection, websocket requests upgrade',
+          mapping == {'default': 'upgrade', '': ''}, mapping)
+    for backend, server_name in benchmark.BACKENDS.items():
+        headers = connection_headers(config, server_name)
+        plain = {path: sent_header(value, mapping, False) for path, value in headers.items()}
+        check(f'[{flavour}] Every {backend} location keeps the upstream connection open',
+              headers and set(plain.values()) == {''}, plain)
+    websocket = connection_headers(config, benchmark.BACKENDS['jenkins'])['~ ^/(wsagents|cli)(/|$)']
+    check(f'[{flavour}] Websocket agents still get Connection: upgrade',
+          sent_header(websocket, mapping, True) == 'upgrade', websocket)
+    pools = dict(re.findall(r'upstream (\S+) \{(.*?)\}', config, re.S))
+    jenkins = next(body for name, body in pools.items() if name.startswith('jenkins'))
+    check(f'[{flavour}] Jenkins upstream recycles idle connections before Jenkins does',
+          'keepalive 32;' in jenkins and 'keepalive_requests 1000;' in jenkins
+          and 'keepalive_timeout  4s;' in jenkins, jenkins)
+    check(f'[{flavour}] Other upstreams keep the nginx keepalive defaults',
+          all('keepalive_timeout' not in body for name, body in pools.items() if not name.startswith('jenkins')))
+
+config = benchmark.render_config('ssl', tempfile.gettempdir(), ports, 18180, {
+    'nginx_keepalive_connections': 64, 'nginx_jenkins_keepalive_requests': 200, 'nginx_jenkins_keepalive_timeout': '2s'})
+check('Keepalive pool settings are configurable',
+      'keepalive 64;' in config and 'keepalive_requests 200;' in config and 'keepalive_timeout  2s;' in config)
+
+closing = [path for path in glob.glob(os.path.join(ROOT, 'roles', '*', 'templates', '*.j2'))
+           if re.search(r"^\s*''\s+close;", open(path).read(), re.M)]
+check('No proxy template maps plain requests to Connection: close', not closing, closing)
+
+
+# Connection reuse at the stub backends, sending the headers nginx sends
+async def requests_over_one_connection(port, connection, count):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    served = 0
+    try:
+        for _ in range(count):
+            header = f'Connection: {connection}\r\n' if connection else ''
+            writer.write(f'GET / HTTP/1.1\r\nHost: jenkins.bench.local\r\n{header}\r\n'.encode())
+            await writer.drain()
+            _, headers = await benchmark.read_head(reader)
+            await benchmark.read_body(reader, headers)
+            served += 1
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+    return served
+
+
+async def upstream_connections(ports, connection, count):
+    """Upstream connections needed for count requests, reconnecting whenever the backend closes"""
+    before = await benchmark.fetch_stub_stats(ports)
+    served = 0
+    while served < count:
+        served += await requests_over_one_connection(ports['jenkins'], connection, count - served)
+    after = await benchmark.fetch_stub_stats(ports)
+    # The second stats request opens one connection of its own
+    return after['jenkins']['connections'] - before['jenkins']['connections'] - 1
+
+
+queue = multiprocessing.Queue()
+stubs = multiprocessing.Process(target=benchmark.run_stubs, args=(queue, 65536, 5), daemon=True)
+stubs.start()
+try:
+    stub_ports = queue.get(timeout=10)
+    mapping = upgrade_map(rendered['http'])
+    reused = asyncio.run(upstream_connections(stub_ports, mapping.get(''), 20))
+    check('Plain requests reuse one upstream connection', reused == 1, f'{reused} connections for 20 requests')
+    closed = asyncio.run(upstream_connections(stub_ports, 'close', 20))
+    check('Connection: close costs one upstream connection per request', closed == 20,
+          f'{closed} connections for 20 requests')
+finally:
+    stubs.terminate()
+    stubs.join()
+
+# End to end through nginx (streaming, artifacts and websockets included)
+nginx = shutil.which('nginx')
+if nginx:
+    for flavour in benchmark.TEMPLATES:
+        result = subprocess.run([sys.executable, SCRIPT, '--json', '--template', flavour, '--nginx', nginx,
+                                 '--port', '18180', '--duration', '1', '--warmup', '0.2', '--concurrency', '8',
+                                 '--artifact-mb', '0.5', '--console-lines', '5'],
+                                capture_output=True, text=True, timeout=120)
+        summary = json.loads(result.stdout)[0] if result.returncode == 0 else {}
+        check(f'[{flavour}] Proxied run completes without errors', summary.get('errors') == 0,
+              result.stderr[-500:] or summary.get('error_detail'))
+        per_connection = {backend: stats['requests_per_connection']
+                          for backend, stats in summary.get('upstream', {}).items()}
+        check(f'[{flavour}] nginx reuses upstream connections for every backend',
+              per_connection and all(value and value > 1 for value in per_connection.values()), per_connection)
+else:
+    print("ℹ️  nginx not installed: skipping the end-to-end run through nginx\n")
+
+if all_passed:
+    print("🎉 All tests passed! Upstream keepalive is working correctly.")
+    sys.exit(0)
+else:
+    print("❌ Some tests failed. Please review the upstream keepalive configuration.")
+    sys.exit(1)